@@ -0,0 +1,86 @@
+"""
+Logins during a flood of list requests, with and without admission
+control: without it every request queues for the threadpool; with it the
+list pool sheds the excess as 503s and logins keep their own slots.
+
+    python -m benchmarks.admission --flood 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import bind_database, summarize, temp_database, user_payload
+from core.config import settings
+from repositories.user_repository import UserRepository
+from routes.user_routes import UserRoutes
+from utils.admission import AdmissionController, AdmissionMiddleware, parse_pools, parse_routes
+
+
+def build_app(session_factory, admission: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(UserRoutes().router, prefix="/api/users")
+    bind_database(app, session_factory)
+    if admission:
+        controller = AdmissionController(parse_pools(settings.admission_pools), parse_routes(settings.admission_routes))
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app
+
+
+async def flood(app: FastAPI, requests: int, concurrency: int, logins: int):
+    """Return (list latencies by status, login latencies by status)"""
+    lists: dict[int, list[float]] = {}
+    login_latencies: dict[int, list[float]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def timed(results, request):
+            start = time.perf_counter()
+            response = await request()
+            results.setdefault(response.status_code, []).append(time.perf_counter() - start)
+
+        async def list_page():
+            async with semaphore:
+                await timed(lists, lambda: client.get("/api/users/", params={"limit": 100}))
+
+        async def login_every(interval: float):
+            for i in range(logins):
+                await asyncio.sleep(interval)
+                await timed(login_latencies, lambda: client.post(
+                    "/api/users/login", json={"email": f"user{i}@example.com", "password": "password"}
+                ))
+
+        await asyncio.gather(login_every(0.01), *(list_page() for _ in range(requests)))
+    return lists, login_latencies
+
+
+def report(name: str, results: dict[int, list[float]]) -> str:
+    return "  ".join(f"{name} {status} x{len(latencies)} {summarize(latencies)}" for status, latencies in sorted(results.items()))
+
+
+def run(users: int, requests: int, concurrency: int, logins: int):
+    with temp_database() as (_, session_factory):
+        with session_factory() as db:
+            repository = UserRepository()
+            repository.bulk_create(db, [user_payload(i) for i in range(users)])
+
+        print(f"{requests} list requests, {concurrency} at a time, {logins} logins, pools {settings.admission_pools}")
+        for admission in (False, True):
+            app = build_app(session_factory, admission)
+            lists, login_latencies = asyncio.run(flood(app, requests, concurrency, logins))
+            print(f"admission {'on' if admission else 'off'}")
+            print(f"  {report('list', lists)}")
+            print(f"  {report('login', login_latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--flood", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    run(args.users, args.flood, args.concurrency, args.logins)
@@ -0,0 +1,85 @@
+"""
+Load test of the sync (threadpool) routes against the async (AsyncSession)
+routes under bursts of concurrent requests.
+
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 50 200 500
+"""
+import argparse
+import asyncio
+import random
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from benchmarks.common import asgi_load, bind_database, percentile, temp_database, user_payload
+from db.async_session import get_async_db, get_async_write_db
+from db.session import configure_sqlite
+from repositories.user_repository import UserRepository
+from routes.async_user_routes import AsyncUserRoutes
+from routes.user_routes import UserRoutes
+
+
+# Connection pools are not the bottleneck under test: the sync engine opens
+# a connection per session (NullPool), the async one keeps a large pool.
+POOL_SIZE = 512
+
+
+async def burst(routes, engine, session_factory, ids: list[int], requests: int, concurrency: int):
+    """
+    Fire `requests` GET /api/users/{id}, `concurrency` at a time, against an
+    app with only the user routes bound to the benchmark database.
+    The async engine lives on this event loop and is disposed with it.
+    """
+    async_engine = create_async_engine(
+        str(engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1), pool_size=POOL_SIZE, max_overflow=0
+    )
+    configure_sqlite(async_engine.sync_engine)
+    async_session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/users")
+    bind_database(app, session_factory)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_write_db] = override_get_async_db
+
+    result = await asgi_load(
+        app, lambda client: client.get(f"/api/users/{random.choice(ids)}"), requests, concurrency
+    )
+
+    await async_engine.dispose()
+    return result
+
+
+def run(users: int, requests: int, levels: list[int]):
+    with temp_database(poolclass=NullPool) as (engine, session_factory):
+        with session_factory() as db:
+            results = UserRepository().bulk_create(db, [user_payload(i) for i in range(users)])
+        ids = [result.id for result in results]
+
+        modes = {"sync": UserRoutes(), "async": AsyncUserRoutes()}
+
+        print(f"{requests} x GET /api/users/{{id}} over {users} users")
+        print(f"{'mode':<7}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for concurrency in levels:
+            for mode, routes in modes.items():
+                rps, latencies = asyncio.run(
+                    burst(routes, engine, session_factory, ids, requests, concurrency)
+                )
+                print(
+                    f"{mode:<7}{concurrency:>12}{rps:>10.0f}"
+                    f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    args = parser.parse_args()
+    run(args.users, args.requests, args.concurrency)
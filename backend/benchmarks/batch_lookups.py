@@ -0,0 +1,83 @@
+"""
+Resolving many user ids: one GET /api/users/{id} per id (with and without
+the batch loader merging the concurrent lookups) against a single
+GET /api/users/?ids=... The entity cache is disabled.
+
+    python -m benchmarks.batch_lookups --ids 50 --rounds 40
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import bind_database, summarize, temp_database, user_payload
+from db.batch_loader import BatchLoader
+from repositories.user_repository import UserRepository
+from routes.user_routes import UserRoutes
+
+
+def build_app(session_factory, batched: bool) -> tuple[FastAPI, BatchLoader | None]:
+    routes = UserRoutes()
+    repository = routes.service.repository
+    repository.cache = None
+    if batched:
+        repository.batch_loader = BatchLoader(session_factory, repository.load_by_ids)
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/users")
+    bind_database(app, session_factory)
+    return app, repository.batch_loader
+
+
+async def resolve(app, id_lists: list[list[int]], one_request: bool) -> tuple[float, list[float]]:
+    """Resolve each list of ids (a trip list) in turn, return (ids per second, latency per list)"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for ids in id_lists:
+            start = time.perf_counter()
+            if one_request:
+                response = await client.get("/api/users/", params={"ids": ",".join(map(str, ids))})
+                assert len(response.json()) == len(ids)
+            else:
+                # What a client does today: every id at once, one request each
+                responses = await asyncio.gather(*(client.get(f"/api/users/{id}") for id in ids))
+                assert all(response.status_code == 200 for response in responses)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+    return sum(map(len, id_lists)) / elapsed, latencies
+
+
+def run(users: int, ids: int, rounds: int):
+    with temp_database() as (_, session_factory):
+        with session_factory() as db:
+            UserRepository().bulk_create(db, [user_payload(i) for i in range(users)])
+        id_lists = [random.sample(range(1, users + 1), ids) for _ in range(rounds)]
+
+        print(f"{rounds} lists of {ids} ids, {users} users")
+        for name, batched, one_request in (
+            ("GET /{id} each", False, False),
+            ("GET /{id} batched", True, False),
+            ("GET /?ids=", False, True),
+        ):
+            app, loader = build_app(session_factory, batched)
+            rate, latencies = asyncio.run(resolve(app, id_lists, one_request))
+            line = f"  {name:<19}{rate:>8.0f} ids/s  per list {summarize(latencies)}"
+            if loader is not None:
+                stats = loader.stats()
+                line += f"  ({stats.batches} queries, {stats.mean_batch_size:.1f} ids each)"
+                loader.shutdown()
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ids", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=40)
+    args = parser.parse_args()
+    run(args.users, args.ids, args.rounds)
@@ -0,0 +1,53 @@
+"""
+Throughput of the single-row user endpoints against /api/users/bulk.
+
+    python -m benchmarks.bulk_users --users 2000
+"""
+import argparse
+
+from benchmarks.common import Timer, bench_client, temp_database, user_payload
+
+
+def run(users: int):
+    rows = []
+
+    with temp_database() as (_, session_factory), bench_client(session_factory) as client:
+        with Timer() as t:
+            ids = [client.post("/api/users/", json=user_payload(i, "single")).json()["id"] for i in range(users)]
+        rows.append(("create", "single", t.elapsed))
+
+        with Timer() as t:
+            for i, id in enumerate(ids):
+                client.put(f"/api/users/{id}", json=user_payload(i, "single-upd"))
+        rows.append(("update", "single", t.elapsed))
+
+        with Timer() as t:
+            for id in ids:
+                client.delete(f"/api/users/{id}")
+        rows.append(("delete", "single", t.elapsed))
+
+        with Timer() as t:
+            response = client.post("/api/users/bulk", json={"items": [user_payload(i, "bulk") for i in range(users)]})
+        ids = [result["id"] for result in response.json()["results"]]
+        rows.append(("create", "bulk", t.elapsed))
+
+        with Timer() as t:
+            client.put("/api/users/bulk", json={"items": [
+                {"id": id, **user_payload(i, "bulk-upd")} for i, id in enumerate(ids)
+            ]})
+        rows.append(("update", "bulk", t.elapsed))
+
+        with Timer() as t:
+            client.request("DELETE", "/api/users/bulk", json={"ids": ids})
+        rows.append(("delete", "bulk", t.elapsed))
+
+    print(f"{users} users")
+    print(f"{'operation':<10}{'path':<8}{'seconds':>10}{'rows/s':>12}")
+    for operation, path, elapsed in rows:
+        print(f"{operation:<10}{path:<8}{elapsed:>10.3f}{users / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    run(parser.parse_args().users)
@@ -0,0 +1,140 @@
+"""
+Helpers shared by the benchmarks.
+
+Run every benchmark from backend/, e.g.:
+    python -m benchmarks.bulk_users --users 2000
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.schema import init_schema
+from db.session import begin_immediate, configure_sqlite, get_db, get_read_db
+
+
+@contextmanager
+def temp_database(pragmas: dict[str, str] | None = None, **engine_kwargs):
+    """
+    Yield (engine, session_factory) bound to a throwaway SQLite file.
+    A real file is used (not :memory:) so commits pay their fsync.
+    `pragmas` are applied to each connection (see configure_sqlite),
+    `engine_kwargs` are passed to create_engine (e.g. pool_size).
+    """
+    directory = tempfile.mkdtemp(prefix="sentinel-bench-")
+    path = os.path.join(directory, "bench.db")
+    engine = configure_sqlite(create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}, **engine_kwargs
+    ), pragmas)
+    init_schema(engine)
+    try:
+        yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def bind_database(app, session_factory):
+    """
+    Bind the db dependencies (get_db, get_read_db) of `app` to the benchmark
+    database. The sessions of get_db begin IMMEDIATE, as those of the app.
+    """
+    write_session_factory = sessionmaker(**{**session_factory.kw, "bind": begin_immediate(session_factory.kw["bind"])})
+
+    def override(factory):
+        # async, like db.session.get_db: the teardown must not wait for a thread
+        async def override_get_db():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        return override_get_db
+
+    app.dependency_overrides[get_db] = override(write_session_factory)
+    app.dependency_overrides[get_read_db] = override(session_factory)
+
+
+@contextmanager
+def bench_client(session_factory):
+    """
+    TestClient over the real app, bound to the benchmark database: its db
+    dependencies, and the lifespan (which would set up the schema of the
+    configured database otherwise)
+    """
+    from main import create_app
+
+    app = create_app(engine=session_factory.kw["bind"])
+    bind_database(app, session_factory)
+    with TestClient(app) as client:
+        yield client
+
+
+async def asgi_load(app, send, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    """
+    Run `send(client)` `requests` times, `concurrency` at a time, against
+    `app` in-process (httpx ASGI transport).
+    Return (requests per second, latencies in seconds).
+    """
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await send(client)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        with Timer() as t:
+            await asyncio.gather(*(one() for _ in range(requests)))
+
+    return requests / t.elapsed, latencies
+
+
+def user_payload(i: int, prefix: str = "user") -> dict:
+    return {
+        "name": f"{prefix.title()} {i}",
+        "email": f"{prefix}{i}@example.com",
+        "password": "password",
+        "role": "Driver",
+    }
+
+
+class Timer:
+    """Context manager that stores the elapsed seconds on `.elapsed`"""
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples`"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> str:
+    """p50/p99/mean of latencies given in seconds, printed in ms"""
+    return (
+        f"p50={percentile(samples, 50) * 1000:.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:.2f}ms "
+        f"mean={statistics.fmean(samples) * 1000:.2f}ms"
+    )
@@ -0,0 +1,113 @@
+"""
+Peak Python memory of GET /api/users/export and POST /api/users/import
+for growing rosters: it should stay flat.
+
+The import hashes every password, use a cheap work factor:
+    SENTINEL_SCRYPT_N=16 python -m benchmarks.export_import --users 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks.common import Timer, bind_database, temp_database
+from repositories.user_repository import UserRepository
+
+# Users inserted per bulk statement when seeding
+SEED_BATCH = 5000
+
+
+def seed(session_factory, users: int):
+    repository = UserRepository()
+    with session_factory() as db:
+        for start in range(0, users, SEED_BATCH):
+            repository.bulk_create(db, [
+                {"name": f"User {i}", "email": f"user{i}@example.com", "password": "x", "role": "Driver"}
+                for i in range(start, min(users, start + SEED_BATCH))
+            ])
+
+
+def roster(users: int):
+    """NDJSON upload generated line by line, never held whole"""
+    for i in range(users):
+        yield (json.dumps({"name": f"Import {i}", "email": f"import{i}@example.com", "password": "x"}) + "\n").encode()
+
+
+async def call(app, method: str, path: str, params: dict, body=()) -> tuple[int, bytes]:
+    """
+    Drive the ASGI app directly: the test clients buffer whole bodies,
+    which would be measured instead of the app. The request body is sent
+    chunk by chunk, the response body is only counted (its last chunk kept).
+    """
+    body = iter(body)
+    size, last = 0, b""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # The client stays connected until the response is complete
+            await asyncio.Event().wait()
+        chunk = next(body, None)
+        if chunk is None:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        nonlocal size, last
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            last = message.get("body", b"") or last
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+    }
+    await app(scope, receive, send)
+    return size, last
+
+
+def measure(users: int, format: str):
+    from main import app
+
+    with temp_database() as (_, session_factory):
+        seed(session_factory, users)
+        bind_database(app, session_factory)
+
+        tracemalloc.start()
+        with Timer() as export_time:
+            size, _ = asyncio.run(call(app, "GET", "/api/users/export", {"format": format}))
+        _, export_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        with Timer() as import_time:
+            _, body = asyncio.run(call(app, "POST", "/api/users/import", {"chunk_size": 1000}, roster(users)))
+        _, import_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        app.dependency_overrides.clear()
+
+    report = json.loads(body)
+    assert report["created"] == users, report
+    return size, export_time.elapsed, export_peak, import_time.elapsed, import_peak
+
+
+def run(sizes: list[int], format: str):
+    print(f"{'users':>8}{'export MB':>11}{'export s':>10}{'peak MB':>9}{'import s':>10}{'peak MB':>9}")
+    for users in sizes:
+        size, export_s, export_peak, import_s, import_peak = measure(users, format)
+        print(
+            f"{users:>8}{size / 1e6:>11.1f}{export_s:>10.2f}{export_peak / 1e6:>9.1f}"
+            f"{import_s:>10.2f}{import_peak / 1e6:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    run(args.users, args.format)
@@ -0,0 +1,311 @@
+"""
+Throughput of the user API under a mixed workload: list, get by id, login,
+create, update and delete, run against the real app (main.create_app,
+with its middlewares) on a seeded throwaway database. Reports the
+requests per second and the p50/p95/p99 latency of each endpoint.
+
+In-process through the httpx ASGI transport by default, or against a
+uvicorn server started on the same database (`--uvicorn`):
+
+    python -m benchmarks.http_load --users 1000 --requests 5000 --concurrency 32
+    python -m benchmarks.http_load --uvicorn
+
+The results are compared with the baseline (benchmarks/baselines/http_load.json
+by default): the run fails (exit status 1) when an endpoint is slower than
+the baseline by more than --threshold (its RPS lower, or a percentile
+higher), or fails requests the baseline did not. The baseline is only
+meaningful on the machine that measured it, store a new one with
+`--save-baseline`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from itertools import count
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import Timer, bind_database, percentile, temp_database, user_payload
+from core.config import settings
+from core.security import password_hasher
+from repositories.user_repository import UserRepository
+
+BASELINE = Path(__file__).parent / "baselines" / "http_load.json"
+
+# Share of the requests of each operation
+DEFAULT_MIX = "list=20,get=45,login=5,create=10,update=10,delete=10"
+ENDPOINTS = {
+    "list": "GET /api/users/",
+    "get": "GET /api/users/{id}",
+    "login": "POST /api/users/login",
+    "create": "POST /api/users/",
+    "update": "PUT /api/users/{id}",
+    "delete": "DELETE /api/users/{id}",
+}
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """{operation: weight} of "list=20,get=45,..." """
+    mix = {}
+    for entry in value.split(","):
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown operation {name!r}, one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class Workload:
+    """
+    The requests of the mix. Reads, logins and updates go to the seeded
+    users (update i keeps the email of user i); deletes remove the users
+    created by the run, a delete with none left is sent as a create.
+    """
+
+    def __init__(self, ids: list[int], mix: dict[str, float], seed: int = 0):
+        self.ids = ids
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.created: list[int] = []
+        self.sequence = count()
+
+    def choose(self) -> str:
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "delete" and not self.created:
+            return "create"
+        return name
+
+    async def send(self, client: httpx.AsyncClient, name: str) -> httpx.Response:
+        if name == "list":
+            return await client.get("/api/users/", params={"limit": 50})
+        if name == "get":
+            return await client.get(f"/api/users/{self.rng.choice(self.ids)}")
+        if name == "login":
+            i = self.rng.randrange(len(self.ids))
+            return await client.post("/api/users/login", json={"email": f"user{i}@example.com", "password": "password"})
+        if name == "create":
+            response = await client.post("/api/users/", json=user_payload(next(self.sequence), prefix="load"))
+            if response.is_success:
+                self.created.append(response.json()["id"])
+            return response
+        if name == "update":
+            i = self.rng.randrange(len(self.ids))
+            payload = dict(user_payload(i), name=f"User {i} {next(self.sequence)}")
+            return await client.put(f"/api/users/{self.ids[i]}", json=payload)
+        return await client.delete(f"/api/users/{self.created.pop(self.rng.randrange(len(self.created)))}")
+
+
+async def drive(client: httpx.AsyncClient, workload: Workload, requests: int, concurrency: int, warmup: int):
+    """
+    Send `warmup` requests (not recorded), then `requests` from `concurrency`
+    workers. Return (elapsed seconds, {operation: latencies}, {operation: failed})
+    """
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    async def worker(remaining: list[int], record: bool):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            name = workload.choose()
+            start = time.perf_counter()
+            response = await workload.send(client, name)
+            if record:
+                latencies.setdefault(name, []).append(time.perf_counter() - start)
+                if not response.is_success:
+                    errors[name] = errors.get(name, 0) + 1
+
+    await worker([warmup], False)
+    remaining = [requests]
+    with Timer() as t:
+        await asyncio.gather(*(worker(remaining, True) for _ in range(concurrency)))
+    return t.elapsed, latencies, errors
+
+
+def results(elapsed: float, latencies: dict[str, list[float]], errors: dict[str, int]) -> dict:
+    def stats(samples: list[float], failed: int) -> dict:
+        return {
+            "requests": len(samples),
+            "errors": failed,
+            "rps": round(len(samples) / elapsed, 1),
+            **{f"p{pct}_ms": round(percentile(samples, pct) * 1000, 3) for pct in PERCENTILES},
+        }
+
+    endpoints = {name: stats(latencies[name], errors.get(name, 0)) for name in ENDPOINTS if name in latencies}
+    endpoints["total"] = stats([sample for samples in latencies.values() for sample in samples], sum(errors.values()))
+    return endpoints
+
+
+def regressions(endpoints: dict, baseline: dict, threshold: float) -> list[str]:
+    """What got worse than the baseline by more than `threshold` (0.25: 25%)"""
+    found = []
+    for name, base in baseline.items():
+        current = endpoints.get(name)
+        if current is None:
+            found.append(f"{name}: not measured")
+            continue
+        if current["rps"] < base["rps"] * (1 - threshold):
+            found.append(f"{name}: {current['rps']} req/s, baseline {base['rps']}")
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            if current[key] > base[key] * (1 + threshold):
+                found.append(f"{name}: p{pct} {current[key]}ms, baseline {base[key]}ms")
+        if current["errors"] and not base["errors"]:
+            found.append(f"{name}: {current['errors']} failed requests")
+    return found
+
+
+def report(endpoints: dict, baseline: dict | None):
+    for name, current in endpoints.items():
+        line = (
+            f"  {ENDPOINTS.get(name, name):<24} {current['requests']:>6} req {current['errors']:>4} failed "
+            f"{current['rps']:>8.1f} req/s  "
+            + " ".join(f"p{pct}={current[f'p{pct}_ms']:.2f}ms" for pct in PERCENTILES)
+        )
+        if baseline and name in baseline:
+            line += f"  ({(current['rps'] / baseline[name]['rps'] - 1) * 100:+.1f}% req/s)"
+        print(line)
+
+
+def seed(session_factory, users: int) -> list[int]:
+    """Insert the users, all with the password "password" (hashed once)"""
+    hashed = password_hasher.hash("password")
+    with session_factory() as db:
+        return [
+            result.id
+            for result in UserRepository().bulk_create(db, [dict(user_payload(i), password=hashed) for i in range(users)])
+        ]
+
+
+def bind_async_database(app, database_url: str):
+    """In SENTINEL_DB_MODE=async the routes take get_async_db and get_async_write_db, bound to the benchmark database too"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from db.async_session import get_async_db, get_async_write_db
+    from db.session import begin_immediate, configure_sqlite
+
+    engine = create_async_engine(database_url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    configure_sqlite(engine.sync_engine, settings.sqlite_pragmas)
+
+    def override(bind):
+        session_factory = async_sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with session_factory() as db:
+                yield db
+        return override_get_async_db
+
+    app.dependency_overrides[get_async_db] = override(engine)
+    app.dependency_overrides[get_async_write_db] = override(begin_immediate(engine))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    """uvicorn main:app on `database_url`, returned once it answers"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=dict(os.environ, SENTINEL_DATABASE_URL=database_url),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def measure(client: httpx.AsyncClient, ids: list[int], args) -> dict:
+    workload = Workload(ids, parse_mix(args.mix), args.seed)
+    async with client:
+        return results(*await drive(client, workload, args.requests, args.concurrency, args.warmup))
+
+
+def run(args) -> int:
+    workload = {
+        "users": args.users, "requests": args.requests, "concurrency": args.concurrency, "mix": args.mix,
+        "transport": f"uvicorn x{args.workers}" if args.uvicorn else "asgi", "db_mode": settings.db_mode,
+        # Logins, creates and updates hash a password: their cost is the work factor
+        "scrypt_n": settings.scrypt_n,
+    }
+    baseline_path = Path(args.baseline)
+    baseline = None
+    if not args.save_baseline and baseline_path.exists():
+        stored = json.loads(baseline_path.read_text())
+        if stored["workload"] != workload:
+            print(f"Baseline measured with {stored['workload']}, not compared (this run: {workload})")
+        else:
+            baseline = stored["endpoints"]
+
+    with temp_database(settings.sqlite_pragmas) as (engine, session_factory):
+        ids = seed(session_factory, args.users)
+        database_url = engine.url.render_as_string(hide_password=False)
+
+        if args.uvicorn:
+            port = free_port()
+            server = start_uvicorn(database_url, port, args.workers)
+            try:
+                limits = httpx.Limits(max_connections=args.concurrency)
+                client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None)
+                endpoints = asyncio.run(measure(client, ids, args))
+            finally:
+                server.terminate()
+                server.wait()
+        else:
+            from main import create_app
+
+            app = create_app(engine=engine)
+            bind_database(app, session_factory)
+            if settings.db_mode == "async":
+                bind_async_database(app, database_url)
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=None)
+            endpoints = asyncio.run(measure(client, ids, args))
+
+    print(f"{args.requests} requests, {args.concurrency} at a time, {args.users} users, {workload['transport']}, mix {args.mix}")
+    report(endpoints, baseline)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({"workload": workload, "endpoints": endpoints}, indent=2) + "\n")
+        print(f"Baseline stored in {baseline_path}")
+        return 0
+    if baseline is None:
+        return 0
+
+    found = regressions(endpoints, baseline, args.threshold)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    print(f"{len(found)} regressions over {args.threshold:.0%} against {baseline_path}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation=weight,... of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--uvicorn", action="store_true", help="Against a local uvicorn server instead of in-process")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.25, help="Tolerated regression, 0.25 for 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    args = parser.parse_args()
+    sys.exit(run(args))
@@ -0,0 +1,71 @@
+"""
+Login latency under a concurrent login storm, and its impact on the other
+endpoints (GET /api/users/{id} running at the same time).
+
+The hasher is configured from the environment, e.g.:
+    SENTINEL_PASSWORD_HASH_WORKERS=2 SENTINEL_SCRYPT_N=16384 \
+        python -m benchmarks.login_latency --logins 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import random
+
+from fastapi import FastAPI
+from sqlalchemy.pool import NullPool
+
+from benchmarks.common import asgi_load, bind_database, summarize, temp_database, user_payload
+from core.config import settings
+from core.security import password_hasher
+from repositories.user_repository import UserRepository
+from routes.user_routes import UserRoutes
+
+
+async def storm(app: FastAPI, users: int, ids: list[int], logins: int, concurrency: int):
+    """Run the login storm and a steady stream of reads side by side"""
+    def login(client):
+        i = random.randrange(users)
+        return client.post("/api/users/login", json={"email": f"user{i}@example.com", "password": "password"})
+
+    def read(client):
+        return client.get(f"/api/users/{random.choice(ids)}")
+
+    return await asyncio.gather(
+        asgi_load(app, login, logins, concurrency),
+        asgi_load(app, read, logins, 10),
+    )
+
+
+def run(users: int, logins: int, levels: list[int]):
+    with temp_database(poolclass=NullPool) as (_, session_factory):
+        with session_factory() as db:
+            items = [user_payload(i) for i in range(users)]
+            for item, hashed in zip(items, password_hasher.hash_many(item["password"] for item in items)):
+                item["password"] = hashed
+            ids = [result.id for result in UserRepository().bulk_create(db, items)]
+
+        app = FastAPI()
+        app.include_router(UserRoutes().router, prefix="/api/users")
+        bind_database(app, session_factory)
+
+        print(
+            f"scrypt n={settings.scrypt_n} r={settings.scrypt_r} p={settings.scrypt_p}, "
+            f"{settings.password_hash_workers} {settings.password_hash_executor} workers"
+        )
+        for concurrency in levels:
+            (login_rps, login_latencies), (_, read_latencies) = asyncio.run(
+                storm(app, users, ids, logins, concurrency)
+            )
+            print(f"concurrency {concurrency}: {login_rps:.0f} logins/s")
+            print(f"  login     {summarize(login_latencies)}")
+            print(f"  get by id {summarize(read_latencies)}")
+
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    args = parser.parse_args()
+    run(args.users, args.logins, args.concurrency)
@@ -0,0 +1,69 @@
+"""
+Cost of the request instrumentation: GET /api/users/{id} on the bare user
+routes against the same routes behind MetricsMiddleware with engine events.
+
+    python -m benchmarks.metrics_overhead --requests 3000 --concurrency 20
+"""
+import argparse
+import asyncio
+import random
+
+from fastapi import APIRouter, FastAPI
+from sqlalchemy.pool import NullPool
+
+from benchmarks.common import asgi_load, bind_database, summarize, temp_database, user_payload
+from db.instrumentation import instrument_engine
+from repositories.user_repository import UserRepository
+from routes.user_routes import UserRoutes
+from utils.metrics.middleware import HttpMetrics, MetricsMiddleware
+from utils.metrics.registry import MetricsRegistry
+
+
+def build_app(session_factory, instrumented: bool) -> FastAPI:
+    routes = UserRoutes()
+    # The entity cache would hide the SQL side of the instrumentation
+    routes.service.repository.cache = None
+
+    # Bare: the same handler on a plain APIRoute (no threadpool timing wrapper)
+    router = routes.router if instrumented else APIRouter()
+    if not instrumented:
+        router.get("/{id}")(routes.get_user_by_id)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/users")
+    bind_database(app, session_factory)
+    if instrumented:
+        app.add_middleware(MetricsMiddleware, metrics=HttpMetrics(MetricsRegistry()))
+    return app
+
+
+def run(users: int, requests: int, concurrency: int):
+    with temp_database(poolclass=NullPool) as (engine, session_factory):
+        with session_factory() as db:
+            ids = [result.id for result in UserRepository().bulk_create(db, [user_payload(i) for i in range(users)])]
+
+        bare = build_app(session_factory, instrumented=False)
+        # The engine events are only added for the instrumented run
+        rps_bare, latencies_bare = asyncio.run(asgi_load(
+            bare, lambda client: client.get(f"/api/users/{random.choice(ids)}"), requests, concurrency
+        ))
+
+        instrument_engine(engine)
+        instrumented = build_app(session_factory, instrumented=True)
+        rps, latencies = asyncio.run(asgi_load(
+            instrumented, lambda client: client.get(f"/api/users/{random.choice(ids)}"), requests, concurrency
+        ))
+
+    print(f"{requests} x GET /api/users/{{id}}, concurrency {concurrency}")
+    print(f"  bare          {rps_bare:>7.0f} req/s  {summarize(latencies_bare)}")
+    print(f"  instrumented  {rps:>7.0f} req/s  {summarize(latencies)}")
+    print(f"  overhead      {(1 - rps / rps_bare) * 100:>6.1f}% throughput")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    run(args.users, args.requests, args.concurrency)
@@ -0,0 +1,70 @@
+"""
+Loading every user as tracked ORM entities (get_all) against read-only
+Core rows (get_all_readonly), then encoding them like GET /api/users/:
+time and peak Python memory of each path.
+
+    python -m benchmarks.readonly_rows --users 10000 100000 --rounds 3
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.common import Timer, temp_database
+from benchmarks.export_import import seed
+from repositories.user_repository import UserRepository
+from routes.user_routes import USER_JSON
+from services.user_service import PUBLIC_FIELDS
+
+
+def paths(repository: UserRepository) -> dict:
+    return {
+        "orm": lambda db: repository.get_all(db),
+        "readonly": lambda db: repository.get_all_readonly(db),
+        "readonly_public": lambda db: repository.get_all_readonly(db, PUBLIC_FIELDS),
+    }
+
+
+def measure(session_factory, load, rounds: int) -> tuple[float, float, float]:
+    """(seconds to load, seconds to load and encode, peak MB), best of `rounds`"""
+    load_s = total_s = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        # A new session per round: the identity map starts empty
+        with session_factory() as db:
+            with Timer() as loading:
+                rows = load(db)
+            with Timer() as encoding:
+                USER_JSON.dumps_many(rows)
+            del rows
+        load_s = min(load_s, loading.elapsed)
+        total_s = min(total_s, loading.elapsed + encoding.elapsed)
+
+    # Traced apart: tracemalloc slows the allocations down
+    gc.collect()
+    tracemalloc.start()
+    with session_factory() as db:
+        USER_JSON.dumps_many(load(db))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return load_s, total_s, peak / 1e6
+
+
+def run(sizes: list[int], rounds: int):
+    repository = UserRepository()
+    repository.cache = None
+
+    print(f"{'users':>8}  {'path':<17}{'load ms':>9}{'+ json ms':>11}{'peak MB':>9}")
+    for users in sizes:
+        with temp_database() as (_, session_factory):
+            seed(session_factory, users)
+            for name, load in paths(repository).items():
+                load_s, total_s, peak = measure(session_factory, load, rounds)
+                print(f"{users:>8}  {name:<17}{load_s * 1000:>9.0f}{total_s * 1000:>11.0f}{peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    run(args.users, args.rounds)
@@ -0,0 +1,65 @@
+"""
+Per-call cost of UserRepository.get and get_by_email: the legacy
+`db.query(...).filter(...).first()` chain built on each call against the
+statements the repository builds once (bound parameters).
+The entity cache is disabled, every call runs its SELECT.
+
+    python -m benchmarks.repository_statements --users 1000 --calls 20000
+"""
+import argparse
+import random
+
+from benchmarks.common import Timer, temp_database
+from benchmarks.export_import import seed
+from models.user_model import User
+from repositories.user_repository import UserRepository
+
+
+def legacy_get(db, id: int):
+    return db.query(User).filter(User.id == id).first()
+
+
+def legacy_get_by_email(db, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def per_call(fn, db, args: list, rounds: int = 3) -> float:
+    """Best mean seconds per call of fn(db, arg) over `args`"""
+    fn(db, args[0])    # Warm up the compiled cache
+    best = float("inf")
+    for _ in range(rounds):
+        with Timer() as t:
+            for arg in args:
+                fn(db, arg)
+        best = min(best, t.elapsed / len(args))
+    return best
+
+
+def run(users: int, calls: int):
+    repository = UserRepository()
+    repository.cache = None
+    ids = [random.randrange(1, users + 1) for _ in range(calls)]
+    emails = [f"user{id - 1}@example.com" for id in ids]
+
+    with temp_database() as (_, session_factory):
+        seed(session_factory, users)
+        with session_factory() as db:
+            results = {
+                "get": (per_call(legacy_get, db, ids), per_call(repository.get, db, ids)),
+                "get_by_email": (
+                    per_call(legacy_get_by_email, db, emails), per_call(repository.get_by_email, db, emails)
+                ),
+            }
+
+    print(f"{calls} calls, {users} users")
+    print(f"{'method':<14}{'legacy us':>11}{'prebuilt us':>13}{'speedup':>9}")
+    for name, (legacy, prebuilt) in results.items():
+        print(f"{name:<14}{legacy * 1e6:>11.1f}{prebuilt * 1e6:>13.1f}{legacy / prebuilt:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.users, args.calls)
@@ -0,0 +1,72 @@
+"""
+Encoding throughput of a page of users: the response_model path of
+FastAPI against a precompiled TypeAdapter and the direct ResponseSerializer.
+
+    python -m benchmarks.serialization --users 1000 10000 --rounds 20
+"""
+import argparse
+import asyncio
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic import TypeAdapter
+
+from benchmarks.common import Timer
+from models.user_model import RoleEnum, User
+from routes.user_routes import USER_JSON, UserRoutes
+from schemas.user_schema import UserResponseSchema
+
+
+def make_users(count: int) -> list[User]:
+    return [
+        User(id=i, name=f"User {i}", email=f"user{i}@example.com", password="x", role=RoleEnum.Driver)
+        for i in range(count)
+    ]
+
+
+def response_model_path():
+    """What FastAPI does with `response_model=list[UserResponseSchema]`"""
+    route = next(route for route in UserRoutes().router.routes if route.path == "/" and "GET" in route.methods)
+
+    def encode(users):
+        content = asyncio.run(serialize_response(field=route.response_field, response_content=users, is_coroutine=True))
+        return JSONResponse(content).body
+
+    return encode
+
+
+def type_adapter_path():
+    adapter = TypeAdapter(list[UserResponseSchema])
+    return lambda users: adapter.dump_json(adapter.validate_python(users, from_attributes=True))
+
+
+def run(sizes: list[int], rounds: int):
+    paths = {
+        "response_model": response_model_path(),
+        "type_adapter": type_adapter_path(),
+        "direct": USER_JSON.dumps_many,
+    }
+
+    print(f"{'users':>7}  {'path':<16}{'MB/s':>9}{'ms/page':>10}{'speedup':>9}")
+    for size in sizes:
+        users = make_users(size)
+        baseline = None
+        for name, encode in paths.items():
+            body = encode(users)    # Warm up
+            with Timer() as t:
+                for _ in range(rounds):
+                    encode(users)
+            per_page = t.elapsed / rounds
+            baseline = baseline or per_page
+            print(
+                f"{size:>7}  {name:<16}{len(body) / per_page / 1e6:>9.1f}"
+                f"{per_page * 1000:>10.2f}{baseline / per_page:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    run(args.users, args.rounds)
@@ -0,0 +1,125 @@
+"""
+Read throughput of SQLite while writes are in flight, for the default
+settings (rollback journal, synchronous=FULL), the tuned PRAGMAs
+(SENTINEL_SQLITE_*, WAL) and the split read/write engines
+(SENTINEL_DB_SPLIT_READS).
+
+    python -m benchmarks.sqlite_tuning --seconds 5 --readers 8 --writers 2
+"""
+import argparse
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import temp_database, user_payload
+from core.config import settings
+from db.session import configure_sqlite
+from repositories.user_repository import UserRepository
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+
+    def add(self, name: str):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def reader(session_factory, repository, ids, stop, counters):
+    while not stop.is_set():
+        try:
+            with session_factory() as db:
+                repository.get(db, random.choice(ids))
+            counters.add("reads")
+        except OperationalError:
+            counters.add("errors")
+
+
+def writer(session_factory, repository, worker, stop, counters):
+    i = 0
+    while not stop.is_set():
+        try:
+            with session_factory() as db:
+                repository.create(db, user_payload(i, prefix=f"writer{worker}x"))
+            counters.add("writes")
+        except OperationalError:
+            counters.add("errors")
+        i += 1
+
+
+def measure(pragmas, split: bool, users: int, seconds: float, readers: int, writers: int):
+    # The entity cache would answer the reads without touching SQLite
+    repository = UserRepository()
+    repository.cache = None
+
+    with temp_database(pragmas, pool_size=readers + writers) as (engine, session_factory):
+        with session_factory() as db:
+            ids = [result.id for result in repository.bulk_create(db, [user_payload(i) for i in range(users)])]
+
+        read_factory = write_factory = session_factory
+        read_engine = None
+        if split:
+            # Same layout as db.session: one writer connection, query_only readers
+            write_engine = configure_sqlite(create_engine(
+                engine.url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0
+            ), pragmas)
+            read_engine = configure_sqlite(create_engine(
+                engine.url, connect_args={"check_same_thread": False}, pool_size=readers
+            ), pragmas, read_only=True)
+            write_factory = sessionmaker(autoflush=False, expire_on_commit=False, bind=write_engine)
+            read_factory = sessionmaker(autoflush=False, expire_on_commit=False, bind=read_engine)
+
+        counters = Counters()
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=reader, args=(read_factory, repository, ids, stop, counters))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=writer, args=(write_factory, repository, n, stop, counters))
+            for n in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        if split:
+            write_engine.dispose()
+            read_engine.dispose()
+
+    return counters.reads / seconds, counters.writes / seconds, counters.errors
+
+
+def run(users: int, seconds: float, readers: int, writers: int):
+    # Short busy_timeout for the default run, else it only waits longer
+    configurations = {
+        "default": ({"busy_timeout": "100"}, False),
+        "tuned": (settings.sqlite_pragmas, False),
+        "tuned+split": (settings.sqlite_pragmas, True),
+    }
+
+    print(f"{readers} readers, {writers} writers, {seconds:.0f}s over {users} users")
+    print(f"{'config':<13}{'reads/s':>10}{'writes/s':>10}{'errors':>8}")
+    for name, (pragmas, split) in configurations.items():
+        reads, writes, errors = measure(pragmas, split, users, seconds, readers, writers)
+        print(f"{name:<13}{reads:>10.0f}{writes:>10.0f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+    run(args.users, args.seconds, args.readers, args.writers)
@@ -0,0 +1,77 @@
+"""
+Cold start of a worker: each run is a fresh interpreter that imports main,
+starts the app (lifespan: schema setup) and serves its first requests.
+The first start creates the database, the next ones find its schema
+fingerprint and skip the DDL. Reported per phase, in ms.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import percentile
+
+# Run in the child interpreter, prints the timings of its phases as JSON
+CHILD = """
+import json, time
+import httpx  # For the TestClient only, not part of a worker start
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app).__enter__()
+started = time.perf_counter()
+client.get("/api/users/", params={"limit": 10}).raise_for_status()
+first = time.perf_counter()
+client.get("/api/users/", params={"limit": 10}).raise_for_status()
+second = time.perf_counter()
+client.__exit__(None, None, None)
+print(json.dumps({
+    "import": imported - start,
+    "startup": started - imported,
+    "first request": first - started,
+    "second request": second - first,
+}))
+"""
+
+PHASES = ["import", "startup", "first request", "second request"]
+
+
+def start_worker(database_url: str) -> dict[str, float]:
+    env = dict(os.environ, SENTINEL_DATABASE_URL=database_url, SENTINEL_COUNTS_RECONCILE_SECONDS="0")
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def report(label: str, runs: list[dict[str, float]]):
+    phases = "  ".join(
+        f"{phase} p50={percentile([run[phase] for run in runs], 50) * 1000:.1f}ms" for phase in PHASES
+    )
+    print(f"{label:<12} {phases}")
+
+
+def run(runs: int):
+    with tempfile.TemporaryDirectory(prefix="sentinel-bench-") as directory:
+        cold, warm = [], []
+        for i in range(runs):
+            # A new database each time: the schema is created
+            cold.append(start_worker(f"sqlite:///{os.path.join(directory, f'cold{i}.db')}"))
+        warm_url = f"sqlite:///{os.path.join(directory, 'warm.db')}"
+        start_worker(warm_url)
+        for _ in range(runs):
+            warm.append(start_worker(warm_url))
+
+    print(f"{runs} worker starts each, {sys.executable}")
+    report("new database", cold)
+    report("existing", warm)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    run(args.runs)
@@ -0,0 +1,89 @@
+"""
+User search latency: the FTS5 index (BaseRepository.search, ranked) against
+the LIKE '%q%' scan it replaces, at growing table sizes. Also times the
+load of the rows through the index triggers and a rebuild of the index.
+
+    python -m benchmarks.user_search --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import insert, or_, select
+
+from benchmarks.common import Timer, summarize, temp_database
+from db.search import rebuild_search_index
+from models.user_model import User
+from repositories.user_repository import UserRepository
+
+FIRST = ["Ana", "José", "John", "Maria", "Luis", "Carmen", "Pedro", "Lucia", "Jorge", "Elena", "Diego", "Sofia"]
+SYLLABLES = ["ro", "dri", "gue", "mar", "tin", "lo", "pez", "san", "cho", "var", "gas", "mo", "re", "no", "ca", "sti"]
+
+# (label, search text): a common first name, a rare last name, two words, a miss
+QUERIES = [("common", "mar"), ("rare", "rodrigue"), ("two words", "jose lopez"), ("no match", "zzyzx")]
+
+
+def last_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def load(engine, size: int, rng: random.Random) -> float:
+    """Insert `size` users through the triggers, return the seconds it took"""
+    batch = 10_000
+    with Timer() as t, engine.begin() as conn:
+        for start in range(0, size, batch):
+            rows = []
+            for i in range(start, min(start + batch, size)):
+                first, last = rng.choice(FIRST), last_name(rng)
+                rows.append({
+                    "name": f"{first} {last}",
+                    "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+                    "password": "x",
+                    "role": "Driver",
+                })
+            conn.execute(insert(User.__table__), rows)
+    return t.elapsed
+
+
+def like_scan(db, text: str, limit: int):
+    """What a search without the index does: LIKE scans every name and email"""
+    pattern = f"%{text.split()[0]}%"
+    stmt = select(User.id, User.name, User.email).where(or_(User.name.like(pattern), User.email.like(pattern))).limit(limit)
+    return db.execute(stmt).all()
+
+
+def timed(fn, rounds: int) -> list[float]:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(sizes: list[int], rounds: int, limit: int):
+    repository = UserRepository()
+    repository.cache = None
+    for size in sizes:
+        with temp_database() as (engine, session_factory):
+            load_seconds = load(engine, size, random.Random(size))
+            with Timer() as rebuild, engine.begin() as conn:
+                rebuild_search_index(conn, User.__table__.info["search_index"])
+
+            print(f"{size} users: load {load_seconds:.2f}s through the triggers, index rebuild {rebuild.elapsed:.2f}s")
+            with session_factory() as db:
+                for label, text in QUERIES:
+                    found = len(repository.search(db, text, limit).items)
+                    fts = timed(lambda: repository.search(db, text, limit, columns=("name", "email")), rounds)
+                    scan = timed(lambda: like_scan(db, text, limit), rounds)
+                    print(f"  {label:<10} {text!r:<13} {found:>3} found  fts {summarize(fts)}")
+                    print(f"  {'':<10} {'':<13} {'':>9}  like {summarize(scan)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.rounds, args.limit)
@@ -0,0 +1,77 @@
+"""
+Users per role: the counts maintained by triggers against a GROUP BY and
+against loading every user to count them (what the dashboard did), at
+growing table sizes. Also the cost of the count triggers on inserts.
+
+    python -m benchmarks.user_stats --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+
+from sqlalchemy import func, insert, select, text
+
+from benchmarks.common import Timer, summarize, temp_database
+from db.group_counts import count_triggers, reconcile_counts
+from models.user_model import RoleEnum, User
+from repositories.user_repository import UserRepository
+from services.user_service import user_stats
+
+ROLES = [role.name for role in RoleEnum]
+
+
+def load(engine, size: int) -> float:
+    """Insert `size` users, return the seconds it took"""
+    rng = random.Random(size)
+    with Timer() as t, engine.begin() as conn:
+        for start in range(0, size, 10_000):
+            conn.execute(insert(User.__table__), [
+                {"name": f"User {i}", "email": f"user{i}@example.com", "password": "x", "role": rng.choice(ROLES)}
+                for i in range(start, min(start + 10_000, size))
+            ])
+    return t.elapsed
+
+
+def timed(fn, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        with Timer() as t:
+            fn()
+        samples.append(t.elapsed)
+    return samples
+
+
+def run(sizes: list[int], rounds: int):
+    repository = UserRepository()
+    repository.cache = None
+
+    for size in sizes:
+        with temp_database() as (engine, session_factory):
+            with_triggers = load(engine, size)
+        with temp_database() as (engine, session_factory):
+            with engine.begin() as conn:
+                for name in ("insert", "delete", "update"):
+                    conn.execute(text(f"DROP TRIGGER users_role_counts_{name}"))
+            without_triggers = load(engine, size)
+            with engine.begin() as conn:
+                for statement in count_triggers("users", "role"):
+                    conn.execute(text(statement))
+                reconcile_counts(conn, User.__table__.info["counts"][0])
+
+            print(f"{size} users: insert {without_triggers:.2f}s, {with_triggers:.2f}s with the count triggers")
+            with session_factory() as db:
+                group_by = select(User.role, func.count()).group_by(User.role)
+                counted = timed(lambda: user_stats(repository.counts(db, "role")), rounds)
+                grouped = timed(lambda: db.execute(group_by).all(), rounds)
+                print(f"  counts table    {summarize(counted)}")
+                print(f"  GROUP BY role   {summarize(grouped)}")
+                if size <= 100_000:
+                    everyone = timed(lambda: len(repository.get_all_readonly(db, ("role",))), max(1, rounds // 10))
+                    print(f"  load every user {summarize(everyone)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.rounds)
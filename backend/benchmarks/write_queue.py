@@ -0,0 +1,78 @@
+"""
+Concurrent profile updates committed one by one against the group-commit
+write queue (SENTINEL_WRITE_QUEUE_TABLES).
+
+    python -m benchmarks.write_queue --writers 32 --updates 2000
+"""
+import argparse
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.common import Timer, percentile, temp_database, user_payload
+from core.config import settings
+from db.write_queue import WriteQueue
+from repositories.user_repository import UserRepository
+
+
+def measure(queued: bool, users: int, updates: int, writers: int, max_batch: int, max_delay: float):
+    repository = UserRepository()
+    repository.cache = None
+
+    # A short busy_timeout: without the queue, writers give up on the lock
+    pragmas = {**settings.sqlite_pragmas, "busy_timeout": "200"}
+    with temp_database(pragmas, pool_size=writers) as (engine, session_factory):
+        with session_factory() as db:
+            ids = [result.id for result in repository.bulk_create(db, [user_payload(i) for i in range(users)])]
+
+        if queued:
+            repository.write_queue = WriteQueue(session_factory, max_batch, max_delay)
+
+        errors = 0
+        latencies = []
+
+        def update(i: int):
+            nonlocal errors
+            with Timer() as t:
+                try:
+                    with session_factory() as db:
+                        repository.update(db, {"name": f"Renamed {i}"}, random.choice(ids))
+                except OperationalError:
+                    errors += 1
+            latencies.append(t.elapsed)
+
+        with Timer() as total:
+            with ThreadPoolExecutor(writers) as pool:
+                list(pool.map(update, range(updates)))
+
+        stats = repository.write_queue.stats() if queued else None
+        if queued:
+            repository.write_queue.shutdown()
+
+    return updates / total.elapsed, latencies, errors, stats
+
+
+def run(users: int, updates: int, writers: int, max_batch: int, max_delay_ms: float):
+    print(f"{updates} updates from {writers} threads over {users} users")
+    print(f"{'mode':<8}{'updates/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'batch':>7}{'wait ms':>9}")
+    for queued in (False, True):
+        rate, latencies, errors, stats = measure(queued, users, updates, writers, max_batch, max_delay_ms / 1000)
+        batch = f"{stats.mean_batch_size:.1f}" if stats else "-"
+        wait = f"{stats.mean_wait_seconds * 1000:.2f}" if stats else "-"
+        print(
+            f"{'queue' if queued else 'direct':<8}{rate:>11.0f}"
+            f"{percentile(latencies, 50) * 1000:>9.1f}{percentile(latencies, 99) * 1000:>9.1f}"
+            f"{errors:>8}{batch:>7}{wait:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=settings.write_queue_max_batch)
+    parser.add_argument("--max-delay-ms", type=float, default=settings.write_queue_max_delay_ms)
+    args = parser.parse_args()
+    run(args.users, args.updates, args.writers, args.max_batch, args.max_delay_ms)
@@ -0,0 +1,8 @@
+from core.config import settings
+from utils.admission import AdmissionController, parse_pools, parse_routes
+
+# Concurrency limits of the /api requests, applied by AdmissionMiddleware
+admission_controller = AdmissionController(
+    parse_pools(settings.admission_pools),
+    parse_routes(settings.admission_routes),
+)
@@ -0,0 +1,15 @@
+from core.config import settings
+from db.batch_loader import BatchLoader, LoadMany
+from db.session import ReadSessionLocal
+
+
+def batch_loader_for(table_name: str, load_many: LoadMany) -> BatchLoader | None:
+    """
+    Batch loader of the lookups by id of the repository of `table_name`,
+    None if each lookup runs its own query (not in SENTINEL_BATCH_LOAD_TABLES)
+    """
+    if table_name not in settings.batch_load_tables:
+        return None
+    return BatchLoader(
+        ReadSessionLocal, load_many, settings.batch_load_max_batch, settings.batch_load_max_delay_ms / 1000
+    )
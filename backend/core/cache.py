@@ -0,0 +1,11 @@
+from core.config import settings
+from utils.cache.backend import CacheBackend
+from utils.cache.memory import InMemoryCache
+
+# Backend shared by the repositories, None when the cache is disabled.
+# Replace it with a shared store to keep several workers coherent.
+cache_backend: CacheBackend | None = (
+    InMemoryCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+    if settings.cache_enabled
+    else None
+)
@@ -0,0 +1,6 @@
+from core.config import settings
+from utils.change_feed import ChangeFeed
+
+# Changes of the users, published by the user services once committed,
+# streamed at /api/users/stream
+user_changes = ChangeFeed(settings.change_feed_history, settings.change_feed_buffer)
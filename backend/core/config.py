@@ -0,0 +1,149 @@
+import os
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(f"SENTINEL_{name}", default)
+
+
+def _flag(name: str, default: str) -> bool:
+    return _env(name, default).lower() in ("1", "true", "yes")
+
+
+class Settings:
+    """
+    Application settings, read once from SENTINEL_* environment variables.
+    - database_url:         (str) sync SQLAlchemy URL
+    - async_database_url:   (str) async SQLAlchemy URL, derived from database_url by default
+    - db_mode:              (str) "sync" (threadpool handlers) or "async" (AsyncSession handlers)
+    - db_pool_size, db_max_overflow, db_pool_timeout: connection pool of the engine
+    - db_split_reads:       (bool) read-only engine for GETs and a single-connection writer engine
+    - sqlite_pragmas:       (dict) PRAGMAs run on each new SQLite connection
+    - write_queue_tables:   (set) tables whose repository commits through the group-commit
+                              write queue, "users,..." (empty: every write commits on its own)
+    - write_queue_max_batch:    (int) writes per group commit
+    - write_queue_max_delay_ms: (float) time a write may wait for others to join its commit
+    - batch_load_tables:    (set) tables whose repository merges the concurrent lookups by id
+                              of `get` into one query, "users,..." (empty: one query per lookup)
+    - batch_load_max_batch:     (int) ids per merged query
+    - batch_load_max_delay_ms:  (float) time a lookup may wait for others to join its query
+    - change_feed_history:  (int) user change events kept, a stream can resume from any of them
+    - change_feed_buffer:   (int) events a stream may fall behind before it is dropped
+    - sse_heartbeat_seconds: (float) comment sent on an idle stream, keeps proxies from closing it
+    - idempotency_enabled:  (bool) replay the response of a mutation retried with the same Idempotency-Key
+    - idempotency_max_entries: (int) responses kept for replay
+    - idempotency_ttl_seconds: (float) time a key can be retried
+    - idempotency_max_body_bytes: (int) larger responses are not kept (their retries run again)
+    - idempotency_excluded_paths: (set) paths never replayed, "/api/users/login,...": their
+                              responses hold secrets (access tokens)
+    - counts_reconcile_seconds: (float) interval of the GROUP BY check of the users per role, 0 to disable
+    - admission_enabled:    (bool) per-route concurrency limits, 503 + Retry-After when full.
+                              Off by default: size admission_pools to the deployment first
+                              (with the defaults, over 24 concurrent list/search requests get 503s)
+    - admission_pools:      (str) "name:limit:max_queue:max_wait_seconds,..." the pools of requests
+    - admission_routes:     (str) "METHOD /path=pool,..." the other /api requests use the "default" pool
+    - query_budget:         (int) SQL statements a request may run before it is logged with them, 0 to disable
+    - query_budget_routes:  (str) "METHOD /path=statements,..." budgets of routes that differ from query_budget
+    - metrics_enabled:      (bool) per-request instrumentation and the /metrics endpoint
+    - server_timing:        (bool) Server-Timing header on every response (needs metrics_enabled)
+    - cache_enabled:        (bool) read-through entity cache in the repositories
+    - cache_max_entries:    (int) LRU bound of the in-process cache
+    - cache_ttl_seconds:    (float) validity of a cached entry
+    - password_hash_workers:  (int) scrypt computations running at the same time
+    - password_hash_executor: (str) "thread" or "process"
+    - scrypt_n, scrypt_r, scrypt_p: (int) scrypt work factor, changing it
+                              rehashes each password on its next login
+    - token_keys:           (dict) HMAC keys of the access tokens, "kid:secret,kid2:secret2"
+    - token_active_kid:     (str) key that signs new tokens, the first one by default
+    - token_keys_file:      (str) JSON keys file re-read when it changes (rotation without restart)
+    - token_ttl_seconds:    (int) lifetime of an access token
+    """
+
+    def __init__(self):
+        self.database_url = _env("DATABASE_URL", "sqlite:///./sentinel.db")
+        self.async_database_url = _env(
+            "ASYNC_DATABASE_URL",
+            self.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        )
+
+        self.db_mode = _env("DB_MODE", "sync").lower()
+        if self.db_mode not in ("sync", "async"):
+            raise ValueError(f"SENTINEL_DB_MODE must be 'sync' or 'async', not {self.db_mode!r}")
+
+        self.db_pool_size = int(_env("DB_POOL_SIZE", "10"))
+        self.db_max_overflow = int(_env("DB_MAX_OVERFLOW", "20"))
+        self.db_pool_timeout = float(_env("DB_POOL_TIMEOUT", "30"))
+        self.db_split_reads = _flag("DB_SPLIT_READS", "false")
+
+        # WAL: readers do not block on the writer. synchronous=NORMAL is
+        # durable in WAL mode except for the last commits on power loss.
+        # An empty value disables a PRAGMA.
+        self.sqlite_pragmas = {
+            name: value
+            for name, value in {
+                "journal_mode": _env("SQLITE_JOURNAL_MODE", "WAL"),
+                "synchronous": _env("SQLITE_SYNCHRONOUS", "NORMAL"),
+                "cache_size": _env("SQLITE_CACHE_SIZE", "-65536"),      # KiB when negative: 64 MiB
+                "mmap_size": _env("SQLITE_MMAP_SIZE", "268435456"),     # 256 MiB
+                "busy_timeout": _env("SQLITE_BUSY_TIMEOUT", "5000"),    # ms
+                "temp_store": _env("SQLITE_TEMP_STORE", "MEMORY"),
+            }.items()
+            if value
+        }
+
+        self.write_queue_tables = {name.strip() for name in _env("WRITE_QUEUE_TABLES", "").split(",") if name.strip()}
+        self.write_queue_max_batch = int(_env("WRITE_QUEUE_MAX_BATCH", "64"))
+        self.write_queue_max_delay_ms = float(_env("WRITE_QUEUE_MAX_DELAY_MS", "2"))
+
+        self.batch_load_tables = {name.strip() for name in _env("BATCH_LOAD_TABLES", "").split(",") if name.strip()}
+        self.batch_load_max_batch = int(_env("BATCH_LOAD_MAX_BATCH", "256"))
+        self.batch_load_max_delay_ms = float(_env("BATCH_LOAD_MAX_DELAY_MS", "1"))
+
+        self.change_feed_history = int(_env("CHANGE_FEED_HISTORY", "1000"))
+        self.change_feed_buffer = int(_env("CHANGE_FEED_BUFFER", "256"))
+        self.sse_heartbeat_seconds = float(_env("SSE_HEARTBEAT_SECONDS", "15"))
+
+        self.idempotency_enabled = _flag("IDEMPOTENCY_ENABLED", "true")
+        self.idempotency_max_entries = int(_env("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+        self.idempotency_ttl_seconds = float(_env("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.idempotency_max_body_bytes = int(_env("IDEMPOTENCY_MAX_BODY_BYTES", str(64 * 1024)))
+        self.idempotency_excluded_paths = {
+            path.strip() for path in _env("IDEMPOTENCY_EXCLUDED_PATHS", "/api/users/login").split(",") if path.strip()
+        }
+
+        self.counts_reconcile_seconds = float(_env("COUNTS_RECONCILE_SECONDS", "3600"))
+
+        # Limits of the sync pools add up to 32, below the 40 threadpool workers:
+        # a login always finds a thread, whatever floods the list pool
+        self.admission_enabled = _flag("ADMISSION_ENABLED", "false")
+        self.admission_pools = _env("ADMISSION_POOLS", "critical:8:64:5,default:16:64:2,list:8:16:1,stream:100:0:0")
+        self.admission_routes = _env(
+            "ADMISSION_ROUTES",
+            "POST /api/users/login=critical,GET /api/users/me=critical,"
+            "GET /api/users/=list,GET /api/users/search=list,GET /api/users/export=list,GET /api/users/stream=stream",
+        )
+
+        self.query_budget = int(_env("QUERY_BUDGET", "0"))
+        self.query_budget_routes = _env("QUERY_BUDGET_ROUTES", "")
+
+        self.metrics_enabled = _flag("METRICS_ENABLED", "true")
+        self.server_timing = _flag("SERVER_TIMING", "true")
+
+        self.cache_enabled = _flag("CACHE_ENABLED", "true")
+        self.cache_max_entries = int(_env("CACHE_MAX_ENTRIES", "10000"))
+        self.cache_ttl_seconds = float(_env("CACHE_TTL_SECONDS", "60"))
+
+        self.password_hash_workers = int(_env("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.password_hash_executor = _env("PASSWORD_HASH_EXECUTOR", "thread").lower()
+        self.scrypt_n = int(_env("SCRYPT_N", str(2 ** 14)))
+        self.scrypt_r = int(_env("SCRYPT_R", "8"))
+        self.scrypt_p = int(_env("SCRYPT_P", "1"))
+
+        self.token_keys = dict(
+            item.split(":", 1) for item in _env("TOKEN_KEYS", "").split(",") if ":" in item
+        )
+        self.token_active_kid = _env("TOKEN_ACTIVE_KID", "") or None
+        self.token_keys_file = _env("TOKEN_KEYS_FILE", "") or None
+        self.token_ttl_seconds = int(_env("TOKEN_TTL_SECONDS", "3600"))
+
+
+settings = Settings()
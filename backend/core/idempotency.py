@@ -0,0 +1,10 @@
+from core.config import settings
+from utils.cache.memory import InMemoryCache
+from utils.idempotency import IdempotencyStore
+
+# Responses of the mutations sent with an Idempotency-Key, replayed to
+# their retries. Per process, like the entity cache: give it a shared
+# CacheBackend to replay across several workers.
+idempotency_store = IdempotencyStore(
+    InMemoryCache(settings.idempotency_max_entries, settings.idempotency_ttl_seconds)
+)
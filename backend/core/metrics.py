@@ -0,0 +1,95 @@
+import anyio.to_thread
+
+from core.admission import admission_controller
+from core.cache import cache_backend
+from core.change_feed import user_changes
+from core.idempotency import idempotency_store
+from core.reconcile import reconcile_job
+from core.write_queue import write_queue
+from db.write_queue import BATCH_SIZE_BUCKETS
+from utils.metrics.middleware import HttpMetrics
+from utils.metrics.registry import MetricsRegistry, histogram_samples
+
+# Registry exposed at /metrics
+registry = MetricsRegistry()
+http_metrics = HttpMetrics(registry)
+
+
+@registry.collector
+def _threadpool():
+    # Read on the event loop (the /metrics handler is async)
+    statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+    yield "threadpool_threads_busy", "Worker threads running a sync handler", "gauge", [({}, statistics.borrowed_tokens)]
+    yield "threadpool_tasks_waiting", "Sync handlers waiting for a worker thread", "gauge", [({}, statistics.tasks_waiting)]
+
+
+@registry.collector
+def _cache():
+    if cache_backend is None:
+        return
+    stats = cache_backend.stats()
+    yield "entity_cache_hits_total", "Entity cache hits", "counter", [({}, stats.hits)]
+    yield "entity_cache_misses_total", "Entity cache misses", "counter", [({}, stats.misses)]
+    yield "entity_cache_evictions_total", "Entity cache entries evicted by the size bound", "counter", [({}, stats.evictions)]
+    yield "entity_cache_entries", "Entity cache size", "gauge", [({}, stats.size)]
+
+
+@registry.collector
+def _write_queue():
+    if write_queue is None:
+        return
+    stats = write_queue.stats()
+    yield "write_queue_batches_total", "Group commits", "counter", [({}, stats.batches)]
+    yield "write_queue_writes_total", "Writes committed through the queue", "counter", [({}, stats.writes)]
+    yield "write_queue_failed_total", "Writes that raised", "counter", [({}, stats.failed)]
+    yield "write_queue_batch_size", "Writes per group commit", "histogram", histogram_samples(
+        BATCH_SIZE_BUCKETS, stats.batch_sizes, stats.writes
+    )
+    yield "write_queue_wait_seconds_total", "Time writes waited for their batch", "counter", [({}, stats.wait_seconds)]
+    yield "write_queue_max_wait_seconds", "Longest wait for a batch", "gauge", [({}, stats.max_wait_seconds)]
+    yield "write_queue_depth", "Writes waiting", "gauge", [({}, stats.depth)]
+
+
+@registry.collector
+def _change_feed():
+    stats = user_changes.stats()
+    yield "change_feed_events_total", "User change events published", "counter", [({}, stats.published)]
+    yield "change_feed_subscribers", "Open change streams", "gauge", [({}, stats.subscribers)]
+    yield "change_feed_dropped_total", "Change streams dropped for falling behind", "counter", [({}, stats.dropped)]
+
+
+@registry.collector
+def _idempotency():
+    stats = idempotency_store.stats()
+    yield "idempotency_replays_total", "Retried mutations answered with the stored response", "counter", [({}, stats.replayed)]
+    yield "idempotency_waits_total", "Retried mutations that waited for the first request", "counter", [({}, stats.waited)]
+    yield "idempotency_mismatches_total", "Idempotency keys reused with another request", "counter", [({}, stats.mismatched)]
+    yield "idempotency_too_large_total", "Keyed responses not stored, over the body size limit", "counter", [({}, stats.too_large)]
+    yield "idempotency_in_flight", "Keyed mutations running", "gauge", [({}, stats.in_flight)]
+
+
+@registry.collector
+def _admission():
+    stats = {name: pool.stats() for name, pool in admission_controller.pools.items()}
+    yield "admission_active_requests", "Requests running per admission pool", "gauge", [
+        ({"pool": name}, pool.active) for name, pool in stats.items()
+    ]
+    yield "admission_queue_depth", "Requests waiting for a slot per admission pool", "gauge", [
+        ({"pool": name}, pool.queued) for name, pool in stats.items()
+    ]
+    yield "admission_admitted_total", "Requests admitted per admission pool", "counter", [
+        ({"pool": name}, pool.admitted) for name, pool in stats.items()
+    ]
+    yield "admission_rejected_total", "Requests rejected with a 503 per admission pool", "counter", [
+        ({"pool": name, "reason": reason}, count)
+        for name, pool in stats.items()
+        for reason, count in (("queue_full", pool.queue_full), ("timed_out", pool.timed_out))
+    ]
+
+
+@registry.collector
+def _reconcile():
+    stats = reconcile_job.stats()
+    yield "counts_reconcile_runs_total", "Checks of the users per role against a GROUP BY", "counter", [({}, stats.runs)]
+    yield "counts_reconcile_failures_total", "Checks of the users per role that failed", "counter", [({}, stats.failures)]
+    yield "counts_drifted_roles", "Roles whose count had drifted at the last check", "gauge", [({}, stats.last_result or 0)]
@@ -0,0 +1,25 @@
+import logging
+
+from core.config import settings
+from db.session import SessionLocal
+from repositories.user_repository import UserRepository
+from utils.periodic import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_user_counts() -> int:
+    """
+    Recompute the users per role with a GROUP BY and fix the maintained
+    counts. Return the number of roles that had drifted (0: the triggers
+    kept them exact).
+    """
+    with SessionLocal() as db:
+        drift = UserRepository().reconcile_counts(db, "role")
+    if drift:
+        logger.warning("User counts per role drifted, fixed: %s", drift)
+    return len(drift)
+
+
+# Started by main when SENTINEL_COUNTS_RECONCILE_SECONDS > 0
+reconcile_job = PeriodicJob("reconcile-user-counts", settings.counts_reconcile_seconds, reconcile_user_counts)
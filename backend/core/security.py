@@ -0,0 +1,61 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from core.config import settings
+from utils.security.password_hasher import PasswordHasher
+from utils.security.tokens import InvalidTokenError, TokenClaims, TokenKeyring, TokenSigner
+
+# Shared by the services, hashing runs on its own bounded executor
+password_hasher = PasswordHasher(
+    n=settings.scrypt_n,
+    r=settings.scrypt_r,
+    p=settings.scrypt_p,
+    max_workers=settings.password_hash_workers,
+    executor=settings.password_hash_executor,
+)
+
+token_signer = TokenSigner(
+    TokenKeyring(settings.token_keys, settings.token_active_kid, settings.token_keys_file),
+    ttl=settings.token_ttl_seconds,
+)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)],
+) -> TokenClaims:
+    """
+    Dependency that authenticates the request from its bearer token.
+    Only the signature, expiry and revocation list are checked: no query.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        return token_signer.verify(credentials.credentials)
+    except InvalidTokenError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(exc),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# Create alias for authenticated requests
+CurrentUser = Annotated[TokenClaims, Depends(get_current_user)]
+
+
+def require_roles(*roles: str):
+    """Dependency factory that only lets the given roles through"""
+    def dependency(claims: CurrentUser) -> TokenClaims:
+        if claims.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        return claims
+    return dependency
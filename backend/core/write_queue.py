@@ -0,0 +1,16 @@
+from core.config import settings
+from db.session import SessionLocal
+from db.write_queue import WriteQueue
+
+# Group-commit queue shared by the repositories of SENTINEL_WRITE_QUEUE_TABLES,
+# None when no table uses it
+write_queue: WriteQueue | None = (
+    WriteQueue(SessionLocal, settings.write_queue_max_batch, settings.write_queue_max_delay_ms / 1000)
+    if settings.write_queue_tables
+    else None
+)
+
+
+def write_queue_for(table_name: str) -> WriteQueue | None:
+    """The write queue of the repository of `table_name`, None if its writes commit on their own"""
+    return write_queue if table_name in settings.write_queue_tables else None
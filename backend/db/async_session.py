@@ -0,0 +1,40 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.config import settings
+from db.instrumentation import instrument_engine
+from db.session import begin_immediate, configure_sqlite
+
+# Needs the aiosqlite driver, only imported when SENTINEL_DB_MODE=async
+SQLALCHEMY_ASYNC_DATABASE_URL = settings.async_database_url
+
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+)
+if async_engine.dialect.name == "sqlite":
+    configure_sqlite(async_engine.sync_engine, settings.sqlite_pragmas)
+if settings.metrics_enabled:
+    instrument_engine(async_engine.sync_engine)
+
+# Objects stay loaded after commit: an expired attribute can not lazy load
+# outside of an await
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Sessions of the handlers that write, with BEGIN IMMEDIATE (see begin_immediate)
+AsyncWriteSessionLocal = async_sessionmaker(
+    bind=begin_immediate(async_engine), class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_write_db():
+    async with AsyncWriteSessionLocal() as db:
+        yield db
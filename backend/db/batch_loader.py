@@ -0,0 +1,155 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+# Loads many keys at once: fn(db, keys) -> {key: value}, missing keys left out
+LoadMany = Callable[[Session, list], dict]
+
+_STOP = object()
+
+
+@dataclass
+class BatchLoaderStats:
+    """
+    Counters of a BatchLoader.
+    - batches:          (int) queries run
+    - lookups:          (int) keys asked for
+    - shared:           (int) lookups that joined one already waiting for the same key
+    - max_batch_size:   (int) most keys in one query
+    - depth:            (int) keys currently waiting for their query
+    """
+    batches: int = 0
+    lookups: int = 0
+    shared: int = 0
+    max_batch_size: int = 0
+    depth: int = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return (self.lookups - self.shared) / self.batches if self.batches else 0.0
+
+
+class BatchLoader:
+    """
+    DataLoader-style coalescing of lookups by key: the keys asked for by
+    concurrent requests within `max_delay` seconds (or `max_batch` of them)
+    are loaded by one thread with a single query, e.g. WHERE id IN (...).
+
+    A lookup of a key that is already waiting joins it (single flight):
+    both callers get the same value. Once the query of a batch started, a
+    new lookup of one of its keys waits for the next batch, so a lookup
+    always sees the writes committed before it was made.
+
+    Values are shared between callers: load immutable ones (Core Rows).
+    The queries run on the loader's sessions, outside of the requests,
+    and are not counted in their stats.
+
+    Params:
+        - session_factory: sessions of the loader (one per batch)
+        - load_many: fn(db, keys) -> {key: value}
+        - max_batch: (int) keys per query
+        - max_delay: (float) seconds a lookup may wait for others to join its batch
+    """
+
+    def __init__(self, session_factory: sessionmaker, load_many: LoadMany, max_batch: int = 256, max_delay: float = 0.001):
+        self.session_factory = session_factory
+        self.load_many = load_many
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        # key -> future of the lookup waiting for its batch
+        self._waiting: dict[Hashable, Future] = {}
+        self._stats = BatchLoaderStats()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def load(self, key: Hashable) -> Any:
+        """Value of `key` (None if missing), block until its batch is loaded"""
+        return self.load_future(key).result()
+
+    async def load_async(self, key: Hashable) -> Any:
+        """Same as load, without blocking the event loop"""
+        return await asyncio.wrap_future(self.load_future(key))
+
+    def load_future(self, key: Hashable) -> Future:
+        self._ensure_started()
+        with self._lock:
+            self._stats.lookups += 1
+            future = self._waiting.get(key)
+            if future is not None:
+                self._stats.shared += 1
+                return future
+            future = self._waiting[key] = Future()
+        self._queue.put((key, time.monotonic()))
+        return future
+
+    def stats(self) -> BatchLoaderStats:
+        with self._lock:
+            return BatchLoaderStats(
+                batches=self._stats.batches,
+                lookups=self._stats.lookups,
+                shared=self._stats.shared,
+                max_batch_size=self._stats.max_batch_size,
+                depth=len(self._waiting),
+            )
+
+    def shutdown(self):
+        """Load the keys already waiting, then stop the loader thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="batch-loader", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            keys = [first[0]]
+            deadline = first[1] + self.max_delay
+            while len(keys) < self.max_batch:
+                try:
+                    pending = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if pending is _STOP:
+                    stopping = True
+                    break
+                keys.append(pending[0])
+
+            self._load(keys)
+
+    def _load(self, keys: list):
+        # Later lookups of these keys start a new batch from here on
+        with self._lock:
+            futures = [(key, self._waiting.pop(key)) for key in keys]
+            self._stats.batches += 1
+            self._stats.max_batch_size = max(self._stats.max_batch_size, len(keys))
+
+        try:
+            with self.session_factory() as db:
+                values = self.load_many(db, keys)
+        except Exception as exc:
+            for _, future in futures:
+                future.set_exception(exc)
+            return
+
+        for key, future in futures:
+            future.set_result(values.get(key))
+
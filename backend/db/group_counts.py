@@ -0,0 +1,84 @@
+from sqlalchemy import Column, DDL, Integer, Table, event, select, func
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from db.session import Base
+
+
+def count_triggers(table_name: str, column: str) -> list[str]:
+    """CREATE TRIGGER statements keeping the row count of each `column` value in `<table>_<column>_counts`"""
+    counts = f"{table_name}_{column}_counts"
+    prefix = f"CREATE TRIGGER IF NOT EXISTS {counts}"
+
+    def add(row: str) -> str:
+        return (
+            f"INSERT INTO {counts} ({column}, count) SELECT {row}.{column}, 1 WHERE {row}.{column} IS NOT NULL "
+            f"ON CONFLICT ({column}) DO UPDATE SET count = count + 1;"
+        )
+
+    def remove(row: str) -> str:
+        return f"UPDATE {counts} SET count = count - 1 WHERE {column} = {row}.{column};"
+
+    return [
+        f"{prefix}_insert AFTER INSERT ON {table_name} BEGIN {add('new')} END",
+        f"{prefix}_delete AFTER DELETE ON {table_name} BEGIN {remove('old')} END",
+        f"{prefix}_update AFTER UPDATE OF {column} ON {table_name} "
+        f"WHEN old.{column} IS NOT new.{column} BEGIN {remove('old')} {add('new')} END",
+    ]
+
+
+def count_by(table: Table, column: str) -> Table:
+    """
+    Maintain the number of rows of `table` per value of `column` in a small
+    table (`<table>_<column>_counts`), updated by triggers in the
+    transaction of each write: reading the counts costs a few rows, not a
+    scan. NULL values are not counted.
+
+    Created with the table, and by init_schema on databases created before
+    (which then fills it from the stored rows, see reconcile_counts).
+    """
+    source = table.c[column]
+    counts = Table(
+        f"{table.name}_{column}_counts",
+        Base.metadata,
+        Column(column, source.type, primary_key=True),
+        Column("count", Integer, nullable=False),
+    )
+    counts.info["counted"] = source
+
+    statements = count_triggers(table.name, column)
+    table.info.setdefault("triggers", []).extend(statements)
+    table.info.setdefault("counts", []).append(counts)
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement))
+    return counts
+
+
+def read_counts(db: Session | Connection, counts: Table) -> dict:
+    """{value: rows} of a count_by table, values without rows left out"""
+    key = counts.c[counts.info["counted"].name]
+    return {value: count for value, count in db.execute(select(key, counts.c.count)) if count}
+
+
+def reconcile_counts(db: Session | Connection, counts: Table) -> dict:
+    """
+    Recompute a count_by table with a GROUP BY over its source table and
+    store the result, in the transaction of `db` (the caller commits).
+    Return the drift found: {value: (stored, actual)}, empty when the
+    triggers kept it exact.
+    """
+    source = counts.info["counted"]
+    key = counts.c[source.name]
+    actual = dict(db.execute(select(source, func.count()).where(source.is_not(None)).group_by(source)).all())
+    stored = read_counts(db, counts)
+
+    drift = {
+        value: (stored.get(value, 0), actual.get(value, 0))
+        for value in stored.keys() | actual.keys()
+        if stored.get(value, 0) != actual.get(value, 0)
+    }
+    if drift:
+        db.execute(counts.delete())
+        if actual:
+            db.execute(counts.insert(), [{key.name: value, "count": count} for value, count in actual.items()])
+    return drift
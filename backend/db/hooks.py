@@ -0,0 +1,45 @@
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def after_commit(db: Session, callback: Callable[[], None]):
+    """
+    Run `callback` once the current transaction of `db` is committed.
+    It is discarded if the transaction is rolled back instead.
+    Works for AsyncSession too, through its `sync_session`.
+
+    Inside a SAVEPOINT (begin_nested) the callback waits for the outer
+    transaction: releasing the SAVEPOINT commits nothing yet, rolling it
+    back only discards the callbacks registered inside it.
+    """
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault(_AFTER_COMMIT, []).append((transaction, callback))
+
+
+# Session fires after_commit / after_rollback for the SAVEPOINTs as well,
+# the nested transaction being ended is still the current one then
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session):
+    nested = session.get_nested_transaction()
+    if nested is not None:
+        # Released: its callbacks now belong to the enclosing transaction
+        callbacks = session.info.get(_AFTER_COMMIT, [])
+        callbacks[:] = [(nested.parent if owner is nested else owner, callback) for owner, callback in callbacks]
+        return
+    for _, callback in session.info.pop(_AFTER_COMMIT, []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session: Session):
+    nested = session.get_nested_transaction()
+    if nested is not None:
+        callbacks = session.info.get(_AFTER_COMMIT, [])
+        callbacks[:] = [(owner, callback) for owner, callback in callbacks if owner is not nested]
+        return
+    session.info.pop(_AFTER_COMMIT, None)
@@ -0,0 +1,42 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metrics.request_stats import current_request_stats
+
+_STARTED = "query_started_at"
+
+# Transaction control is timed but not counted as a query
+TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Count the statements of `engine` and their duration into the stats of
+    the request running them (see MetricsMiddleware). Statements outside
+    of a request (startup) are not counted, the writes of the write queue
+    are counted for the request that submitted them.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_STARTED].pop()
+        stats = current_request_stats()
+        if stats is not None:
+            if not statement.startswith(TRANSACTION_STATEMENTS):
+                stats.queries += 1
+            stats.db_seconds += time.perf_counter() - started
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # after_cursor_execute is skipped when the statement fails
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_STARTED):
+            conn.info[_STARTED].pop()
+
+    return engine
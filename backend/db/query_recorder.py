@@ -0,0 +1,102 @@
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db.instrumentation import TRANSACTION_STATEMENTS
+
+# Recorders of every statement, and the recorder of the current context
+_global: list["QueryRecorder"] = []
+_scoped: ContextVar["QueryRecorder | None"] = ContextVar("query_recorder", default=None)
+_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements than the budget, the message lists them"""
+
+
+class QueryRecorder:
+    """
+    Record the SQL statements run on any engine (sync, and the async ones
+    through their sync_engine) between start() and stop(), or inside a
+    `with` block. Transaction control (BEGIN, COMMIT, ...) is not recorded.
+
+    Behaves as the list of the recorded statements (len, indexing, iteration).
+
+    Params:
+        - scoped: (bool) only the statements of the current context: those of
+          one request when started by a middleware (the context is copied
+          into the threadpool and the write queue). Otherwise every statement
+          of the process, e.g. those of a test and of the app it calls.
+    """
+
+    def __init__(self, scoped: bool = False):
+        self.scoped = scoped
+        self.statements: list[str] = []
+        self._token = None
+
+    def start(self) -> "QueryRecorder":
+        _install()
+        if self.scoped:
+            self._token = _scoped.set(self)
+        else:
+            _global.append(self)
+        return self
+
+    def stop(self):
+        if self.scoped:
+            _scoped.reset(self._token)
+            self._token = None
+        else:
+            # By identity: recorders of the same statements are equal
+            _global[:] = [recorder for recorder in _global if recorder is not self]
+
+    def __enter__(self) -> "QueryRecorder":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def __getitem__(self, index):
+        return self.statements[index]
+
+    def __iter__(self):
+        return iter(self.statements)
+
+    def __eq__(self, other) -> bool:
+        return self.statements == (other.statements if isinstance(other, QueryRecorder) else other)
+
+    def __repr__(self) -> str:
+        return self.report()
+
+    def report(self) -> str:
+        """The statements, numbered, one per line"""
+        return "\n".join(f"  {i}. {' '.join(statement.split())}" for i, statement in enumerate(self.statements, 1))
+
+    def check(self, budget: int, label: str = "block"):
+        """Raise QueryBudgetExceeded listing the statements when there are more than `budget`"""
+        if len(self.statements) > budget:
+            raise QueryBudgetExceeded(
+                f"{label} ran {len(self.statements)} SQL statements, budget {budget}:\n{self.report()}"
+            )
+
+
+def _install():
+    """One listener for every engine, added on first use"""
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _record)
+        _installed = True
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+        return
+    for recorder in _global:
+        recorder.statements.append(statement)
+    recorder = _scoped.get()
+    if recorder is not None:
+        recorder.statements.append(statement)
@@ -0,0 +1,96 @@
+import hashlib
+
+from sqlalchemy import Column, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Dialect, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from db.group_counts import reconcile_counts
+from db.search import rebuild_search_index
+from db.session import Base
+
+# Register every model on Base.metadata
+import models.user_model  # noqa: F401
+
+# Fingerprint of the schema last applied by ensure_schema. Outside of
+# Base.metadata: it describes the schema, it is not part of it.
+_applied = MetaData()
+schema_fingerprints = Table("schema_fingerprint", _applied, Column("fingerprint", String, primary_key=True))
+
+
+def init_schema(engine: Engine):
+    """
+    Create the tables and every declared column, index and trigger that is
+    missing. A full text index or a count_by table created here is built
+    from the stored rows.
+
+    `create_all` only emits columns, indexes and triggers together with a
+    new table, so databases created before they were declared would never
+    receive them.
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    # Needs a server default to be NOT NULL on the stored rows
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+            search_index = table.info.get("search_index")
+            unindexed = search_index is not None and not inspect(connection).has_table(search_index.name)
+
+            for statement in table.info.get("triggers", ()):
+                connection.execute(text(statement))
+
+            if unindexed:
+                rebuild_search_index(connection, search_index)
+            for counts in table.info.get("counts", ()):
+                if counts.name not in existing_tables and table.name in existing_tables:
+                    reconcile_counts(connection, counts)
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def schema_fingerprint(dialect: Dialect) -> str:
+    """Hash of the DDL of every table, index and trigger declared on Base.metadata"""
+    digest = hashlib.blake2b(digest_size=16)
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+        for statement in table.info.get("triggers", ()):
+            digest.update(statement.encode())
+    return digest.hexdigest()
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """
+    init_schema, skipped when the database was already brought to the
+    declared schema: its fingerprint is stored in the database after each
+    run, and a start costs one SELECT instead of reflecting every table.
+    Return whether init_schema ran.
+
+    A schema changed by hand is not repaired: call init_schema, or delete
+    the fingerprint row.
+    """
+    fingerprint = schema_fingerprint(engine.dialect)
+    with engine.connect() as connection:
+        try:
+            stored = connection.execute(select(schema_fingerprints.c.fingerprint)).scalar()
+        except OperationalError:
+            stored = None  # Never applied, the table is missing
+    if stored == fingerprint:
+        return False
+
+    init_schema(engine)
+    with engine.begin() as connection:
+        _applied.create_all(bind=connection)
+        connection.execute(schema_fingerprints.delete())
+        connection.execute(schema_fingerprints.insert().values(fingerprint=fingerprint))
+    return True
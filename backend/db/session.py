@@ -1,20 +1,111 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sentinel.db"
+from core.config import settings
+from db.instrumentation import instrument_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+
+def configure_sqlite(engine: Engine, pragmas: dict[str, str] | None = None, read_only: bool = False) -> Engine:
+    """
+    Prepare every new SQLite connection of `engine`.
+
+    - Let SQLAlchemy emit BEGIN itself instead of the sqlite3 driver. The
+      driver delays BEGIN until the first INSERT/UPDATE/DELETE, so a
+      SAVEPOINT issued before it (begin_nested) would open and commit its
+      own transaction. This is the workaround documented by SQLAlchemy.
+    - BEGIN is deferred, or the `sqlite_begin` execution option of the
+      engine or connection (see begin_immediate).
+    - Apply `pragmas` (journal_mode, synchronous, cache_size, ...).
+    - `read_only`: set query_only, and skip journal_mode (it is stored in
+      the file, the writer sets it).
+    """
+    pragmas = dict(pragmas or {})
+    if read_only:
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
+    return engine
+
+
+def begin_immediate(engine: Engine) -> Engine:
+    """
+    `engine` (same pool) with BEGIN IMMEDIATE: the transaction takes the
+    write lock when it starts, waiting for it up to busy_timeout. A deferred
+    transaction that reads and then writes fails at once with "database is
+    locked" when another connection committed in between (SQLite can not
+    wait there, its snapshot is stale), e.g. a login upgrading a hash.
+    Only for the sessions that write: read sessions keep a deferred BEGIN
+    and never wait on the writer.
+    """
+    return engine.execution_options(sqlite_begin="IMMEDIATE")
+
+
+def _build_engine(pool_size: int, max_overflow: int, read_only: bool = False) -> Engine:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine, settings.sqlite_pragmas, read_only=read_only)
+    if settings.metrics_enabled:
+        instrument_engine(engine)
+    return engine
+
+
+if settings.db_split_reads:
+    # SQLite has a single writer: one connection serializes the writes in
+    # the pool, instead of sessions fighting for the lock (SQLITE_BUSY).
+    # With WAL the readers never wait on it.
+    engine = _build_engine(pool_size=1, max_overflow=0)
+    read_engine = _build_engine(settings.db_pool_size, settings.db_max_overflow, read_only=True)
+else:
+    engine = read_engine = _build_engine(settings.db_pool_size, settings.db_max_overflow)
+
+# Objects keep their loaded values after commit: rows returned by
+# INSERT/UPDATE ... RETURNING are serialized without a refresh SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=begin_immediate(engine))
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
 
 Base = declarative_base()
 
 
+# The dependencies are `async def` on purpose: FastAPI runs their teardown
+# (db.close(), which gives the connection back) on the event loop. A sync
+# teardown needs a threadpool slot, and with a bounded pool every slot can
+# be held by handlers waiting for a connection: a deadlock.
 
-def get_db():
+async def get_db():
+    """Session for the requests that write"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_read_db():
+    """Session for the read-only requests, on the reader engine when split"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, DDL, Integer, String, Table, bindparam, event, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from db.session import Base
+
+# One change counter per tracked table, bumped by triggers in the
+# transaction of the write: reading it tells if the table changed
+# without reading the table
+table_versions = Table(
+    "table_versions",
+    Base.metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+_SELECT_VERSION = select(table_versions.c.version).where(table_versions.c.name == bindparam("name"))
+
+
+def version_triggers(table_name: str) -> list[str]:
+    """CREATE TRIGGER statements bumping the counter of `table_name` on every row written"""
+    bump = (
+        f"INSERT INTO table_versions (name, version) VALUES ('{table_name}', 1) "
+        "ON CONFLICT (name) DO UPDATE SET version = version + 1;"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_version_{operation.lower()} "
+        f"AFTER {operation} ON {table_name} BEGIN {bump} END"
+        for operation in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+def track_changes(table: Table) -> Table:
+    """
+    Maintain the change counter of `table`. The triggers are created with
+    the table, and by init_schema on databases created before.
+    """
+    statements = version_triggers(table.name)
+    table.info.setdefault("triggers", []).extend(statements)
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement))
+    return table
+
+
+def table_version(db: Session | Connection, table_name: str) -> int:
+    """Change counter of `table_name`, 0 if it was never written"""
+    return db.execute(_SELECT_VERSION, {"name": table_name}).scalar() or 0
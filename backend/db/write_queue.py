@@ -0,0 +1,212 @@
+import asyncio
+import contextvars
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+# A write: fn(db, *args) -> result, run without committing
+Write = Callable[..., Any]
+
+_STOP = object()
+
+
+@dataclass
+class WriteQueueStats:
+    """
+    Counters of a WriteQueue.
+    - batches:          (int) transactions committed (or failed)
+    - writes:           (int) writes run, including the failed ones
+    - failed:           (int) writes that raised, alone or with their batch
+    - max_batch_size:   (int) largest batch so far
+    - batch_sizes:      (dict) batch size upper bound (BATCH_SIZE_BUCKETS, or
+                        math.inf for larger batches) -> number of batches
+    - wait_seconds:     (float) total time writes waited before their batch started
+    - max_wait_seconds: (float) longest of those waits
+    - depth:            (int) writes currently waiting
+    """
+    batches: int = 0
+    writes: int = 0
+    failed: int = 0
+    max_batch_size: int = 0
+    batch_sizes: dict[float, int] = field(default_factory=dict)
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    depth: int = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.writes / self.batches if self.batches else 0.0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.wait_seconds / self.writes if self.writes else 0.0
+
+
+# Buckets of the batch size distribution, larger batches are counted under math.inf
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+@dataclass
+class _Pending:
+    fn: Write
+    args: tuple
+    future: Future
+    enqueued_at: float
+    # The write runs in the context of its caller: its statements are
+    # counted in the caller's request stats
+    context: contextvars.Context
+
+
+class WriteQueue:
+    """
+    Group commit: one writer thread drains the submitted writes and runs
+    them in a shared transaction, committed every `max_delay` seconds or
+    `max_batch` writes, whichever comes first.
+
+    SQLite has a single writer and pays one fsync per commit: N concurrent
+    requests each committing wait on the lock one after the other (or fail
+    with "database is locked"), a batch pays for a single commit.
+
+    Each write runs inside its own SAVEPOINT, so a failing write (e.g. an
+    IntegrityError) is rolled back and raised to its caller only, the rest
+    of the batch still commits. A failed COMMIT is raised to every caller
+    of the batch. Results are handed back once the batch is committed.
+
+    Params:
+        - session_factory: sessions of the writer (one per batch)
+        - max_batch: (int) writes per transaction
+        - max_delay: (float) seconds a write may wait for others to join its batch
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int = 64, max_delay: float = 0.002):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._stats = WriteQueueStats()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, fn: Write, *args) -> Any:
+        """Run fn(db, *args) in the next batch, block until it is committed, return its result"""
+        return self.submit_future(fn, *args).result()
+
+    async def submit_async(self, fn: Write, *args) -> Any:
+        """Same as submit, without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit_future(fn, *args))
+
+    def submit_future(self, fn: Write, *args) -> Future:
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put(_Pending(fn, args, future, time.monotonic(), contextvars.copy_context()))
+        return future
+
+    def stats(self) -> WriteQueueStats:
+        with self._lock:
+            return WriteQueueStats(
+                batches=self._stats.batches,
+                writes=self._stats.writes,
+                failed=self._stats.failed,
+                max_batch_size=self._stats.max_batch_size,
+                batch_sizes=dict(self._stats.batch_sizes),
+                wait_seconds=self._stats.wait_seconds,
+                max_wait_seconds=self._stats.max_wait_seconds,
+                depth=self._queue.qsize(),
+            )
+
+    def shutdown(self):
+        """Commit the writes already queued, then stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    pending = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if pending is _STOP:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            self._commit(batch)
+
+    def _commit(self, batch: list[_Pending]):
+        started = time.monotonic()
+        done: list[tuple[_Pending, Any]] = []
+        failed = 0
+
+        try:
+            with self.session_factory() as db:
+                for pending in batch:
+                    try:
+                        with db.begin_nested():
+                            result = pending.context.run(pending.fn, db, *pending.args)
+                    except Exception as exc:
+                        failed += 1
+                        pending.future.set_exception(exc)
+                    else:
+                        done.append((pending, result))
+                db.commit()
+        except Exception as exc:
+            # BEGIN or COMMIT failed: nothing of the batch was written
+            for pending in batch:
+                if not pending.future.done():
+                    failed += 1
+                    pending.future.set_exception(exc)
+        else:
+            for pending, result in done:
+                pending.future.set_result(result)
+
+        self._record(batch, started, failed)
+
+    def _record(self, batch: list[_Pending], started: float, failed: int):
+        size = len(batch)
+        bucket = next((bound for bound in BATCH_SIZE_BUCKETS if size <= bound), math.inf)
+        waits = [started - pending.enqueued_at for pending in batch]
+
+        with self._lock:
+            stats = self._stats
+            stats.batches += 1
+            stats.writes += size
+            stats.failed += failed
+            stats.max_batch_size = max(stats.max_batch_size, size)
+            stats.batch_sizes[bucket] = stats.batch_sizes.get(bucket, 0) + 1
+            stats.wait_seconds += sum(waits)
+            stats.max_wait_seconds = max(stats.max_wait_seconds, *waits)
+
+
+def release_read_lock(db: Session):
+    """
+    End the transaction of the caller's session before it waits on the
+    queue. Without WAL its SHARED lock (from an earlier SELECT) would keep
+    the writer from committing until busy_timeout. Commit, not rollback:
+    with expire_on_commit=False the loaded objects stay usable.
+    """
+    if db.in_transaction():
+        db.commit()
@@ -1,26 +1,93 @@
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI
-from db.session import Base, engine
+from core.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI, engine=None):
+    from db.schema import ensure_schema
+
+    if engine is None:
+        from db.session import engine
+
+    # Create all tables (and missing indexes) on DB, skipped when the
+    # database already has the declared schema
+    ensure_schema(engine)
+
+    # The counts of /api/users/stats are checked against a GROUP BY now and then
+    if settings.counts_reconcile_seconds > 0:
+        from core.reconcile import reconcile_job
+
+        reconcile_job.start()
+    try:
+        yield
+    finally:
+        if settings.counts_reconcile_seconds > 0:
+            reconcile_job.stop()
+
+
+def create_app(engine=None) -> FastAPI:
+    """
+    Build the application. Nothing touches the database here: the schema
+    is set up by the lifespan, when the server starts.
+
+    - engine: database whose schema the lifespan sets up, db.session.engine
+              by default (a benchmark passes the engine of its own database)
+    """
+    from routes import build_api_router
+
+    # Create FastAPI instance
+    app = FastAPI(lifespan=partial(lifespan, engine=engine))
 
-from routes import api_router
+    # Include principal router with base prefix
+    app.include_router(build_api_router(), prefix="/api")
 
-# Create all tables on DB
-Base.metadata.create_all(bind=engine)
+    # Requests running more SQL statements than their budget are logged with them
+    if settings.query_budget > 0 or settings.query_budget_routes:
+        from utils.query_budget import QueryBudgetMiddleware, parse_budgets
 
+        app.add_middleware(
+            QueryBudgetMiddleware, budget=settings.query_budget, routes=parse_budgets(settings.query_budget_routes)
+        )
 
-# Create FastAPI instance
-app = FastAPI()
+    # Load shedding: requests over the limits of their pool get a fast 503
+    if settings.admission_enabled:
+        from core.admission import admission_controller
+        from utils.admission import AdmissionMiddleware
 
-# Include principal router with base prefix
-app.include_router(api_router, prefix="/api")
+        app.add_middleware(AdmissionMiddleware, controller=admission_controller)
 
+    # Retried mutations get the first response back: outside of the admission
+    # (a replay takes no slot), inside the metrics (which count the replays)
+    if settings.idempotency_enabled:
+        from core.idempotency import idempotency_store
+        from utils.idempotency import IdempotencyMiddleware
 
+        app.add_middleware(
+            IdempotencyMiddleware,
+            store=idempotency_store,
+            max_body_bytes=settings.idempotency_max_body_bytes,
+            excluded_paths=settings.idempotency_excluded_paths,
+        )
 
+    # Per-route latency, SQL and threadpool metrics, scraped at /metrics
+    if settings.metrics_enabled:
+        from core.metrics import http_metrics
+        from routes.metrics_routes import MetricsRoutes
+        from utils.metrics.middleware import MetricsMiddleware
 
+        app.add_middleware(MetricsMiddleware, metrics=http_metrics, server_timing=settings.server_timing)
+        app.include_router(MetricsRoutes().router)
 
+    # Define a root endpoint
+    @app.get("/", tags=["Root"])
+    async def read_root():
+        return {"Hello": "World"}
 
-# Define a root endpoint
-@app.get("/", tags=["Root"])
-async def read_root():
-    return {"Hello": "World"}
+    return app
 
 
+# uvicorn main:app
+app = create_app()
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Enum as SqlEnum
+from sqlalchemy import Column, Index, Integer, String, Enum as SqlEnum
 from enum import Enum
 
 # For each table do you want add to sqlite3, use extends from Base
 from db.session import Base
+from db.group_counts import count_by
+from db.search import full_text_search
+from db.table_versions import track_changes
 
 class RoleEnum(str, Enum):
     """
@@ -25,11 +28,24 @@ class User(Base):
     - email:    (string)
     - password: (string)
     - role:     (Enum: ["Administrator", "Feet Manager", "Driver"] )
+    - version:  (int) bumped by every update, the ETag of the user
     """
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pages filtered by role: WHERE role = ? AND id > ? ORDER BY id
+        Index("ix_users_role_id", "role", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     email = Column(String, unique=True)
     password = Column(String)
     role = Column(SqlEnum(RoleEnum), default=RoleEnum.FeetManager)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+# Change counter of the users table, the ETag of the users list
+track_changes(User.__table__)
+# GET /api/users/search: words of the names and emails
+full_text_search(User.__table__, ("name", "email"))
+# GET /api/users/stats: users per role, maintained by triggers
+count_by(User.__table__, "role")
@@ -0,0 +1,126 @@
+from typing import Any, Generic, List, Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories.base_repository import BaseRepository, Model
+from utils.bulk import BulkItemResult
+from utils.pagination import Page
+
+class AsyncBaseRepository(Generic[Model]):
+    """
+    Async version of BaseRepository.
+
+    Params:
+        - repository: the sync BaseRepository whose queries are reused
+
+    Each method runs the sync implementation through AsyncSession.run_sync:
+    the statements go through the async driver (aiosqlite) on the event
+    loop, no threadpool involved, and both paths share one implementation.
+    With a write queue the mutations are awaited on the queue instead.
+
+    Return:
+        - get
+        - get_all
+        - get_readonly
+        - get_all_readonly
+        - get_many
+        - get_page
+        - search
+        - get_version
+        - table_version
+        - counts
+        - create
+        - update
+        - delete
+        - bulk_create
+        - bulk_update
+        - bulk_delete
+    """
+
+    def __init__(self, repository: BaseRepository[Model]):
+        self.repository = repository
+        self.model = repository.model
+
+    async def get(self, db: AsyncSession, id: int, columns: Sequence[str] | None = None) -> Model | None:
+        loader = self.repository.batch_loader
+        if loader is None or columns:
+            return await db.run_sync(self.repository.get, id, columns)
+
+        # Awaited here: inside run_sync the wait would block the event loop
+        cached = await db.run_sync(self.repository._get_cached, id)
+        if cached is not None:
+            return cached
+        generation = self.repository._generation(id)
+        return self.repository._remember(await loader.load_async(id), generation)
+
+    async def get_all(self, db: AsyncSession) -> List[Model]:
+        return await db.run_sync(self.repository.get_all)
+
+    async def get_readonly(self, db: AsyncSession, id: int, columns: Sequence[str] | None = None) -> Row | None:
+        return await db.run_sync(self.repository.get_readonly, id, columns)
+
+    async def get_all_readonly(self, db: AsyncSession, columns: Sequence[str] | None = None) -> List[Row]:
+        return await db.run_sync(self.repository.get_all_readonly, columns)
+
+    async def get_many(self, db: AsyncSession, ids: Sequence[int], columns: Sequence[str] | None = None) -> List[Row]:
+        return await db.run_sync(self.repository.get_many, ids, columns)
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        limit: int,
+        cursor: str | None = None,
+        filters: dict[str, Any] | None = None,
+        prefixes: dict[str, str] | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> Page[Model]:
+        return await db.run_sync(self.repository.get_page, limit, cursor, filters, prefixes, columns)
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> Page[Row]:
+        return await db.run_sync(self.repository.search, query, limit, cursor, columns)
+
+    async def get_version(self, db: AsyncSession, id: int) -> int | None:
+        return await db.run_sync(self.repository.get_version, id)
+
+    async def table_version(self, db: AsyncSession) -> int:
+        return await db.run_sync(self.repository.table_version)
+
+    async def counts(self, db: AsyncSession, column: str) -> dict:
+        return await db.run_sync(self.repository.counts, column)
+
+    async def create(self, db: AsyncSession, obj_data: dict) -> Model:
+        return await self._write(db, self.repository._create, obj_data)
+
+    async def update(
+        self, db: AsyncSession, obj_data: dict, id: int, versions: Sequence[int] | None = None
+    ) -> Model | None:
+        return await self._write(db, self.repository._update, obj_data, id, versions)
+
+    async def delete(self, db: AsyncSession, id: int, versions: Sequence[int] | None = None) -> bool:
+        return await self._write(db, self.repository._delete, id, versions)
+
+    async def bulk_create(self, db: AsyncSession, items: List[dict]) -> List[BulkItemResult]:
+        return await self._write(db, self.repository._bulk_create, items)
+
+    async def bulk_update(self, db: AsyncSession, items: List[dict]) -> List[BulkItemResult]:
+        return await self._write(db, self.repository._bulk_update, items)
+
+    async def bulk_delete(self, db: AsyncSession, ids: List[int]) -> List[BulkItemResult]:
+        return await self._write(db, self.repository._bulk_delete, ids)
+
+    async def _write(self, db: AsyncSession, write, *args):
+        """Like BaseRepository._write, waiting on the write queue without blocking the event loop"""
+        queue = self.repository.write_queue
+        if queue is not None:
+            if db.in_transaction():
+                await db.commit()  # see release_read_lock
+            return await queue.submit_async(write, *args)
+        return await db.run_sync(self.repository._write, write, *args)
@@ -0,0 +1,15 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories.async_base_repository import AsyncBaseRepository
+from repositories.user_repository import UserRepository
+from models.user_model import User
+
+class AsyncUserRepository(AsyncBaseRepository[User]):
+
+    # Inheritance from AsyncBaseRepository init
+    def __init__(self):
+        super().__init__(UserRepository())
+
+    async def get_by_email(self, db: AsyncSession, email: str) -> User | None:
+        """Search user by email"""
+        return await db.run_sync(self.repository.get_by_email, email)
@@ -1,63 +1,602 @@
-from typing import Type, TypeVar, Generic, List
+from typing import Any, Iterator, Sequence, Type, TypeVar, Generic, List
 from fastapi import HTTPException, status
+from sqlalchemy import Row, and_, bindparam, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from db.batch_loader import BatchLoader
+from db.group_counts import read_counts, reconcile_counts
+from db.hooks import after_commit
+from db.search import MAX_RANKED, match_query
+from db.table_versions import table_version
+from db.write_queue import WriteQueue, release_read_lock
+from utils.bulk import BulkItemResult
+from utils.cache.entity_cache import EntityCache
+from utils.pagination import Page, encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+
+# Highest code point, and the surrogates (not valid in a str stored as UTF-8)
+MAX_CHAR = 0x10FFFF
+SURROGATES = range(0xD800, 0xE000)
+
 Model = TypeVar("Model")
 
+class StaleVersionError(Exception):
+    """The row exists, but not at any of the expected versions"""
+
+class DuplicateError(Exception):
+    """The row would repeat the value of a unique column (e.g. an email)"""
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Smallest string above every string starting with `prefix` (code point
+    order, that of UTF-8 bytes), None when there is none (only U+10FFFF).
+    """
+    stripped = prefix.rstrip(chr(MAX_CHAR))
+    if not stripped:
+        return None
+    following = ord(stripped[-1]) + 1
+    if following in SURROGATES:
+        following = SURROGATES.stop
+    return stripped[:-1] + chr(following)
+
 class BaseRepository(Generic[Model]):
     """
     Params: 
         - Model
+        - cache: optional EntityCache, read through by `get` and invalidated
+                 when a mutation commits
+        - write_queue: optional WriteQueue, the mutations are then committed
+                 in batches by its writer instead of on the caller's session
+
+    A model with a `version` column is versioned: every update bumps it,
+    and update/delete can be conditioned on it (optimistic concurrency).
+
+    Set `batch_loader` (a BatchLoader of load_by_ids, see core.batch_loader)
+    to merge the concurrent lookups of `get` into one query.
 
-    def __init__(self, model: Type[Model]):
+    def __init__(self, model: Type[Model], cache: EntityCache | None = None, write_queue: WriteQueue | None = None):
         self.model = model
+        self.cache = cache
+        self.write_queue = write_queue
 
     Return: 
         - get
         - get_all
+        - get_readonly
+        - get_all_readonly
+        - get_many
+        - load_by_ids
+        - get_page
+        - search
+        - get_version
+        - table_version
+        - counts
+        - reconcile_counts
+        - iter_batches
         - create
         - update
         - delete
+        - bulk_create
+        - bulk_update
+        - bulk_delete
     """
 
-    def __init__(self, model: Type[Model]):
+    def __init__(self, model: Type[Model], cache: EntityCache | None = None, write_queue: WriteQueue | None = None):
         self.model = model
+        self.cache = cache
+        self.write_queue = write_queue
+        self.batch_loader: BatchLoader | None = None
+
+        # Statements built once, their values bound on execute: no statement
+        # construction (nor cache key walk of a new one) on each call
+        self._select_by_id = select(model).where(model.id == bindparam("id"))
+        self._select_all = select(model)
+        self._select_readonly_by_id = select(*self._columns(None)).where(self._column("id") == bindparam("id"))
+        self._select_existing_ids = select(model.id).where(model.id.in_(bindparam("ids", expanding=True)))
+        self._select_readonly_by_ids = select(*self._columns(None)).where(self._column("id").in_(bindparam("ids", expanding=True)))
+        self._insert = insert(model).returning(model)
+        # Ids RETURNed in the order of the parameters, whatever the backend
+        self._insert_returning_id = insert(model).returning(model.id, sort_by_parameter_order=True)
+        self._select_by_column: dict[str, Any] = {}
+
+        self.versioned = "version" in model.__mapper__.columns
+        table = model.__table__
+        # SET columns are the keys of the bound values, besides :match_id
+        update_by_id = update(model).where(model.id == bindparam("match_id"))
+        bulk_update_by_id = update(table).where(table.c.id == bindparam("match_id"))
+        if self.versioned:
+            update_by_id = update_by_id.values(version=model.version + 1)
+            bulk_update_by_id = bulk_update_by_id.values(version=table.c.version + 1)
+            self._select_version = select(model.version).where(model.id == bindparam("id"))
+        self._update_by_id = update_by_id.returning(model).execution_options(populate_existing=True)
+        self._bulk_update_by_id = bulk_update_by_id
+        self._delete_by_id = delete(model).where(model.id == bindparam("match_id")).returning(model.id)
+        self._delete_by_ids = delete(model).where(model.id.in_(bindparam("ids", expanding=True))).returning(model.id)
+        if self.versioned:
+            # Conditional writes: WHERE id = :match_id AND version IN (:match_versions)
+            match_versions = model.version.in_(bindparam("match_versions", expanding=True))
+            self._update_by_id_versions = self._update_by_id.where(match_versions)
+            self._delete_by_id_versions = self._delete_by_id.where(match_versions)
+
+    def get(self, db: Session, id: int, columns: Sequence[str] | None = None) -> Model | None:
+        """
+        - columns: only SELECT these columns, a Row is returned instead of
+                   the entity (a cached entity is still returned as is)
 
-    def get(self, db: Session, id: int) -> Model | None:
-        return db.query(self.model).filter(self.model.id == id).first()
+        With a batch loader a miss is loaded by it, together with the
+        lookups of the other requests, as a read-only Row.
+        """
+        cached = self._get_cached(db, id)
+        if cached is not None:
+            return cached
+
+        if columns:
+            # Partial rows are not cached
+            return self.get_readonly(db, id, columns)
+
+        # Taken before the read: a write committed meanwhile keeps it out of the cache
+        generation = self._generation(id)
+        if self.batch_loader is not None:
+            return self._remember(self.batch_loader.load(id), generation)
+        return self._remember(db.scalars(self._select_by_id, {"id": id}).first(), generation)
     
     def get_all(self, db: Session) -> List[Model]:
-        return db.query(self.model).all()
-    
-    def create(self, db: Session, obj_data: dict) -> Model:
-        obj = self.model(**obj_data)
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
-        return obj
+        return db.scalars(self._select_all).all()
+
+    def get_readonly(self, db: Session, id: int, columns: Sequence[str] | None = None) -> Row | None:
+        """
+        Read-only `get`: a Core SELECT of `columns` (all of them by default)
+        returning an immutable Row (tuple with attribute access) instead of
+        an entity. Nothing is added to the identity map or change tracked,
+        the cache is not used.
+        """
+        if columns is None:
+            return db.execute(self._select_readonly_by_id, {"id": id}).first()
+        return db.execute(select(*self._columns(columns)).where(self._column("id") == id)).first()
+
+    def get_all_readonly(self, db: Session, columns: Sequence[str] | None = None) -> List[Row]:
+        """Read-only `get_all`, see get_readonly"""
+        return db.execute(select(*self._columns(columns)).order_by(self._column("id"))).all()
+
+    def get_many(self, db: Session, ids: Sequence[int], columns: Sequence[str] | None = None) -> List[Row]:
+        """
+        Read-only rows of `ids` with one SELECT ... WHERE id IN (...), in the
+        order of `ids`. Missing ids are left out, a repeated id is returned once.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        if columns is None:
+            rows = self.load_by_ids(db, ids)
+        else:
+            stmt = select(*self._columns(columns)).where(self._column("id").in_(bindparam("ids", expanding=True)))
+            rows = {row.id: row for row in db.execute(stmt, {"ids": ids})}
+        return [rows[id] for id in ids if id in rows]
+
+    def load_by_ids(self, db: Session, ids: List[int]) -> dict[int, Row]:
+        """{id: read-only row} of the existing `ids`, one query (the load_many of a BatchLoader)"""
+        return {row.id: row for row in db.execute(self._select_readonly_by_ids, {"ids": ids})}
+
+    def get_page(
+        self,
+        db: Session,
+        limit: int,
+        cursor: str | None = None,
+        filters: dict[str, Any] | None = None,
+        prefixes: dict[str, str] | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> Page[Model]:
+        """
+        Keyset pagination on `id`: WHERE id > :last_id ORDER BY id LIMIT :limit.
+        The cost of a page does not depend on how deep it is in the table.
+
+        - filters:  equality filters, e.g. {"role": RoleEnum.Driver}
+        - prefixes: prefix filters, e.g. {"email": "john"}, written as a range
+                    so the column index can be used (LIKE 'x%' can not)
+        - columns:  only SELECT these columns (plus id, for the cursor),
+                    the page then holds read-only Rows instead of entities
+
+        Raise InvalidCursorError if the cursor is not valid.
+        """
+        # With columns: Core SELECT, Rows are returned as read (see get_readonly)
+        stmt = select(*self._columns(columns)) if columns else select(self.model)
+        id_column = self._column("id")
+
+        for column, value in (filters or {}).items():
+            stmt = stmt.where(self._column(column) == value)
+
+        for column, prefix in (prefixes or {}).items():
+            if not prefix:
+                continue
+            attr = self._column(column)
+            stmt = stmt.where(attr >= prefix)
+            upper = prefix_upper_bound(prefix)
+            if upper is not None:
+                stmt = stmt.where(attr < upper)
+
+        if cursor is not None:
+            stmt = stmt.where(id_column > decode_cursor(cursor))
+
+        # Fetch one extra row to know if there is a next page
+        stmt = stmt.order_by(id_column).limit(limit + 1)
+        items = db.execute(stmt).all() if columns else db.scalars(stmt).all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1].id)
+
+        return Page(items=items, next_cursor=next_cursor)
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+        columns: Sequence[str] | None = None,
+    ) -> Page[Row]:
+        """
+        Read-only rows matching the words of `query` (see db.search.match_query)
+        in the full text index of the model, best match first (bm25), then by id.
+        Only the first MAX_RANKED matches (by id) are ranked. One query: the
+        page is ranked in the index, then joined to the table on rowid = id.
+
+        Keyset pagination on (rank, id), best-effort: bm25 scores depend on
+        the statistics of the whole index, so any write between two pages
+        can move rows across the cursor (repeated or skipped). Stable while
+        nothing is written. Raise InvalidCursorError if the cursor is not valid.
+        """
+        index = self.model.__table__.info["search_index"]
+        match = match_query(query)
+        if match is None:
+            return Page()
+
+        # The id of the last ranked match, listed in rowid order without scoring.
+        # Not correlated: its own scan of the index (MATCH can not name an alias)
+        matches = literal_column(index.name).op("MATCH")(match)
+        cutoff = (
+            select(index.c.rowid)
+            .where(matches)
+            .order_by(index.c.rowid)
+            .limit(1)
+            .offset(MAX_RANKED - 1)
+            .correlate(None)
+            .scalar_subquery()
+        )
+        ranked = select(index.c.rowid, index.c.rank).where(
+            matches,
+            # No cutoff with fewer matches: the max SQLite rowid
+            index.c.rowid <= func.coalesce(cutoff, 2 ** 63 - 1),
+        )
+        if cursor is not None:
+            rank, last_id = decode_rank_cursor(cursor)
+            ranked = ranked.where(or_(index.c.rank > rank, and_(index.c.rank == rank, index.c.rowid > last_id)))
+        ranked = ranked.order_by(index.c.rank, index.c.rowid).limit(limit + 1).subquery()
+
+        id_column = self._column("id")
+        stmt = (
+            select(*self._columns(columns), ranked.c.rank.label("search_rank"))
+            .join(ranked, ranked.c.rowid == id_column)
+            .order_by(ranked.c.rank, id_column)
+        )
+        items = db.execute(stmt).all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_rank_cursor(items[-1].search_rank, items[-1].id)
+
+        return Page(items=items, next_cursor=next_cursor)
     
-    def update(self, db: Session, obj_data: dict, id: int) -> Model | None:
-        obj = self.get(db, id) # Search the obj on the db
+    def get_version(self, db: Session, id: int) -> int | None:
+        """Version of a row (versioned models), read without loading it. None if missing."""
+        cached = self._get_cached(db, id)
+        if cached is not None:
+            return cached.version
+        return db.execute(self._select_version, {"id": id}).scalar()
 
-        if not obj:
-            return None # If the obj does not exist, return None
-        
-        for key, value in obj_data.items():
-            setattr(obj, key, value) # Update the obj per each field
+    def table_version(self, db: Session) -> int:
+        """Change counter of the table, bumped by any write to it (see db.table_versions)"""
+        return table_version(db, self.model.__tablename__)
 
+    def counts(self, db: Session, column: str) -> dict:
+        """{value: rows} of a column counted with db.group_counts.count_by, without scanning the table"""
+        return read_counts(db, self._counts_table(column))
+
+    def reconcile_counts(self, db: Session, column: str) -> dict:
+        """
+        Recompute the counts of `column` with a GROUP BY and fix them, then
+        commit. Return the drift found, {value: (stored, actual)}.
+        """
+        drift = reconcile_counts(db, self._counts_table(column))
         db.commit()
-        db.refresh(obj)
+        return drift
+
+    def iter_batches(
+        self,
+        db: Session,
+        columns: Sequence[str],
+        batch_size: int = 1000,
+        filters: dict[str, Any] | None = None,
+    ) -> Iterator[Sequence[tuple]]:
+        """
+        Stream `columns` of every row, ordered by id, in lists of `batch_size`
+        tuples. A single SELECT read with yield_per (server-side cursor): only
+        one batch is in memory, no entity is built.
+        """
+        stmt = select(*(self._column(column) for column in columns)).order_by(self._column("id"))
+        for column, value in (filters or {}).items():
+            stmt = stmt.where(self._column(column) == value)
+
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+    def create(self, db: Session, obj_data: dict) -> Model:
+        """
+        INSERT ... RETURNING: the new row is loaded without a refresh SELECT.
+        Raise DuplicateError when a unique column is taken (no lookup first).
+        """
+        return self._write(db, self._create, obj_data)
+
+    def update(self, db: Session, obj_data: dict, id: int, versions: Sequence[int] | None = None) -> Model | None:
+        """
+        UPDATE ... WHERE id = :id RETURNING *, a single statement.
+        Return None if no row has that id, raise DuplicateError when a
+        unique column is taken.
+
+        - versions: only update the row if its version is one of these
+                    (the check is part of the WHERE, no extra SELECT),
+                    else raise StaleVersionError
+        """
+        return self._write(db, self._update, obj_data, id, versions)
+
+    def delete(self, db: Session, id: int, versions: Sequence[int] | None = None) -> bool:
+        """
+        DELETE ... WHERE id = :id RETURNING id, a single statement.
+        Return False if no row has that id.
+
+        - versions: see update
+        """
+        return self._write(db, self._delete, id, versions)
+
+    def bulk_create(self, db: Session, items: List[dict]) -> List[BulkItemResult]:
+        """
+        Insert many rows with one executemany and a single commit.
+        Rows that break a unique column are reported and skipped,
+        the rest of the batch is still inserted.
+        """
+        return self._write(db, self._bulk_create, items)
+
+    def bulk_update(self, db: Session, items: List[dict]) -> List[BulkItemResult]:
+        """
+        Update many rows by primary key (each item carries its `id`)
+        with one executemany and a single commit.
+        Missing ids and unique violations are reported per item.
+        """
+        return self._write(db, self._bulk_update, items)
+
+    def bulk_delete(self, db: Session, ids: List[int]) -> List[BulkItemResult]:
+        """Delete many rows with one DELETE ... WHERE id IN (...) and a single commit"""
+        return self._write(db, self._bulk_delete, ids)
+
+    def _write(self, db: Session, write, *args):
+        """
+        Run write(db, *args) and commit it: on the caller's session, or in
+        the next batch of the write queue (the result is then detached).
+        """
+        if self.write_queue is not None:
+            release_read_lock(db)
+            return self.write_queue.submit(write, *args)
+
+        try:
+            result = write(db, *args)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result
+
+    # The writes below do not commit, see _write
+
+    def _create(self, db: Session, obj_data: dict) -> Model:
+        try:
+            return db.scalar(self._insert, obj_data)
+        except IntegrityError as exc:
+            raise DuplicateError(str(exc.orig)) from exc
+
+    def _update(self, db: Session, obj_data: dict, id: int, versions: Sequence[int] | None = None) -> Model | None:
+        try:
+            if versions is None:
+                obj = db.scalar(self._update_by_id, {**obj_data, "match_id": id})
+            else:
+                obj = db.scalar(self._update_by_id_versions, {**obj_data, "match_id": id, "match_versions": list(versions)})
+        except IntegrityError as exc:
+            raise DuplicateError(str(exc.orig)) from exc
+
+        if obj is None:
+            self._check_stale(db, id, versions)
+            return None # the obj does not exist
+
+        self._invalidate_on_commit(db, id)
         return obj
-    
-    def delete(self, db: Session, id: int) -> bool:
-        obj = self.get(db, id)
 
-        if not obj:
+    def _delete(self, db: Session, id: int, versions: Sequence[int] | None = None) -> bool:
+        if versions is None:
+            deleted = db.scalar(self._delete_by_id, {"match_id": id})
+        else:
+            deleted = db.scalar(self._delete_by_id_versions, {"match_id": id, "match_versions": list(versions)})
+
+        if deleted is None:
+            self._check_stale(db, id, versions)
             return False
-        
-        db.delete(obj)
-        db.commit()
+
+        self._invalidate_on_commit(db, id)
         return True
+
+    def _bulk_create(self, db: Session, items: List[dict]) -> List[BulkItemResult]:
+        results: dict[int, BulkItemResult] = self._unique_conflicts(db, items)
+        pending = [(index, item) for index, item in enumerate(items) if index not in results]
+
+        def run(batch):
+            # SQLAlchemy matches the RETURNed ids to the parameters: SQLite has no
+            # sentinel to order a multi-row INSERT by, it runs one INSERT per item
+            # (a prepared statement, in the one transaction of the batch)
+            ids = db.scalars(self._insert_returning_id, [item for _, item in batch]).all()
+            for (index, _), new_id in zip(batch, ids):
+                results[index] = BulkItemResult(index=index, id=new_id)
+
+        self._run_batch(db, pending, run, results)
+        return [results[index] for index in range(len(items))]
+
+    def _bulk_update(self, db: Session, items: List[dict]) -> List[BulkItemResult]:
+        ids = {item["id"] for item in items}
+        existing = set(db.scalars(self._select_existing_ids, {"ids": list(ids)})) if ids else set()
+
+        results: dict[int, BulkItemResult] = {
+            index: BulkItemResult.failed(index, f"{self.model.__name__} not found", item["id"])
+            for index, item in enumerate(items)
+            if item["id"] not in existing
+        }
+        for index, result in self._unique_conflicts(db, items).items():
+            results.setdefault(index, result)
+
+        pending = [(index, item) for index, item in enumerate(items) if index not in results]
+
+        def run(batch):
+            # Core executemany: the version is bumped in the SET clause
+            db.execute(self._bulk_update_by_id, [
+                {**{key: value for key, value in item.items() if key != "id"}, "match_id": item["id"]}
+                for _, item in batch
+            ])
+            for index, item in batch:
+                results[index] = BulkItemResult(index=index, id=item["id"])
+
+        self._run_batch(db, pending, run, results)
+        self._invalidate_on_commit(db, *(item["id"] for _, item in pending))
+        return [results[index] for index in range(len(items))]
+
+    def _bulk_delete(self, db: Session, ids: List[int]) -> List[BulkItemResult]:
+        deleted = set(db.scalars(self._delete_by_ids, {"ids": list(set(ids))})) if ids else set()
+        self._invalidate_on_commit(db, *deleted)
+
+        results = []
+        for index, id in enumerate(ids):
+            if id in deleted:
+                deleted.discard(id)  # A repeated id is only deleted once
+                results.append(BulkItemResult(index=index, id=id))
+            else:
+                results.append(BulkItemResult.failed(index, f"{self.model.__name__} not found", id))
+        return results
+
+    def _get_cached(self, db: Session, id: int) -> Model | None:
+        return self.cache.get(db, id) if self.cache is not None else None
+
+    def _generation(self, id: int | None = None) -> tuple | None:
+        """Cache generation to take before a read-through (see EntityCache.generation)"""
+        return self.cache.generation(id) if self.cache is not None else None
+
+    def _remember(self, obj, generation: tuple | None = None):
+        """Cache a loaded row (entity or full Row) unless invalidated since `generation`, return it"""
+        if obj is not None and self.cache is not None:
+            self.cache.set(obj, generation)
+        return obj
+
+    def _check_stale(self, db: Session, id: int, versions: Sequence[int] | None):
+        """After a conditional write matched nothing: raise if the row exists (at another version)"""
+        # Only on the failure path, a write that matches costs nothing more
+        if versions is not None and db.execute(self._select_version, {"id": id}).scalar() is not None:
+            raise StaleVersionError(f"{self.model.__name__} {id} is not at version {', '.join(map(str, versions))}")
+
+    def _counts_table(self, column: str):
+        for counts in self.model.__table__.info.get("counts", ()):
+            if counts.info["counted"].name == column:
+                return counts
+        raise ValueError(f"{self.model.__name__}.{column} is not counted")
+
+    def _select_by(self, column: str):
+        """SELECT of the entity WHERE `column` = :value, built once per column"""
+        stmt = self._select_by_column.get(column)
+        if stmt is None:
+            stmt = select(self.model).where(getattr(self.model, column) == bindparam("value"))
+            self._select_by_column[column] = stmt
+        return stmt
+
+    def _column(self, name: str):
+        """Table column mapped to the attribute `name`"""
+        # The Column itself, not the ORM attribute: a statement made only of
+        # Columns is compiled and executed by Core, no ORM loading step
+        return self.model.__mapper__.columns[name]
+
+    def _columns(self, columns: Sequence[str] | None) -> list:
+        """Table columns of `columns` (all of them if None), id always included"""
+        if columns is None:
+            return list(self.model.__mapper__.columns)
+        names = ["id", *(column for column in columns if column != "id")]
+        return [self._column(name) for name in names]
+
+    def _invalidate_on_commit(self, db: Session, *ids: int):
+        """Drop the cached rows once the transaction commits"""
+        if self.cache is not None and ids:
+            after_commit(db, lambda: self.cache.invalidate(*ids))
+
+    def _unique_conflicts(self, db: Session, items: List[dict]) -> dict[int, BulkItemResult]:
+        """
+        Find the items that would break a unique column, either against the
+        stored rows or against an earlier item of the same batch.
+        One SELECT per unique column.
+        """
+        conflicts: dict[int, BulkItemResult] = {}
+        unique_columns = [c.name for c in self.model.__table__.columns if c.unique and not c.primary_key]
+
+        for column in unique_columns:
+            attr = getattr(self.model, column)
+            values = {item[column] for item in items if item.get(column) is not None}
+            if not values:
+                continue
+
+            # value -> id of the row that owns it
+            owners = dict(db.execute(select(attr, self.model.id).where(attr.in_(values))).tuples().all())
+            seen = set()
+
+            for index, item in enumerate(items):
+                value = item.get(column)
+                if value is None or index in conflicts:
+                    continue
+
+                owner = owners.get(value)
+                if value in seen or (owner is not None and owner != item.get("id")):
+                    conflicts[index] = BulkItemResult.failed(
+                        index, f"Duplicate {column}: {value}", item.get("id")
+                    )
+                else:
+                    seen.add(value)
+
+        return conflicts
+
+    def _run_batch(self, db: Session, pending: list, run, results: dict[int, BulkItemResult]):
+        """
+        Run the whole batch inside a SAVEPOINT. If it still fails (a row
+        written by another request in the meantime), retry the rows one by
+        one so only the offending ones are reported.
+        """
+        if not pending:
+            return
+
+        try:
+            with db.begin_nested():
+                run(pending)
+            return
+        except IntegrityError:
+            pass
+
+        for index, item in pending:
+            try:
+                with db.begin_nested():
+                    run([(index, item)])
+            except IntegrityError as exc:
+                results[index] = BulkItemResult.failed(index, str(exc.orig), item.get("id"))
         
 
     def validate_exists(self, db: Session, id: int):
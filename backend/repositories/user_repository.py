@@ -1,14 +1,28 @@
 from sqlalchemy.orm import Session
 
+from core.batch_loader import batch_loader_for
+from core.cache import cache_backend
+from core.write_queue import write_queue_for
 from repositories.base_repository import BaseRepository
 from models.user_model import User
+from utils.cache.entity_cache import EntityCache
 
 class UserRepository(BaseRepository[User]):
 
     # Inheritance from BaseRepository init
     def __init__(self):
-        super().__init__(User)
+        cache = EntityCache(cache_backend, User, secondary_keys=("email",)) if cache_backend else None
+        super().__init__(User, cache=cache, write_queue=write_queue_for(User.__tablename__))
+        self.batch_loader = batch_loader_for(User.__tablename__, self.load_by_ids)
 
     def get_by_email(self, db: Session, email: str) -> User | None:
         """Search user by email"""
-        return db.query(self.model).filter(self.model.email == email).first()
\ No newline at end of file
+        if self.cache is not None:
+            cached = self.cache.get_by(db, "email", email)
+            if cached is not None:
+                return cached
+
+        # The id is not known before the read: any invalidation meanwhile skips the fill
+        generation = self._generation()
+        user = db.scalars(self._select_by("email"), {"value": email}).first()
+        return self._remember(user, generation)
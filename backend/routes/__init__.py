@@ -1,8 +1,20 @@
 from fastapi import APIRouter
-from routes.user_routes import user_routes
 
-# Principal router
-api_router = APIRouter()
+from core.config import settings
 
-# Include all routes with prefix
-api_router.include_router(user_routes, prefix="/users", tags=["Users"])
\ No newline at end of file
+
+def build_api_router() -> APIRouter:
+    """
+    Principal router, built by the app factory (main.create_app). Only the
+    routes of SENTINEL_DB_MODE are imported and instantiated: importing a
+    routes module registers nothing.
+    """
+    if settings.db_mode == "async":
+        from routes.async_user_routes import AsyncUserRoutes as UserRoutes
+    else:
+        from routes.user_routes import UserRoutes
+
+    api_router = APIRouter()
+    # Include all routes with prefix
+    api_router.include_router(UserRoutes().router, prefix="/users", tags=["Users"])
+    return api_router
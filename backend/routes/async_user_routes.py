@@ -0,0 +1,109 @@
+from fastapi import Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
+
+from db.async_session import get_async_db, get_async_write_db
+from models.user_model import RoleEnum
+from routes.user_routes import (
+    UserRoutes, DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_SIZE, MAX_PAGE_SIZE, MAX_SEARCH_SIZE, USER_JSON,
+    Fields, Ids, IfMatch, IfNoneMatch, SearchText,
+    if_match_versions, load_columns, parse_fields, user_response, user_version_etag, users_etag,
+    users_page_response, users_query,
+)
+from utils.etag import none_match, not_modified
+from services.async_user_service import AsyncUserService
+from schemas.user_schema import (
+    UserCreateSchema, UserUpdateSchema, LoginSchema,
+    UserBulkCreateSchema, UserBulkUpdateListSchema, UserBulkDeleteSchema,
+)
+
+# Create alias for async db depends
+AsyncDbSession = Annotated[AsyncSession, Depends(get_async_db)]
+# Handlers that write: BEGIN IMMEDIATE, a read then a write can not fail on the lock
+AsyncWriteDbSession = Annotated[AsyncSession, Depends(get_async_write_db)]
+
+class AsyncUserRoutes(UserRoutes):
+    """
+    Same endpoints as UserRoutes, served by `async def` handlers on an
+    AsyncSession, so they run on the event loop instead of the threadpool.
+    Endpoints not overridden here keep their sync handler.
+    """
+
+    def __init__(self):
+        self.async_service = AsyncUserService()
+        super().__init__()
+
+    async def get_users(
+        self,
+        db: AsyncDbSession,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        role: RoleEnum | None = None,
+        email_prefix: str | None = None,
+        fields: Fields = None,
+        ids: Ids = None,
+        if_none_match: IfNoneMatch = None,
+    ):
+        columns = parse_fields(fields)
+        id_list, query = users_query(ids, limit, cursor, role, email_prefix, columns)
+        etag = users_etag(await self.async_service.users_version(db), *query)
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+
+        if id_list is not None:
+            users = await self.async_service.get_users_by_ids(db, id_list, columns)
+            return USER_JSON.response(users, headers={"ETag": etag}, fields=columns)
+
+        page = await self.async_service.get_users(db, limit, cursor, role, email_prefix, columns)
+        return users_page_response(page, columns, etag)
+
+    async def search_users(
+        self,
+        db: AsyncDbSession,
+        q: SearchText,
+        limit: Annotated[int, Query(ge=1, le=MAX_SEARCH_SIZE)] = DEFAULT_SEARCH_SIZE,
+        cursor: str | None = None,
+        fields: Fields = None,
+        if_none_match: IfNoneMatch = None,
+    ):
+        columns = parse_fields(fields)
+        etag = users_etag(await self.async_service.users_version(db), "search", q, limit, cursor, columns)
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+        return users_page_response(await self.async_service.search_users(db, q, limit, cursor, columns), columns, etag)
+
+    async def get_stats(self, db: AsyncDbSession, response: Response, if_none_match: IfNoneMatch = None):
+        etag = users_etag(await self.async_service.users_version(db), "stats")
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return await self.async_service.user_stats(db)
+
+    async def get_user_by_id(self, id: int, db: AsyncDbSession, fields: Fields = None, if_none_match: IfNoneMatch = None):
+        columns = parse_fields(fields)
+        if if_none_match is not None:
+            etag = user_version_etag(id, await self.async_service.get_user_version(db, id), columns)
+            if not none_match(if_none_match, etag):
+                return not_modified(etag)
+        return user_response(await self.async_service.get_user_by_id(db, id, load_columns(columns)), columns)
+
+    async def create_user(self, data: UserCreateSchema, db: AsyncWriteDbSession):
+        return user_response(await self.async_service.create_user(db, data))
+
+    async def update_user(self, data: UserUpdateSchema, id: int, db: AsyncWriteDbSession, if_match: IfMatch = None):
+        return user_response(await self.async_service.update_user(db, data, id, if_match_versions(if_match, id)))
+
+    async def delete_user(self, id: int, db: AsyncWriteDbSession, if_match: IfMatch = None):
+        return await self.async_service.delete_user(db, id, if_match_versions(if_match, id))
+
+    async def login(self, data: LoginSchema, db: AsyncDbSession, write_db: AsyncWriteDbSession):
+        return await self.async_service.login(db, data, write_db)
+
+    async def bulk_create_users(self, data: UserBulkCreateSchema, db: AsyncWriteDbSession):
+        return await self.async_service.bulk_create_users(db, data)
+
+    async def bulk_update_users(self, data: UserBulkUpdateListSchema, db: AsyncWriteDbSession):
+        return await self.async_service.bulk_update_users(db, data)
+
+    async def bulk_delete_users(self, data: UserBulkDeleteSchema, db: AsyncWriteDbSession):
+        return await self.async_service.bulk_delete_users(db, data)
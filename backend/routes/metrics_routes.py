@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import registry
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class MetricsRoutes:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.get("/metrics", include_in_schema=False)(self.metrics)
+
+    async def metrics(self):
+        """Prometheus scrape endpoint. Async: the threadpool gauges are read on the event loop"""
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
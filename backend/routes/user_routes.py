@@ -1,44 +1,329 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Annotated
 
-from db.session import get_db 
-from services.user_service import UserService
-from schemas.generic_schema import MessageResponse
-from schemas.user_schema import UserCreateSchema, UserUpdateSchema, UserResponseSchema, LoginSchema
+from core.change_feed import user_changes
+from core.config import settings
+from core.security import CurrentUser
+from db.session import get_db, get_read_db
+from models.user_model import RoleEnum
+from services.user_service import EXPORT_FIELDS, UserService, import_tracker, import_users
+from utils.bulk import DuplicateImportError
+from utils.etag import digest, make_etag, none_match, not_modified, parse_etags
+from utils.metrics.route import InstrumentedRoute
+from utils.pagination import Page
+from utils.serialization import ResponseSerializer
+from utils.streaming import MEDIA_TYPES, SSE_MEDIA_TYPE, encode_csv, encode_ndjson, iter_records, sse_stream
+from schemas.generic_schema import MessageResponse, BulkResponse, DataFormat, ImportResponse
+from schemas.user_schema import (
+    UserCreateSchema, UserUpdateSchema, UserResponseSchema, LoginSchema,
+    UserBulkCreateSchema, UserBulkUpdateListSchema, UserBulkDeleteSchema,
+    LoginResponseSchema, CurrentUserSchema, UserStatsSchema, MAX_BULK_ITEMS,
+)
 
 # Create alias for db depends
 DbSession = Annotated[Session, Depends(get_db)]
+# GETs, on the read-only engine when SENTINEL_DB_SPLIT_READS is set
+ReadDbSession = Annotated[Session, Depends(get_read_db)]
+
+# Users are encoded straight to JSON bytes, response_model still documents them
+USER_JSON = ResponseSerializer(UserResponseSchema)
+
+# Page size of the users list
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Search results: a few pages of the best matches are read, not the whole list
+DEFAULT_SEARCH_SIZE = 20
+MAX_SEARCH_SIZE = 100
+SearchText = Annotated[str, Query(min_length=1, max_length=200, description="Words (or their beginnings) of the name or email")]
+
+# Rows committed together by an import
+DEFAULT_IMPORT_CHUNK = 500
+
+# The import body is read as a stream, not declared as a model
+IMPORT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {media_type: {"schema": {"type": "string"}} for media_type in MEDIA_TYPES.values()},
+    }
+}
+
+# Sparse fieldset: only these columns are selected and returned
+Fields = Annotated[str | None, Query(description="Comma separated fields to return, e.g. `id,name`")]
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """Fields of a `?fields=` parameter, None for all of them"""
+    try:
+        return USER_JSON.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+def users_page_response(page: Page, fields: tuple[str, ...] | None = None, etag: str | None = None) -> Response:
+    """JSON list of the page, with the token of the next one in `X-Next-Cursor`"""
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else {}
+    if etag is not None:
+        headers["ETag"] = etag
+    return USER_JSON.response(page.items, headers=headers, fields=fields)
+
+# GET /api/users/?ids=1,2,3: these users, with one query, instead of a page
+Ids = Annotated[str | None, Query(description=f"Comma separated ids (at most {MAX_PAGE_SIZE}), returned in this order")]
+
+def parse_ids(ids: str) -> list[int]:
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma separated integers")
+    if len(values) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_PAGE_SIZE} ids")
+    return values
+
+def users_query(ids: str | None, *page_query) -> tuple[list[int] | None, tuple]:
+    """(parsed ids or None, what tells the response apart in its ETag)"""
+    if ids is None:
+        return None, page_query
+    id_list = parse_ids(ids)
+    return id_list, ("ids", id_list, page_query[-1])
+
+# Conditional requests, see utils.etag
+IfNoneMatch = Annotated[str | None, Header(description="ETag of the cached copy: 304 if it is current")]
+IfMatch = Annotated[str | None, Header(description="ETag of the user: 412 if it was modified since")]
+
+def users_etag(table_version: int, *query) -> str:
+    """ETag of a users page: any write to the table, or another query, changes it"""
+    return make_etag("users", table_version, digest(*query))
+
+def user_etag(user, fields: tuple[str, ...] | None = None) -> str:
+    """ETag of a user, `"<id>.<version>"` (plus the digest of a sparse fieldset)"""
+    return user_version_etag(user.id, user.version, fields)
+
+def user_version_etag(id: int, version: int, fields: tuple[str, ...] | None = None) -> str:
+    return make_etag(id, version, digest(fields)) if fields else make_etag(id, version)
+
+def user_response(user, fields: tuple[str, ...] | None = None) -> Response:
+    return USER_JSON.response(user, headers={"ETag": user_etag(user, fields)}, fields=fields)
+
+def if_match_versions(if_match: str | None, id: int) -> list[int] | None:
+    """
+    Versions of user `id` named by an If-Match header, None when the write
+    is unconditional (no header, or `*`). Strong comparison: weak ETags and
+    ETags of another user name no version.
+    """
+    etags = parse_etags(if_match) if if_match is not None else None
+    if etags is None:
+        return None
+
+    versions = []
+    for etag in etags:
+        parts = etag.strip('"').split(".") if etag.startswith('"') else []
+        if len(parts) >= 2 and parts[0] == str(id) and parts[1].isdigit():
+            versions.append(int(parts[1]))
+    return versions
+
+def load_columns(columns: tuple[str, ...] | None) -> tuple[str, ...] | None:
+    """Columns to load for a sparse fieldset: the version is needed by the ETag"""
+    return (*columns, "version") if columns else None
 
 class UserRoutes:
     def __init__(self):
-        self.router = APIRouter()
+        # Sync handlers report their threadpool wait to the metrics
+        self.router = APIRouter(route_class=InstrumentedRoute)
         self.service = UserService()
 
+        # Static paths first, so they are not captured by "/{id}"
+        self.router.post("/bulk", response_model=BulkResponse)(self.bulk_create_users)
+        self.router.put("/bulk", response_model=BulkResponse)(self.bulk_update_users)
+        self.router.delete("/bulk", response_model=BulkResponse)(self.bulk_delete_users)
+        self.router.get("/me", response_model=CurrentUserSchema)(self.me)
+        self.router.get("/export", response_class=StreamingResponse)(self.export_users)
+        self.router.post("/import", response_model=ImportResponse, openapi_extra=IMPORT_REQUEST_BODY)(self.import_users)
+        self.router.get("/import/{import_id}", response_model=ImportResponse)(self.get_import)
+        self.router.get("/stream", response_class=StreamingResponse)(self.stream_changes)
+        self.router.get("/search", response_model=list[UserResponseSchema])(self.search_users)
+        self.router.get("/stats", response_model=UserStatsSchema)(self.get_stats)
+
         self.router.get("/", response_model=list[UserResponseSchema])(self.get_users)
         self.router.get("/{id}", response_model=UserResponseSchema)(self.get_user_by_id)
         self.router.post("/", response_model=UserResponseSchema)(self.create_user)
         self.router.put("/{id}", response_model=UserResponseSchema)(self.update_user)
         self.router.delete("/{id}", response_model=MessageResponse)(self.delete_user)
-        self.router.post("/login", response_model=UserResponseSchema)(self.login)
+        self.router.post("/login", response_model=LoginResponseSchema)(self.login)
 
-    def get_users(self, db: DbSession):
-        return self.service.get_users(db)
+    def get_users(
+        self,
+        db: ReadDbSession,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        role: RoleEnum | None = None,
+        email_prefix: str | None = None,
+        fields: Fields = None,
+        ids: Ids = None,
+        if_none_match: IfNoneMatch = None,
+    ):
+        """
+        Return one page of users, ordered by id.
+        The token of the next page is sent in the `X-Next-Cursor` header
+        (missing on the last page), pass it back as `?cursor=`.
+        With `?ids=1,2,3` return those users instead (one query, in that
+        order, missing ids left out); the other filters are ignored.
+        Send the `ETag` back in `If-None-Match`: 304 while no user changed.
+        """
+        columns = parse_fields(fields)
+        id_list, query = users_query(ids, limit, cursor, role, email_prefix, columns)
+        # Read first, in the transaction of the page: one primary key lookup
+        etag = users_etag(self.service.users_version(db), *query)
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+
+        if id_list is not None:
+            users = self.service.get_users_by_ids(db, id_list, columns)
+            return USER_JSON.response(users, headers={"ETag": etag}, fields=columns)
+        page = self.service.get_users(db, limit, cursor, role, email_prefix, columns)
+        return users_page_response(page, columns, etag)
     
-    def get_user_by_id(self, id: int, db: DbSession):
-        return self.service.get_user_by_id(db, id)
+    def search_users(
+        self,
+        db: ReadDbSession,
+        q: SearchText,
+        limit: Annotated[int, Query(ge=1, le=MAX_SEARCH_SIZE)] = DEFAULT_SEARCH_SIZE,
+        cursor: str | None = None,
+        fields: Fields = None,
+        if_none_match: IfNoneMatch = None,
+    ):
+        """
+        Search the users by name and email: every word of `q` must start a
+        word of one of them (`?q=jo smi` finds "John Smith"), case and
+        accents ignored. Best matches first, paginated like the list
+        (`X-Next-Cursor`), from a full text index instead of a scan.
+        The ranking depends on every user: a write between two pages may
+        repeat or skip a result.
+        """
+        columns = parse_fields(fields)
+        etag = users_etag(self.service.users_version(db), "search", q, limit, cursor, columns)
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+        return users_page_response(self.service.search_users(db, q, limit, cursor, columns), columns, etag)
+
+    def get_stats(self, db: ReadDbSession, response: Response, if_none_match: IfNoneMatch = None):
+        """
+        Number of users of each role, for dashboards. Read from counts kept
+        up to date by every write: the cost does not grow with the users.
+        """
+        etag = users_etag(self.service.users_version(db), "stats")
+        if not none_match(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return self.service.user_stats(db)
+
+    def get_user_by_id(self, id: int, db: ReadDbSession, fields: Fields = None, if_none_match: IfNoneMatch = None):
+        columns = parse_fields(fields)
+        if if_none_match is not None:
+            # Only the version is read to answer a 304
+            etag = user_version_etag(id, self.service.get_user_version(db, id), columns)
+            if not none_match(if_none_match, etag):
+                return not_modified(etag)
+        return user_response(self.service.get_user_by_id(db, id, load_columns(columns)), columns)
 
     def create_user(self, data: UserCreateSchema, db: DbSession):
-        return self.service.create_user(db, data)
+        return user_response(self.service.create_user(db, data))
     
-    def update_user(self, data: UserUpdateSchema, id: int, db: DbSession):
-        return self.service.update_user(db, data, id)
+    def update_user(self, data: UserUpdateSchema, id: int, db: DbSession, if_match: IfMatch = None):
+        return user_response(self.service.update_user(db, data, id, if_match_versions(if_match, id)))
     
-    def delete_user(self, id: int, db: DbSession):
-        return self.service.delete_user(db, id)
+    def delete_user(self, id: int, db: DbSession, if_match: IfMatch = None):
+        return self.service.delete_user(db, id, if_match_versions(if_match, id))
     
-    def login(self, data: LoginSchema, db: DbSession):
-        return self.service.login(db, data)
+    def login(self, data: LoginSchema, db: ReadDbSession, write_db: DbSession):
+        # The write session only takes the writer connection if the password is rehashed
+        return self.service.login(db, data, write_db)
+
+    def export_users(
+        self,
+        db: ReadDbSession,
+        format: DataFormat = DataFormat.ndjson,
+        role: RoleEnum | None = None,
+        fields: Fields = None,
+    ):
+        """
+        Stream every user (id, name, email, role) as NDJSON or CSV.
+        Rows are read from a server-side cursor and sent batch by batch:
+        the memory used does not depend on the number of users.
+        """
+        columns = parse_fields(fields) or EXPORT_FIELDS
+        batches = self.service.export_users(db, role, columns)
+        encode = encode_csv if format == DataFormat.csv else encode_ndjson
+        return StreamingResponse(
+            encode(batches, columns),
+            media_type=MEDIA_TYPES[format.value],
+            headers={"Content-Disposition": f'attachment; filename="users.{format.value}"'},
+        )
+
+    async def import_users(
+        self,
+        request: Request,
+        db: DbSession,
+        format: DataFormat = DataFormat.ndjson,
+        chunk_size: Annotated[int, Query(ge=1, le=MAX_BULK_ITEMS)] = DEFAULT_IMPORT_CHUNK,
+        import_id: Annotated[str | None, Header(alias="X-Import-Id", max_length=64)] = None,
+    ):
+        """
+        Create the users of an NDJSON or CSV (with header) upload.
+        The body is parsed while it arrives and committed `chunk_size` rows
+        at a time; rows that fail (invalid, duplicate email) are reported by
+        line and skipped. Follow a long import with GET /import/{X-Import-Id}.
+        An X-Import-Id already used by a running or recent import gets a 409.
+        """
+        try:
+            progress = import_tracker.start(import_id)
+        except DuplicateImportError:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import id already used")
+        # Each chunk is hashed and inserted on the threadpool
+        await import_users(
+            iter_records(request.stream(), format.value),
+            chunk_size,
+            progress,
+            lambda items: run_in_threadpool(self.service.import_chunk, db, items),
+        )
+        return progress
+
+    async def get_import(self, import_id: str):
+        """Progress of a running (or recent) import"""
+        progress = import_tracker.get(import_id)
+        if progress is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+        return progress
+
+    async def stream_changes(
+        self,
+        last_event_id: Annotated[str | None, Header(alias="Last-Event-ID")] = None,
+        since: Annotated[str | None, Query(alias="last_event_id")] = None,
+    ):
+        """
+        Follow the changes of the users as server-sent events (`created`,
+        `updated`, `deleted`), each `{"ids": [...], "users": [...] | null}`
+        (users with their version, null for deletes and bulk writes).
+        Reconnect with `Last-Event-ID` (or `?last_event_id=`) to resume;
+        `reset` means that point is gone: refetch the list, then follow.
+        """
+        return StreamingResponse(
+            sse_stream(user_changes, last_event_id or since, settings.sse_heartbeat_seconds),
+            media_type=SSE_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def me(self, claims: CurrentUser):
+        """
+        Return the authenticated user from its access token.
+        Answered from memory (signature + revocation list), no query.
+        """
+        return {"id": claims.user_id, "role": claims.role, "expires_at": claims.expires_at}
+
+    def bulk_create_users(self, data: UserBulkCreateSchema, db: DbSession):
+        return self.service.bulk_create_users(db, data)
+
+    def bulk_update_users(self, data: UserBulkUpdateListSchema, db: DbSession):
+        return self.service.bulk_update_users(db, data)
 
-# Export user routes to principal router
-user_routes = UserRoutes().router
+    def bulk_delete_users(self, data: UserBulkDeleteSchema, db: DbSession):
+        return self.service.bulk_delete_users(db, data)
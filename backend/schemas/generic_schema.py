@@ -1,5 +1,55 @@
+from enum import Enum
 from pydantic import BaseModel
 
 class MessageResponse(BaseModel):
     """Generic schema to message response"""
-    message: str
\ No newline at end of file
+    message: str
+
+class BulkItemResponse(BaseModel):
+    """Generic schema to the result of one item of a bulk operation"""
+    index: int
+    id: int | None = None
+    success: bool
+    error: str | None = None
+
+class BulkResponse(BaseModel):
+    """
+    Generic schema to bulk operation response
+    - succeeded (int)
+    - failed    (int)
+    - results   (list[BulkItemResponse]) in the same order as the request
+    """
+    succeeded: int
+    failed: int
+    results: list[BulkItemResponse]
+
+class DataFormat(str, Enum):
+    """Line-oriented formats of the exports and imports"""
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ImportRowError(BaseModel):
+    """Generic schema to a row rejected by an import"""
+    line: int
+    error: str
+
+class ImportResponse(BaseModel):
+    """
+    Generic schema to the progress (or outcome) of an import
+    - id                (str) pass it as X-Import-Id to follow a running import
+    - rows              (int) rows read so far
+    - created           (int)
+    - failed            (int)
+    - chunks            (int) transactions committed
+    - done              (bool)
+    - errors            (list[ImportRowError]) the first rejected rows
+    - errors_truncated  (int) rejected rows left out of `errors`
+    """
+    id: str
+    rows: int
+    created: int
+    failed: int
+    chunks: int
+    done: bool
+    errors: list[ImportRowError]
+    errors_truncated: int
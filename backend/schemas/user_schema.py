@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from models.user_model import RoleEnum
 
 class UserCreateSchema(BaseModel):
@@ -19,6 +19,33 @@ class UserUpdateSchema(BaseModel):
     password: str
     role: RoleEnum = RoleEnum.FeetManager
 
+class UserBulkUpdateSchema(UserUpdateSchema):
+    """
+    Schema to update one user inside a bulk update.
+    """
+    id: int
+
+# Max items accepted by a bulk request
+MAX_BULK_ITEMS = 5000
+
+class UserBulkCreateSchema(BaseModel):
+    """
+    Schema to create many users in one request
+    """
+    items: list[UserCreateSchema] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+class UserBulkUpdateListSchema(BaseModel):
+    """
+    Schema to update many users in one request
+    """
+    items: list[UserBulkUpdateSchema] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+class UserBulkDeleteSchema(BaseModel):
+    """
+    Schema to delete many users in one request
+    """
+    ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
 class UserResponseSchema(BaseModel):
     """
     Schema user response
@@ -28,6 +55,15 @@ class UserResponseSchema(BaseModel):
     email: str
     role: str
 
+class UserStatsSchema(BaseModel):
+    """
+    Schema of the user counts
+    - total     (int) users with a role
+    - by_role   (dict) users of each role, every role listed
+    """
+    total: int
+    by_role: dict[RoleEnum, int]
+
 class LoginSchema(BaseModel):
     """
     Schema to login
@@ -35,4 +71,23 @@ class LoginSchema(BaseModel):
     - password  (str)
     """
     email: str
-    password: str
\ No newline at end of file
+    password: str
+
+class LoginResponseSchema(UserResponseSchema):
+    """
+    Schema login response: the user plus its access token
+    - access_token  (str) send it as "Authorization: Bearer <token>"
+    - token_type    (str)
+    - expires_in    (int) seconds
+    """
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+class CurrentUserSchema(BaseModel):
+    """
+    Schema of the authenticated user, read from its token
+    """
+    id: int
+    role: str
+    expires_at: int
@@ -0,0 +1,150 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from core.security import password_hasher, token_signer
+from models.user_model import RoleEnum
+from repositories.async_user_repository import AsyncUserRepository
+from repositories.base_repository import DuplicateError, StaleVersionError
+from schemas.user_schema import UserCreateSchema, LoginSchema, UserBulkCreateSchema, UserBulkUpdateListSchema, UserBulkDeleteSchema
+from services.user_service import (
+    PUBLIC_FIELDS, email_taken, invalid_credentials, user_stats, login_response, publish_ids, publish_succeeded, publish_users, revoke_succeeded,
+)
+from utils.bulk import summarize
+from utils.pagination import InvalidCursorError
+
+class AsyncUserService:
+    """Async version of UserService, used when SENTINEL_DB_MODE=async"""
+
+    def __init__(self):
+        self.repository = AsyncUserRepository()
+
+    async def get_users(
+        self,
+        db: AsyncSession,
+        limit: int,
+        cursor: str | None = None,
+        role: RoleEnum | None = None,
+        email_prefix: str | None = None,
+        columns: tuple[str, ...] | None = None,
+    ):
+        filters = {"role": role} if role is not None else None
+        prefixes = {"email": email_prefix} if email_prefix else None
+
+        try:
+            # Read-only rows: the listed users are never modified
+            return await self.repository.get_page(db, limit, cursor, filters, prefixes, columns or PUBLIC_FIELDS)
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    async def search_users(
+        self,
+        db: AsyncSession,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+        columns: tuple[str, ...] | None = None,
+    ):
+        try:
+            return await self.repository.search(db, query, limit, cursor, columns or PUBLIC_FIELDS)
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    async def get_users_by_ids(self, db: AsyncSession, ids: list[int], columns: tuple[str, ...] | None = None):
+        """The users of `ids` that exist, in that order, with a single query"""
+        return await self.repository.get_many(db, ids, columns or PUBLIC_FIELDS)
+
+    async def user_stats(self, db: AsyncSession) -> dict:
+        return user_stats(await self.repository.counts(db, "role"))
+
+    async def users_version(self, db: AsyncSession) -> int:
+        """Change counter of the users table, the ETag of every list"""
+        return await self.repository.table_version(db)
+
+    async def get_user_version(self, db: AsyncSession, id: int) -> int:
+        """Version of a user, without loading it"""
+        version = await self.repository.get_version(db, id)
+        if version is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return version
+
+    async def get_user_by_id(self, db: AsyncSession, id: int, columns: tuple[str, ...] | None = None):
+        return await self._validate_user_exists(db, id, columns)
+
+    async def create_user(self, db: AsyncSession, data: UserCreateSchema):
+        items = await self._hash_passwords([data.model_dump()])
+        try:
+            user = await self.repository.create(db, items[0])
+        except DuplicateError:
+            raise email_taken()
+        publish_users("created", user)
+        return user
+
+    async def update_user(self, db: AsyncSession, data, id: int, versions: list[int] | None = None):
+        items = await self._hash_passwords([data.model_dump()])
+        try:
+            user = await self.repository.update(db, items[0], id, versions)
+        except DuplicateError:
+            raise email_taken()
+        except StaleVersionError:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User was modified")
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        token_signer.revocations.revoke(id)
+        publish_users("updated", user)
+        return user
+
+    async def delete_user(self, db: AsyncSession, id: int, versions: list[int] | None = None):
+        try:
+            deleted = await self.repository.delete(db, id, versions)
+        except StaleVersionError:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User was modified")
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        token_signer.revocations.revoke(id)
+        publish_ids("deleted", [id])
+        return { "message": f"User with id {id} deleted successfully" }
+
+    async def bulk_create_users(self, db: AsyncSession, data: UserBulkCreateSchema):
+        items = await self._hash_passwords([item.model_dump() for item in data.items])
+        return summarize(publish_succeeded("created", await self.repository.bulk_create(db, items)))
+
+    async def bulk_update_users(self, db: AsyncSession, data: UserBulkUpdateListSchema):
+        items = await self._hash_passwords([item.model_dump() for item in data.items])
+        return revoke_succeeded(publish_succeeded("updated", await self.repository.bulk_update(db, items)))
+
+    async def bulk_delete_users(self, db: AsyncSession, data: UserBulkDeleteSchema):
+        return revoke_succeeded(publish_succeeded("deleted", await self.repository.bulk_delete(db, data.ids)))
+
+    async def login(self, db: AsyncSession, data: LoginSchema, write_db: AsyncSession):
+        """Read on `db`, `write_db` only upgrades an old hash (see UserService.login)"""
+        user = await self.repository.get_by_email(db, data.email)
+
+        # Awaits the hasher executor, the event loop keeps serving requests.
+        # Also for an unknown email (against a dummy hash), see UserService.login
+        verified = await password_hasher.verify_async(data.password, user.password if user else password_hasher.dummy_hash)
+        if not user or not verified:
+            raise invalid_credentials()
+
+        if password_hasher.needs_rehash(user.password):
+            new_hash = await password_hasher.hash_async(data.password)
+            await db.commit()  # see release_read_lock
+            user = await self.repository.update(write_db, {"password": new_hash}, user.id)
+            if user is None:
+                # Deleted since the lookup
+                raise invalid_credentials()
+
+        return login_response(user)
+
+    async def _hash_passwords(self, items: list[dict]) -> list[dict]:
+        """Private method to replace the plaintext passwords by their hash"""
+        hashes = await password_hasher.hash_many_async(item["password"] for item in items)
+        for item, hashed in zip(items, hashes):
+            item["password"] = hashed
+        return items
+
+    async def _validate_user_exists(self, db: AsyncSession, id: int, columns: tuple[str, ...] | None = None):
+        """Private method to validate if the user instance exist"""
+        user = await self.repository.get(db, id, columns)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return user
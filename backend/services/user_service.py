@@ -1,52 +1,270 @@
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
+from core.change_feed import user_changes
+from core.security import password_hasher, token_signer
+from db.write_queue import release_read_lock
+from models.user_model import RoleEnum
+from repositories.base_repository import DuplicateError, StaleVersionError
 from repositories.user_repository import UserRepository
-from schemas.user_schema import UserCreateSchema, LoginSchema
+from schemas.user_schema import UserCreateSchema, LoginSchema, UserBulkCreateSchema, UserBulkUpdateListSchema, UserBulkDeleteSchema, UserResponseSchema
+from utils.bulk import BulkItemResult, ImportProgress, ImportTracker, summarize
+from utils.pagination import InvalidCursorError
+
+# Public fields of a user: the columns read for a list of users
+PUBLIC_FIELDS = tuple(UserResponseSchema.model_fields)
+# Columns of an export
+EXPORT_FIELDS = PUBLIC_FIELDS
+# Fields of a change event: the version orders the events of one user
+EVENT_FIELDS = (*PUBLIC_FIELDS, "version")
+# Rows fetched (and sent) at once by an export
+EXPORT_BATCH_SIZE = 1000
+
+# Recent imports, followed through GET /api/users/import/{id}
+import_tracker = ImportTracker()
+
+def login_response(user) -> dict:
+    """Body of a successful login: the user and a new access token"""
+    token, expires_in = token_signer.issue(user.id, user.role.value)
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": user.role.value,
+        "access_token": token,
+        "expires_in": expires_in,
+    }
+
+def user_stats(counts: dict) -> dict:
+    by_role = {role: counts.get(role, 0) for role in RoleEnum}
+    return {"total": sum(by_role.values()), "by_role": by_role}
+
+def invalid_credentials() -> HTTPException:
+    """Unknown email, wrong password, or a user deleted while logging in: the same answer"""
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+
+def email_taken() -> HTTPException:
+    """The only unique column a client writes: a retried create lands here"""
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+
+def publish_users(type: str, *users) -> None:
+    """Publish the change of committed users, with their public fields and version"""
+    user_changes.publish(type, {
+        "ids": [user.id for user in users],
+        "users": [{field: getattr(user, field) for field in EVENT_FIELDS} for user in users],
+    })
+
+def publish_ids(type: str, ids: list[int]) -> None:
+    """Publish a change known by ids only (deletes, bulk operations): fetch them with ?ids="""
+    if ids:
+        user_changes.publish(type, {"ids": ids, "users": None})
+
+def publish_succeeded(type: str, results: list[BulkItemResult]) -> list[BulkItemResult]:
+    """One event for the succeeded items of a bulk operation"""
+    publish_ids(type, [result.id for result in results if result.success])
+    return results
+
+def revoke_succeeded(results: list[BulkItemResult]) -> dict:
+    """Revoke the tokens of the users changed by a bulk operation, then summarize it"""
+    token_signer.revocations.revoke(*(result.id for result in results if result.success))
+    return summarize(results)
+
+async def import_users(
+    records: AsyncIterator[tuple[int, dict | None, str | None]],
+    chunk_size: int,
+    progress: ImportProgress,
+    commit_chunk: Callable[[list[dict]], Awaitable[list[BulkItemResult]]],
+) -> ImportProgress:
+    """
+    Validate the (line, record, error) of an upload as they are parsed and
+    hand them to `commit_chunk` (one bulk insert and commit) `chunk_size`
+    at a time. Only one chunk is held; `progress` is updated after each.
+    """
+    chunk: list[tuple[int, dict]] = []
+
+    async def flush():
+        results = await commit_chunk([item for _, item in chunk])
+        for (line, _), result in zip(chunk, results):
+            if result.success:
+                progress.created += 1
+            else:
+                progress.add_error(line, result.error)
+        progress.chunks += 1
+        chunk.clear()
+
+    async for line, record, error in records:
+        progress.rows += 1
+        if error is None:
+            try:
+                chunk.append((line, UserCreateSchema.model_validate(record).model_dump()))
+            except ValidationError as exc:
+                first = exc.errors()[0]
+                error = f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}"
+        if error is not None:
+            progress.add_error(line, error)
+        elif len(chunk) >= chunk_size:
+            await flush()
+
+    if chunk:
+        await flush()
+    progress.done = True
+    return progress
 
 class UserService:
     def __init__(self):
         self.repository = UserRepository()
 
-    def get_users(self, db: Session):
-        return self.repository.get_all(db)
+    def get_users(
+        self,
+        db: Session,
+        limit: int,
+        cursor: str | None = None,
+        role: RoleEnum | None = None,
+        email_prefix: str | None = None,
+        columns: tuple[str, ...] | None = None,
+    ):
+        filters = {"role": role} if role is not None else None
+        prefixes = {"email": email_prefix} if email_prefix else None
+
+        try:
+            # Read-only rows: the listed users are never modified
+            return self.repository.get_page(db, limit, cursor, filters, prefixes, columns or PUBLIC_FIELDS)
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     
-    def get_user_by_id(self, db: Session, id: int):
-        self._validate_user_exists(db, id)
-        return self.repository.get(db, id)
+    def search_users(
+        self,
+        db: Session,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+        columns: tuple[str, ...] | None = None,
+    ):
+        """Users whose name or email has words starting with those of `query`, best match first"""
+        try:
+            return self.repository.search(db, query, limit, cursor, columns or PUBLIC_FIELDS)
+        except InvalidCursorError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    def get_users_by_ids(self, db: Session, ids: list[int], columns: tuple[str, ...] | None = None):
+        """The users of `ids` that exist, in that order, with a single query"""
+        return self.repository.get_many(db, ids, columns or PUBLIC_FIELDS)
+
+    def users_version(self, db: Session) -> int:
+        """Change counter of the users table, the ETag of every list"""
+        return self.repository.table_version(db)
+
+    def user_stats(self, db: Session) -> dict:
+        """Users per role, read from the maintained counts (a few rows, whatever the number of users)"""
+        return user_stats(self.repository.counts(db, "role"))
+
+    def get_user_version(self, db: Session, id: int) -> int:
+        """Version of a user, without loading it"""
+        version = self.repository.get_version(db, id)
+        if version is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return version
+
+    def get_user_by_id(self, db: Session, id: int, columns: tuple[str, ...] | None = None):
+        return self._validate_user_exists(db, id, columns)
 
     def create_user(self, db: Session, data: UserCreateSchema):
-        return self.repository.create(db, data.model_dump())
+        try:
+            user = self.repository.create(db, self._hash_passwords([data.model_dump()])[0])
+        except DuplicateError:
+            raise email_taken()
+        publish_users("created", user)
+        return user
     
-    def update_user(self, db: Session, data, id: int):
-        self._validate_user_exists(db, id)
-        return self.repository.update(db, data.model_dump(), id)
+    def update_user(self, db: Session, data, id: int, versions: list[int] | None = None):
+        """
+        - versions: If-Match, only update the user at one of these versions
+                    (412 if it was modified since)
+        """
+        # The repository reports a missing user, no need to look it up first
+        try:
+            user = self.repository.update(db, self._hash_passwords([data.model_dump()])[0], id, versions)
+        except DuplicateError:
+            raise email_taken()
+        except StaleVersionError:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User was modified")
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        # Tokens issued before the change carry a stale role
+        token_signer.revocations.revoke(id)
+        publish_users("updated", user)
+        return user
     
-    def delete_user(self, db: Session, id: int):
-        self._validate_user_exists(db, id)
-        self.repository.delete(db, id)
+    def delete_user(self, db: Session, id: int, versions: list[int] | None = None):
+        try:
+            deleted = self.repository.delete(db, id, versions)
+        except StaleVersionError:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User was modified")
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        token_signer.revocations.revoke(id)
+        publish_ids("deleted", [id])
         return { "message": f"User with id {id} deleted successfully" }
     
-    def login(self, db: Session, data: LoginSchema):
+    def bulk_create_users(self, db: Session, data: UserBulkCreateSchema):
+        items = self._hash_passwords([item.model_dump() for item in data.items])
+        return summarize(publish_succeeded("created", self.repository.bulk_create(db, items)))
+
+    def bulk_update_users(self, db: Session, data: UserBulkUpdateListSchema):
+        items = self._hash_passwords([item.model_dump() for item in data.items])
+        return revoke_succeeded(publish_succeeded("updated", self.repository.bulk_update(db, items)))
+
+    def bulk_delete_users(self, db: Session, data: UserBulkDeleteSchema):
+        return revoke_succeeded(publish_succeeded("deleted", self.repository.bulk_delete(db, data.ids)))
+
+    def export_users(
+        self, db: Session, role: RoleEnum | None = None, columns: tuple[str, ...] = EXPORT_FIELDS
+    ) -> Iterator[list[tuple]]:
+        """Batches of `columns` tuples, streamed from the database"""
+        filters = {"role": role} if role is not None else None
+        return self.repository.iter_batches(db, columns, EXPORT_BATCH_SIZE, filters)
+
+    def import_chunk(self, db: Session, items: list[dict]) -> list[BulkItemResult]:
+        """Insert one chunk of an import, in a single transaction"""
+        return publish_succeeded("created", self.repository.bulk_create(db, self._hash_passwords(items)))
+
+    def login(self, db: Session, data: LoginSchema, write_db: Session):
+        """
+        The user is read on `db` (a read session): a login does not wait
+        for the writer. `write_db` is only used to upgrade an old hash.
+        """
         user = self.repository.get_by_email(db, data.email)
 
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password"
-            )
-        
-        if user.password != data.password:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password"
-            )
+        # The KDF runs on the hasher executor, bounded by its worker count.
+        # Also for an unknown email (against a dummy hash): the response time
+        # does not tell which emails are registered
+        verified = password_hasher.verify(data.password, user.password if user else password_hasher.dummy_hash)
+        if not user or not verified:
+            raise invalid_credentials()
+
+        # Stored with older parameters (or in plaintext): upgrade it now
+        if password_hasher.needs_rehash(user.password):
+            release_read_lock(db)
+            user = self.repository.update(write_db, {"password": password_hasher.hash(data.password)}, user.id)
+            if user is None:
+                # Deleted since the lookup
+                raise invalid_credentials()
         
-        return user
+        return login_response(user)
+
+    def _hash_passwords(self, items: list[dict]) -> list[dict]:
+        """Private method to replace the plaintext passwords by their hash"""
+        hashes = password_hasher.hash_many(item["password"] for item in items)
+        for item, hashed in zip(items, hashes):
+            item["password"] = hashed
+        return items
     
-    def _validate_user_exists(self, db: Session, id: int):
+    def _validate_user_exists(self, db: Session, id: int, columns: tuple[str, ...] | None = None):
         """Private method to validate if the user instance exist"""
-        user = self.repository.get(db, id)
+        user = self.repository.get(db, id, columns)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         return user
@@ -1,24 +1,48 @@
+import os
+import shutil
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+# Cheap scrypt work factor for the tests, set before the app reads its settings
+os.environ.setdefault("SENTINEL_SCRYPT_N", "16")
+# Databases of the run (the app's, for its lifespan, and the test one) in a
+# directory removed at the end: nothing is written to the working tree
+DATABASE_DIR = tempfile.mkdtemp(prefix="sentinel-tests-")
+os.environ["SENTINEL_DATABASE_URL"] = f"sqlite:///{DATABASE_DIR}/sentinel.db"
+os.environ.pop("SENTINEL_ASYNC_DATABASE_URL", None)     # Derived from it
+
 from main import app
-from db.session import Base, get_db
+from core.cache import cache_backend
+from core.idempotency import idempotency_store
+from core.security import token_signer
+from db.instrumentation import instrument_engine
+from db.query_recorder import QueryRecorder
+from db.session import Base, configure_sqlite, get_db, get_read_db
+from services.user_service import import_tracker
 
 # Database for testing
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{DATABASE_DIR}/test.db"
 
-engine = create_engine(
+engine = instrument_engine(configure_sqlite(create_engine(
     SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+)))
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 @pytest.fixture(scope="function")
 def db_session():
     """
     CREATE NEW SESSION DB FOR EACH TEST
     """
+    # Ids restart on each test, cached rows of the previous one would leak
+    if cache_backend is not None:
+        cache_backend.clear()
+    token_signer.revocations.clear()
+    idempotency_store.clear()
+    import_tracker.clear()
+
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -39,6 +63,71 @@ def client(db_session):
             db_session.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def async_client(db_session):
+    """
+    Test client over the async routes (SENTINEL_DB_MODE=async), same test db
+    """
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from db.async_session import get_async_db, get_async_write_db
+    from routes.async_user_routes import AsyncUserRoutes
+    from utils.idempotency import IdempotencyMiddleware
+
+    async_engine = create_async_engine(SQLALCHEMY_TEST_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"))
+    configure_sqlite(async_engine.sync_engine)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(AsyncUserRoutes().router, prefix="/api/users")
+    async_app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+    async_app.dependency_overrides[get_db] = lambda: db_session
+    async_app.dependency_overrides[get_read_db] = lambda: db_session
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_app.dependency_overrides[get_async_write_db] = override_get_async_db
+
+    with TestClient(async_app) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture(scope="function")
+def count_queries():
+    """
+    Record the SQL statements run on any engine (sync and async) inside a block:
+
+        with count_queries() as queries:
+            client.get("/api/users/1")
+        assert len(queries) == 1, queries
+    """
+    return QueryRecorder
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """
+    @pytest.mark.query_budget(n): the test fails when its body (fixtures
+    excluded) runs more than n SQL statements, listing them
+    """
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    with QueryRecorder() as queries:
+        result = yield
+    queries.check(marker.args[0], label=item.nodeid)
+    return result
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(DATABASE_DIR, ignore_errors=True)
@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils.admission import AdmissionController, AdmissionMiddleware, AdmissionPool, Rejected, parse_pools, parse_routes
+
+class TestAdmission:
+    """
+    Test the per-route concurrency limits and the load shedding
+    """
+
+    def _app(self, controller: AdmissionController, release: asyncio.Event):
+        async def app(scope, receive, send):
+            if scope["path"] == "/api/users/":
+                await release.wait()    # A slow list request
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+        return AdmissionMiddleware(app, controller)
+
+    def test_login_survives_a_list_flood(self):
+        controller = AdmissionController(
+            parse_pools("critical:2:4:1,default:2:4:1,list:2:2:0.05"),
+            parse_routes("POST /api/users/login=critical,GET /api/users/=list"),
+        )
+
+        async def flood():
+            release = asyncio.Event()
+            transport = httpx.ASGITransport(app=self._app(controller, release))
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                lists = [asyncio.create_task(client.get("/api/users/")) for _ in range(8)]
+                await asyncio.sleep(0.01)
+                login = await client.post("/api/users/login")
+                # 2 running, 2 queued: the others are rejected on arrival
+                stats = controller.pools["list"].stats()
+                await asyncio.sleep(0.1)
+                release.set()
+                return login, stats, await asyncio.gather(*lists)
+
+        login, stats, lists = asyncio.run(flood())
+
+        assert login.status_code == 200
+        assert (stats.active, stats.queued, stats.queue_full) == (2, 2, 4)
+        rejected = [response for response in lists if response.status_code == 503]
+        assert len(rejected) == 6   # 4 on arrival, 2 after waiting 50 ms
+        assert rejected[0].headers["Retry-After"] == "1"
+        assert controller.pools["list"].stats().timed_out == 2
+        assert controller.pools["list"].stats().active == 0
+
+    def test_release_as_the_wait_times_out(self):
+        async def race():
+            pool = AdmissionPool("test", limit=1, max_queue=1, max_wait=0.01)
+            await pool.acquire()
+            waiting = asyncio.create_task(pool.acquire())
+            await asyncio.sleep(0)
+            # Runs once the timeout has cancelled the waiter, before acquire() handles it
+            pool._waiters[0].add_done_callback(lambda _: pool.release())
+            with pytest.raises(Rejected):
+                await waiting
+            return pool.stats()
+
+        stats = asyncio.run(race())
+
+        assert (stats.active, stats.queued, stats.timed_out) == (0, 0, 1)
+
+    def test_released_slot_goes_to_the_oldest_waiter(self):
+        async def handoff():
+            pool = AdmissionPool("test", limit=1, max_queue=2, max_wait=1)
+            await pool.acquire()
+            order = []
+
+            async def wait(name):
+                await pool.acquire()
+                order.append(name)
+
+            waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+            await asyncio.sleep(0.01)
+            pool.release()
+            await asyncio.sleep(0.01)
+            assert order == ["first"] and pool.stats().active == 1
+            pool.release()
+            await asyncio.gather(*waiters)
+            pool.release()
+            return order, pool.stats()
+
+        order, stats = asyncio.run(handoff())
+        assert order == ["first", "second"]
+        assert (stats.active, stats.queued, stats.admitted) == (0, 0, 3)
+
+    def test_unknown_pool_is_rejected(self):
+        with pytest.raises(ValueError, match="missing"):
+            AdmissionController(parse_pools("default:1:0:0"), parse_routes("GET /x=missing"))
@@ -0,0 +1,12 @@
+import pytest
+
+from tests import test_user_routes
+
+class TestAsyncUserRoutes(test_user_routes.TestUserRoutes):
+    """
+    Run every user route test against the async routes (SENTINEL_DB_MODE=async)
+    """
+
+    @pytest.fixture
+    def client(self, async_client):
+        return async_client
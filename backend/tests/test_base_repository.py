@@ -0,0 +1,168 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import Row, text
+
+from models.user_model import RoleEnum
+from repositories.base_repository import StaleVersionError, prefix_upper_bound
+from repositories.user_repository import UserRepository
+from schemas.user_schema import UserResponseSchema
+
+class TestReadonlyQueries:
+    """
+    Unit test for the read-only queries of BaseRepository
+    """
+
+    @pytest.fixture
+    def users(self, db_session):
+        repository = UserRepository()
+        repository.cache = None
+        repository.bulk_create(db_session, [
+            {"name": f"User {i}", "email": f"user{i}@example.com", "password": "hash", "role": RoleEnum.Driver}
+            for i in range(3)
+        ])
+        db_session.expunge_all()
+        return repository
+
+    def test_rows_are_not_tracked(self, db_session, users):
+        rows = users.get_all_readonly(db_session)
+
+        assert [row.email for row in rows] == [f"user{i}@example.com" for i in range(3)]
+        assert all(isinstance(row, Row) for row in rows)
+        assert rows[0].role is RoleEnum.Driver
+        assert len(db_session.identity_map) == 0
+
+    def test_rows_are_immutable(self, db_session, users):
+        row = users.get_readonly(db_session, 1)
+
+        with pytest.raises(AttributeError):
+            row.name = "Changed"
+
+    def test_only_requested_columns(self, db_session, users):
+        row = users.get_readonly(db_session, 2, ["email"])
+
+        assert row._mapping == {"id": 2, "email": "user1@example.com"}
+        assert users.get_readonly(db_session, 99) is None
+
+    def test_rows_validate_as_response(self, db_session, users):
+        row = users.get_readonly(db_session, 1)
+
+        user = UserResponseSchema.model_validate(row, from_attributes=True)
+        assert user.model_dump() == {"id": 1, "name": "User 0", "email": "user0@example.com", "role": RoleEnum.Driver}
+
+        with pytest.raises(ValidationError):
+            UserResponseSchema.model_validate(users.get_readonly(db_session, 1, ["name"]), from_attributes=True)
+
+    def test_page_of_rows(self, db_session, users):
+        page = users.get_page(db_session, 2, columns=["name"], filters={"role": RoleEnum.Driver})
+
+        assert [tuple(row) for row in page.items] == [(1, "User 0"), (2, "User 1")]
+        assert page.next_cursor is not None
+        assert len(db_session.identity_map) == 0
+
+    def test_prefix_at_the_end_of_unicode(self, db_session, users):
+        assert prefix_upper_bound("user") == "uses"
+        assert prefix_upper_bound("a\ud7ff") == "a\ue000"            # Skips the surrogates
+        assert prefix_upper_bound("a\U0010ffff\U0010ffff") == "b"
+        assert prefix_upper_bound("\U0010ffff") is None
+
+        page = users.get_page(db_session, 10, columns=["email"], prefixes={"email": "user1\U0010ffff"})
+        assert page.items == []
+        page = users.get_page(db_session, 10, columns=["email"], prefixes={"email": "\U0010ffff"})
+        assert page.items == []
+
+class TestPrebuiltStatements:
+    """
+    Unit test for the statements built once per repository
+    """
+
+    @pytest.fixture
+    def repository(self, db_session):
+        repository = UserRepository()
+        repository.cache = None
+        repository.create(db_session, {"name": "Ana", "email": "ana@example.com", "password": "hash"})
+        return repository
+
+    def test_update_sets_only_given_columns(self, db_session, repository):
+        user = repository.update(db_session, {"name": "Ana B."}, 1)
+
+        assert (user.name, user.email, user.password, user.version) == ("Ana B.", "ana@example.com", "hash", 2)
+        assert repository.update(db_session, {"name": "Nobody"}, 99) is None
+
+    def test_lookups_reuse_their_statement(self, db_session, repository):
+        statement = repository._select_by("email")
+
+        assert repository.get_by_email(db_session, "ana@example.com").id == 1
+        assert repository.get_by_email(db_session, "nobody@example.com") is None
+        assert repository._select_by("email") is statement
+        assert repository.get(db_session, 1).email == "ana@example.com"
+
+    def test_writes_bump_versions(self, db_session, repository):
+        before = repository.table_version(db_session)
+
+        repository.bulk_update(db_session, [{"id": 1, "name": "Ana C."}])
+
+        assert repository.get_version(db_session, 1) == 2
+        assert repository.table_version(db_session) == before + 1
+        with pytest.raises(StaleVersionError):
+            repository.delete(db_session, 1, versions=[1])
+        assert repository.delete(db_session, 1, versions=[1, 2]) is True
+        assert repository.get_version(db_session, 1) is None
+
+class TestSearch:
+    """
+    Unit test for the full text search of BaseRepository
+    """
+
+    @pytest.fixture
+    def repository(self, db_session):
+        repository = UserRepository()
+        repository.bulk_create(db_session, [
+            {"name": f"Driver {i}", "email": f"driver{i}@example.com", "password": "pass"} for i in range(5)
+        ])
+        return repository
+
+    def test_pages_cover_every_match_once(self, db_session, repository):
+        ids, cursor = [], None
+        while True:
+            page = repository.search(db_session, "driv", 2, cursor)
+            ids += [row.id for row in page.items]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert sorted(ids) == [1, 2, 3, 4, 5]
+
+    def test_only_the_first_matches_are_ranked(self, db_session, repository, monkeypatch):
+        monkeypatch.setattr("repositories.base_repository.MAX_RANKED", 3)
+
+        assert sorted(row.id for row in repository.search(db_session, "driver", 10).items) == [1, 2, 3]
+        assert repository.search(db_session, "   ", 10).items == []
+
+class TestCounts:
+    """
+    Unit test for the per-role counts maintained by triggers
+    """
+
+    def test_writes_keep_counts_exact(self, db_session):
+        repository = UserRepository()
+        results = repository.bulk_create(db_session, [
+            {"name": f"Counted {i}", "email": f"counted{i}@example.com", "password": "pass", "role": role}
+            for i, role in enumerate([RoleEnum.Driver, RoleEnum.Driver, RoleEnum.Administrator])
+        ])
+        repository.update(db_session, {"role": RoleEnum.FeetManager}, results[0].id)
+        repository.update(db_session, {"name": "Renamed"}, results[1].id)  # Role untouched
+        repository.delete(db_session, results[2].id)
+
+        assert repository.counts(db_session, "role") == {RoleEnum.Driver: 1, RoleEnum.FeetManager: 1}
+        assert repository.reconcile_counts(db_session, "role") == {}
+
+    def test_reconcile_fixes_drift(self, db_session):
+        repository = UserRepository()
+        repository.create(db_session, {"name": "Ana", "email": "ana@example.com", "password": "pass", "role": RoleEnum.Driver})
+        db_session.execute(text("UPDATE users_role_counts SET count = 7"))
+        db_session.execute(text("INSERT INTO users_role_counts (role, count) VALUES ('Administrator', 2)"))
+        db_session.commit()
+
+        drift = repository.reconcile_counts(db_session, "role")
+
+        assert drift == {RoleEnum.Driver: (7, 1), RoleEnum.Administrator: (2, 0)}
+        assert repository.counts(db_session, "role") == {RoleEnum.Driver: 1}
@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from db.batch_loader import BatchLoader
+from repositories.user_repository import UserRepository
+
+class TestBatchLoader:
+    """
+    Test the coalescing of the concurrent lookups by id
+    """
+
+    @pytest.fixture
+    def repository(self, db_session):
+        repository = UserRepository()
+        repository.cache = None
+        repository.bulk_create(db_session, [
+            {"name": f"Loaded {i}", "email": f"loaded{i}@example.com", "password": "pass"} for i in range(8)
+        ])
+        session_factory = sessionmaker(bind=db_session.get_bind(), autoflush=False, expire_on_commit=False)
+        # A long delay so the concurrent lookups share a batch
+        repository.batch_loader = BatchLoader(session_factory, repository.load_by_ids, max_batch=16, max_delay=0.2)
+        yield repository
+        repository.batch_loader.shutdown()
+
+    def test_concurrent_lookups_share_a_query(self, repository, count_queries):
+        def get(id):
+            with repository.batch_loader.session_factory() as db:
+                return repository.get(db, id)
+
+        with count_queries() as queries, ThreadPoolExecutor(8) as pool:
+            users = list(pool.map(get, [1, 2, 3, 4, 1, 1, 99, 2]))
+
+        assert [user.id if user else None for user in users] == [1, 2, 3, 4, 1, 1, None, 2]
+        assert users[0] is users[4]  # Single flight: one row for both lookups
+
+        stats = repository.batch_loader.stats()
+        assert stats.lookups == 8
+        assert stats.shared == 3
+        assert stats.batches == len(queries) < 5
+        assert "IN (" in queries[0]
+
+    def test_async_lookups_share_a_query(self, repository):
+        async def load_all():
+            return await asyncio.gather(*(repository.batch_loader.load_async(id) for id in (5, 6, 5)))
+
+        users = asyncio.run(load_all())
+
+        assert [user.name for user in users] == ["Loaded 4", "Loaded 5", "Loaded 4"]
+        assert repository.batch_loader.stats().batches == 1
+
+    def test_failed_query_fails_its_batch(self, repository):
+        def broken(db, ids):
+            raise RuntimeError("database is gone")
+
+        loader = BatchLoader(repository.batch_loader.session_factory, broken, max_delay=0)
+        with pytest.raises(RuntimeError):
+            loader.load(1)
+        loader.shutdown()
+
+    def test_later_lookup_sees_committed_write(self, repository, db_session):
+        assert repository.get(db_session, 1).name == "Loaded 0"
+
+        repository.update(db_session, {"name": "Renamed"}, 1)
+
+        assert repository.get(db_session, 1).name == "Renamed"
@@ -0,0 +1,113 @@
+import time
+
+from sqlalchemy import event
+
+from models.user_model import User
+from repositories.user_repository import UserRepository
+from utils.cache.entity_cache import EntityCache
+from utils.cache.memory import InMemoryCache
+
+class TestInMemoryCache:
+    """
+    Unit test for the in-process cache backend
+    """
+
+    def test_hit_and_miss_counters(self):
+        cache = InMemoryCache(max_entries=10, ttl=None)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = InMemoryCache(max_entries=2, ttl=None)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")      # "b" is now the least recently used
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats().evictions == 1
+
+    def test_entries_expire(self):
+        cache = InMemoryCache(max_entries=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.stats().expirations == 1
+
+
+class TestEntityCache:
+    """
+    Test the read-through cache of UserRepository
+    """
+
+    def _repository(self):
+        repository = UserRepository()
+        repository.cache = EntityCache(InMemoryCache(ttl=None), User, secondary_keys=("email",))
+        return repository
+
+    def _user(self, email="cache@example.com"):
+        return {"name": "Cache User", "email": email, "password": "pass"}
+
+    def test_get_is_served_from_cache(self, db_session):
+        repository = self._repository()
+        user = repository.create(db_session, self._user())
+        db_session.expunge_all()
+
+        repository.get(db_session, user.id)     # Miss, loads the row
+        db_session.expunge_all()
+        cached = repository.get(db_session, user.id)
+
+        assert cached.email == "cache@example.com"
+        assert repository.cache.backend.stats().hits == 1
+
+    def test_get_by_email_is_served_from_cache(self, db_session):
+        repository = self._repository()
+        user = repository.create(db_session, self._user())
+
+        repository.get_by_email(db_session, "cache@example.com")
+        cached = repository.get_by_email(db_session, "cache@example.com")
+
+        assert cached.id == user.id
+        assert repository.cache.backend.stats().hits == 2   # email pointer + row
+
+    def test_update_invalidates_on_commit(self, db_session):
+        repository = self._repository()
+        user = repository.create(db_session, self._user())
+        repository.get_by_email(db_session, "cache@example.com")
+
+        repository.update(db_session, {"name": "Renamed", "email": "renamed@example.com"}, user.id)
+        db_session.expunge_all()
+
+        assert repository.get(db_session, user.id).name == "Renamed"
+        assert repository.get_by_email(db_session, "cache@example.com") is None
+
+    def test_delete_invalidates_on_commit(self, db_session):
+        repository = self._repository()
+        user = repository.create(db_session, self._user())
+        repository.get(db_session, user.id)
+
+        repository.delete(db_session, user.id)
+
+        assert repository.get(db_session, user.id) is None
+
+    def test_row_invalidated_during_the_read_is_not_cached(self, db_session):
+        repository = self._repository()
+        repository.batch_loader = None
+        user = repository.create(db_session, self._user())
+        db_session.expunge_all()
+
+        # A write to the row commits between the SELECT and the cache fill
+        event.listen(db_session, "do_orm_execute", lambda state: repository.cache.invalidate(user.id), once=True)
+        repository.get(db_session, user.id)
+
+        assert repository.cache.backend.get(f"users:{user.id}") is None
+        repository.get(db_session, user.id)
+        assert repository.cache.backend.get(f"users:{user.id}") is not None
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+
+from main import app
+from core.change_feed import user_changes
+from utils.change_feed import ChangeFeed
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+class TestChangeFeed:
+    """
+    Unit test of the in-process pub/sub and its resume points
+    """
+
+    def test_subscribers_receive_events_in_order(self):
+        async def follow():
+            feed = ChangeFeed()
+            subscription = feed.subscribe()
+            feed.publish("created", {"ids": [1]})
+            # Published from another thread, e.g. a sync request handler
+            thread = threading.Thread(target=feed.publish, args=("deleted", {"ids": [1]}))
+            thread.start()
+            thread.join()
+            return [(event.seq, event.type, json.loads(event.data)) for event in await subscription.next(1)]
+
+        assert _run(follow()) == [(1, "created", {"ids": [1]}), (2, "deleted", {"ids": [1]})]
+
+    def test_resume_after_last_event_id(self):
+        async def resume():
+            feed = ChangeFeed(history=10)
+            first = feed.publish("created", {"ids": [1]})
+            feed.publish("created", {"ids": [2]})
+            subscription = feed.subscribe(first.id)
+            return subscription.reset, [event.seq for event in await subscription.next(0)]
+
+        assert _run(resume()) == (False, [2])
+
+    def test_reset_when_the_point_is_gone(self):
+        async def resume(last_event_id):
+            feed = ChangeFeed(history=2)
+            events = [feed.publish("updated", {"ids": [i]}) for i in range(5)]
+            return feed.subscribe(last_event_id(events)).reset
+
+        # Trimmed from the history, or an id of another process (restart)
+        assert _run(resume(lambda events: events[0].id)) is True
+        assert _run(resume(lambda events: "0000-3")) is True
+        assert _run(resume(lambda events: events[2].id)) is False
+
+    def test_slow_subscriber_is_dropped_without_blocking(self):
+        async def flood():
+            feed = ChangeFeed(max_buffer=3)
+            slow, fast = feed.subscribe(), feed.subscribe()
+            for i in range(3):
+                feed.publish("created", {"ids": [i]})
+            assert len(await fast.next(0)) == 3
+            # The slow one is full: the next event drops it, the fast one gets it
+            feed.publish("created", {"ids": [3]})
+            return slow.dropped, await slow.next(0), len(await fast.next(0)), feed.stats()
+
+        dropped, buffered, received, stats = _run(flood())
+        assert dropped is True and buffered == []
+        assert received == 1
+        assert (stats.published, stats.subscribers, stats.dropped) == (4, 1, 1)
+
+    def test_stream_route_sends_changes(self, client):
+        """The stream never ends: drive the ASGI app directly, the test client would wait for the end"""
+        async def stream():
+            received = asyncio.Queue()
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                await received.put(message)
+
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": "/api/users/stream", "raw_path": b"/api/users/stream", "root_path": "",
+                "query_string": b"", "headers": [], "server": ("test", 80), "client": ("test", 1),
+            }
+            task = asyncio.create_task(app(scope, receive, send))
+            start = await received.get()
+            assert (await received.get())["body"].startswith(b"retry:")
+
+            event = user_changes.publish("updated", {"ids": [7], "users": None})
+            body = (await asyncio.wait_for(received.get(), 1))["body"]
+            disconnect.set()
+            await asyncio.wait_for(task, 1)
+            return start, event, body
+
+        start, event, body = _run(stream())
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+        assert body == b'id: %s\nevent: updated\ndata: {"ids":[7],"users":null}\n\n' % event.id.encode()
+        assert user_changes.stats().subscribers == 0
+
+    def test_writes_publish_events(self, client):
+        async def publish():
+            subscription = user_changes.subscribe()
+            created = client.post("/api/users/", json={"name": "Fed", "email": "fed@example.com", "password": "pass"})
+            id = created.json()["id"]
+            client.put(f"/api/users/{id}", json={"name": "Fed 2", "email": "fed@example.com", "password": "pass"})
+            client.delete(f"/api/users/{id}")
+            events = await subscription.next(1)
+            user_changes.unsubscribe(subscription)
+            return id, [(event.type, json.loads(event.data)) for event in events]
+
+        id, events = _run(publish())
+        assert [type for type, _ in events] == ["created", "updated", "deleted"]
+        assert events[1][1]["users"][0]["name"] == "Fed 2"
+        assert events[1][1]["users"][0]["version"] == 2
+        assert events[2][1] == {"ids": [id], "users": None}
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from db.schema import ensure_schema, init_schema, schema_fingerprint
+from core.config import settings
+from db.session import begin_immediate, configure_sqlite
+from db.table_versions import table_version
+
+PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": "1234"}
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'session.db'}"
+
+
+class TestConfigureSqlite:
+    """
+    Unit test of the per-connection SQLite setup
+    """
+
+    def test_pragmas_applied_on_connect(self, database_url):
+        engine = configure_sqlite(create_engine(database_url), PRAGMAS)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+        engine.dispose()
+
+    def test_read_only_engine_rejects_writes(self, database_url):
+        writer = configure_sqlite(create_engine(database_url), PRAGMAS)
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+        reader = configure_sqlite(create_engine(database_url), PRAGMAS, read_only=True)
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+
+        reader.dispose()
+        writer.dispose()
+
+    def test_concurrent_read_then_write(self, database_url):
+        engine = configure_sqlite(create_engine(database_url), settings.sqlite_pragmas)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1, 0)"))
+
+        writers = begin_immediate(engine)
+        barrier = threading.Barrier(8)
+
+        def read_then_write(_):
+            barrier.wait()
+            with writers.begin() as conn:
+                # Deferred, another commit between the SELECT and the UPDATE
+                # would fail the UPDATE at once with "database is locked"
+                x = conn.execute(text("SELECT x FROM t WHERE id = 1")).scalar()
+                time.sleep(0.01)
+                conn.execute(text("UPDATE t SET x = :x WHERE id = 1"), {"x": x + 1})
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(read_then_write, range(8)))
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT x FROM t")).scalar() == 8     # No update lost either
+        engine.dispose()
+
+
+class TestInitSchema:
+    """
+    Unit test of the schema upgrade of an existing database
+    """
+
+    def test_adds_missing_columns_and_triggers(self, database_url):
+        engine = create_engine(database_url)
+        with engine.begin() as conn:
+            # users as created before the version column and the change counter
+            conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR UNIQUE, password VARCHAR, role VARCHAR(13))"))
+            conn.execute(text("INSERT INTO users (name, email, password, role) VALUES ('Ana', 'ana@example.com', 'x', 'Driver')"))
+
+        init_schema(engine)
+        init_schema(engine)  # Nothing left to add the second time
+
+        with engine.begin() as conn:
+            assert conn.execute(text("SELECT version FROM users")).scalar() == 1
+            assert table_version(conn, "users") == 0
+            # Counted from the stored rows
+            assert conn.execute(text("SELECT role, count FROM users_role_counts")).all() == [("Driver", 1)]
+            conn.execute(text("UPDATE users SET name = 'Ana B.'"))
+            conn.execute(text("DELETE FROM users"))
+            assert table_version(conn, "users") == 2
+        engine.dispose()
+
+    def test_builds_search_index_of_existing_rows(self, database_url):
+        engine = create_engine(database_url)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR UNIQUE, password VARCHAR, role VARCHAR(13))"))
+            conn.execute(text("INSERT INTO users (name, email, password, role) VALUES ('José Pérez', 'jp@example.com', 'x', 'Driver')"))
+
+        init_schema(engine)
+        init_schema(engine)  # Not rebuilt (nor indexed twice) the second time
+
+        with engine.begin() as conn:
+            search = text("SELECT rowid FROM users_fts WHERE users_fts MATCH :match")
+            assert conn.execute(search, {"match": '"pere"*'}).scalars().all() == [1]
+            conn.execute(text("UPDATE users SET name = 'Ana' WHERE id = 1"))
+            assert conn.execute(search, {"match": '"pere"*'}).scalars().all() == []
+            assert conn.execute(search, {"match": '"ana"*'}).scalars().all() == [1]
+            conn.execute(text("INSERT INTO users_fts (users_fts) VALUES ('integrity-check')"))
+        engine.dispose()
+
+    def test_ensure_schema_skipped_when_applied(self, database_url):
+        engine = create_engine(database_url)
+        assert ensure_schema(engine)
+        assert not ensure_schema(engine)  # Same fingerprint stored: no DDL
+
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE schema_fingerprint SET fingerprint = 'older'"))
+        assert ensure_schema(engine)  # Declared schema changed since
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT fingerprint FROM schema_fingerprint")).scalar() == schema_fingerprint(engine.dialect)
+        engine.dispose()
@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from utils.cache.memory import InMemoryCache
+from utils.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+class TestIdempotency:
+    """
+    Test the replay of the requests sent with an Idempotency-Key
+    """
+
+    def _app(self, status: int = 201, body: bytes = b"created", **options):
+        calls = []
+
+        async def app(scope, receive, send):
+            message = await receive()
+            calls.append(message["body"])
+            await asyncio.sleep(0.05)   # Long enough for the duplicates to arrive
+            await send({"type": "http.response.start", "status": status, "headers": [(b"x-call", str(len(calls)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+
+        store = IdempotencyStore(InMemoryCache(100, 60))
+        return IdempotencyMiddleware(app, store, **options), store, calls
+
+    def _post(self, app, *bodies, key="key-1", path="/users", headers=None):
+        async def post():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(
+                    client.post(path, content=body, headers={"Idempotency-Key": key, **(headers or {})}) for body in bodies
+                ))
+        return asyncio.run(post())
+
+    def test_concurrent_duplicates_wait_for_the_first(self):
+        app, store, calls = self._app()
+
+        responses = self._post(app, b"same", b"same", b"same")
+
+        assert calls == [b"same"]
+        assert [response.status_code for response in responses] == [201, 201, 201]
+        assert {response.headers["x-call"] for response in responses} == {"1"}
+        assert sorted(response.headers.get("idempotent-replayed", "") for response in responses) == ["", "true", "true"]
+        stats = store.stats()
+        assert (stats.stored, stats.replayed, stats.waited, stats.in_flight) == (1, 2, 2, 0)
+
+    def test_server_errors_are_not_stored(self):
+        app, store, calls = self._app(status=503)
+
+        self._post(app, b"same")
+        self._post(app, b"same")
+
+        assert len(calls) == 2
+        assert store.stats().stored == 0
+
+    def test_large_responses_are_not_stored(self):
+        app, store, calls = self._app(body=b"x" * 101, max_body_bytes=100)
+
+        first, = self._post(app, b"same")
+        second, = self._post(app, b"same")
+
+        assert first.content == second.content == b"x" * 101
+        assert len(calls) == 2
+        assert (store.stats().stored, store.stats().too_large) == (0, 2)
+
+    def test_excluded_paths_are_not_stored(self):
+        app, store, calls = self._app(excluded_paths={"/login"})
+
+        self._post(app, b"same", path="/login")
+        self._post(app, b"same", path="/login")
+
+        assert len(calls) == 2
+        assert store.stats().stored == 0
+
+    def test_keys_are_scoped_by_caller(self):
+        app, store, calls = self._app()
+
+        first, = self._post(app, b"same", headers={"Authorization": "Bearer alice"})
+        other, = self._post(app, b"same", headers={"Authorization": "Bearer bob"})
+        retry, = self._post(app, b"same", headers={"Authorization": "Bearer alice"})
+
+        assert len(calls) == 2
+        assert "idempotent-replayed" not in other.headers
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert retry.headers["x-call"] == first.headers["x-call"] == "1"
@@ -0,0 +1,86 @@
+from utils.metrics.registry import MetricsRegistry, histogram_samples
+
+class TestMetricsRegistry:
+    """
+    Unit test of the Prometheus text rendering
+    """
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5, "/a")
+
+        text = registry.render()
+
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{route="/a"} 3' in text
+
+    def test_counter_and_collector(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests", ("status",)).inc(200)
+        registry.collector(lambda: [("depth", "Depth", "gauge", [({}, 7)])])
+
+        text = registry.render()
+
+        assert 'requests_total{status="200"} 1' in text
+        assert "depth 7" in text
+
+    def test_collected_histogram(self):
+        registry = MetricsRegistry()
+        counts = {1: 2, 4: 1, float("inf"): 1}    # Sizes 1, 1, 3 and 9
+        registry.collector(lambda: [("batch_size", "Size", "histogram", histogram_samples((1, 2, 4), counts, 14))])
+
+        text = registry.render()
+
+        assert "# TYPE batch_size histogram" in text
+        assert 'batch_size_bucket{le="1"} 2' in text
+        assert 'batch_size_bucket{le="2"} 2' in text
+        assert 'batch_size_bucket{le="4"} 3' in text
+        assert 'batch_size_bucket{le="+Inf"} 4' in text
+        assert "batch_size_sum 14" in text
+        assert "batch_size_count 4" in text
+
+
+class TestRequestMetrics:
+    """
+    Test the metrics middleware over the app
+    """
+
+    def _create_user(self, client):
+        return client.post("/api/users/", json={
+            "name": "Metrics User", "email": "metrics@example.com", "password": "pass",
+        }).json()
+
+    def test_server_timing_reports_queries(self, client):
+        user = self._create_user(client)
+
+        response = client.get(f"/api/users/{user['id']}")
+
+        server_timing = response.headers["server-timing"]
+        assert "app;dur=" in server_timing
+        assert 'db;dur=' in server_timing and 'desc="1 queries"' in server_timing
+        assert "threadpool;dur=" in server_timing
+
+    def test_metrics_endpoint_per_route(self, client):
+        user = self._create_user(client)
+        client.get(f"/api/users/{user['id']}")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/api/users/{id}",status="200"}' in response.text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/users/{id}",le="+Inf"}' in response.text
+        assert "http_request_db_queries_count" in response.text
+        assert "threadpool_tasks_waiting" in response.text
+
+    def test_unmatched_routes_share_a_label(self, client):
+        client.get("/api/nowhere/1")
+        client.get("/api/nowhere/2")
+
+        assert 'route="<unmatched>",status="404"' in client.get("/metrics").text
@@ -0,0 +1,63 @@
+import asyncio
+
+from utils.security.password_hasher import PasswordHasher
+
+class TestPasswordHasher:
+    """
+    Unit test for the scrypt password hasher
+    """
+
+    def test_hash_and_verify(self):
+        hasher = PasswordHasher(n=16, max_workers=2)
+        stored = hasher.hash("secret")
+
+        assert stored.startswith("scrypt$n=16,r=8,p=1$")
+        assert hasher.verify("secret", stored)
+        assert not hasher.verify("wrong", stored)
+        assert hasher.hash("secret") != stored    # Salted
+
+    def test_async_api(self):
+        hasher = PasswordHasher(n=16, max_workers=2)
+
+        async def run():
+            stored = await hasher.hash_async("secret")
+            return await hasher.verify_async("secret", stored), await hasher.verify_async("wrong", stored)
+
+        assert asyncio.run(run()) == (True, False)
+
+    def test_needs_rehash_when_parameters_change(self):
+        old = PasswordHasher(n=16)
+        new = PasswordHasher(n=32)
+        stored = old.hash("secret")
+
+        assert not old.needs_rehash(stored)
+        assert new.needs_rehash(stored)
+        assert new.verify("secret", stored)   # Old hashes keep working
+
+    def test_legacy_plaintext(self):
+        hasher = PasswordHasher(n=16)
+
+        assert hasher.verify("secret", "secret")
+        assert not hasher.verify("wrong", "secret")
+        assert hasher.needs_rehash("secret")
+
+    def test_unparsable_hash_is_not_plaintext(self):
+        hasher = PasswordHasher(n=16)
+        damaged = "scrypt$n=16,r=8$salt"
+
+        assert not hasher.verify(damaged, damaged)
+        assert not hasher.verify("x" * 200, "x" * 200)
+        assert not hasher.verify("a\x00", "a\x00")
+
+    def test_dummy_hash(self):
+        hasher = PasswordHasher(n=16)
+
+        assert hasher.dummy_hash.startswith("scrypt$n=16,r=8,p=1$")
+        assert hasher.dummy_hash == hasher.dummy_hash   # Made once
+        assert not hasher.verify("", hasher.dummy_hash)
+
+    def test_hash_many(self):
+        hasher = PasswordHasher(n=16, max_workers=2)
+        hashes = hasher.hash_many(["a", "b", "c"])
+
+        assert [hasher.verify(password, stored) for password, stored in zip("abc", hashes)] == [True] * 3
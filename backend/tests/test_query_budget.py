@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from db.query_recorder import QueryBudgetExceeded, QueryRecorder
+from utils.query_budget import QueryBudgetMiddleware, parse_budgets
+
+class TestQueryBudget:
+    """
+    Test the SQL statement recorder and the per-route budgets
+    """
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+        yield engine
+        engine.dispose()
+
+    def test_check_lists_the_statements(self, engine):
+        with QueryRecorder() as queries:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+        assert queries == ["SELECT 1", "SELECT 2"]   # BEGIN/COMMIT not recorded
+        queries.check(2)
+        with pytest.raises(QueryBudgetExceeded) as exc:
+            queries.check(1, label="GET /api/users/1")
+        assert "GET /api/users/1 ran 2 SQL statements, budget 1" in str(exc.value)
+        assert "  2. SELECT 2" in str(exc.value)
+
+    def test_middleware_logs_requests_over_budget(self, engine, caplog):
+        app = FastAPI()
+
+        # Sync handlers: the statements run on a threadpool thread
+        @app.get("/items/{id}")
+        def get_item(id: int):
+            with engine.connect() as conn:
+                for _ in range(id):
+                    conn.execute(text("SELECT 1"))
+            return {}
+
+        @app.get("/other")
+        def other():
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return {}
+
+        app.add_middleware(QueryBudgetMiddleware, budget=3, routes=parse_budgets("GET /other=0,GET /items/{id}=2"))
+
+        with caplog.at_level(logging.WARNING, logger="utils.query_budget"), TestClient(app) as client:
+            client.get("/items/2")
+            client.get("/other")    # 0: no budget
+            client.get("/items/3")
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].getMessage().startswith("GET /items/{id} ran 3 SQL statements, budget 2:\n  1. SELECT 1")
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+
+from models.user_model import RoleEnum, User
+from schemas.user_schema import UserResponseSchema
+from utils.serialization import ResponseSerializer
+
+class TestResponseSerializer:
+    """
+    Test the direct ORM-to-JSON encoding against the pydantic one
+    """
+
+    def _users(self):
+        return [
+            User(id=1, name="Ana", email="ana@example.com", password="x", role=RoleEnum.Driver),
+            User(id=2, name="Zoë \"Z\"", email="zoe@example.com", password="x", role=RoleEnum.FeetManager),
+        ]
+
+    def test_same_json_as_response_model(self):
+        users = self._users()
+        adapter = TypeAdapter(list[UserResponseSchema])
+        expected = adapter.dump_json(adapter.validate_python(users, from_attributes=True))
+
+        serializer = ResponseSerializer(UserResponseSchema)
+
+        assert json.loads(serializer.dumps_many(users)) == json.loads(expected)
+        assert json.loads(serializer.dumps(users[0])) == json.loads(expected)[0]
+
+    def test_expired_attributes_are_loaded(self, db_session):
+        user = User(name="Expired", email="expired@example.com", password="x")
+        db_session.add(user)
+        db_session.commit()
+        db_session.expire(user)
+
+        body = json.loads(ResponseSerializer(UserResponseSchema).dumps(user))
+
+        assert body == {"id": user.id, "name": "Expired", "email": "expired@example.com", "role": "Feet Manager"}
+
+    def test_rows_same_json_as_entities(self, db_session):
+        db_session.add_all(self._users())
+        db_session.commit()
+        rows = db_session.execute(select(User.password, User.role, User.email, User.name, User.id)).all()
+
+        serializer = ResponseSerializer(UserResponseSchema)
+
+        assert serializer.dumps_many(rows) == serializer.dumps_many(self._users())
+        assert json.loads(serializer.dumps_many(rows, fields=("name",))) == [{"name": "Ana"}, {"name": "Zoë \"Z\""}]
+
+    def test_password_is_not_encoded(self):
+        body = ResponseSerializer(UserResponseSchema).dumps(self._users()[0])
+
+        assert b"password" not in body
+
+    def test_rejects_schema_it_can_not_copy(self):
+        class Nested(BaseModel):
+            user: UserResponseSchema
+
+        with pytest.raises(TypeError):
+            ResponseSerializer(Nested)
+
+    def test_openapi_still_documents_response_model(self, client):
+        schema = client.get("/openapi.json").json()
+        response = schema["paths"]["/api/users/{id}"]["get"]["responses"]["200"]
+
+        assert response["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/UserResponseSchema"}
@@ -0,0 +1,48 @@
+import asyncio
+
+from utils.streaming import MAX_LINE_LENGTH, encode_csv, iter_records
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+def _records(format: str, *chunks: bytes):
+    async def collect():
+        return [record async for record in iter_records(_chunks(*chunks), format)]
+    return asyncio.run(collect())
+
+class TestStreaming:
+    """
+    Unit test of the incremental import parsing and the export encoding
+    """
+
+    def test_lines_split_across_chunks(self):
+        # "é" is two bytes, cut between the chunks
+        encoded = '{"name": "José"}\n\n{"name": "Ana"}'.encode()
+        cut = encoded.index("é".encode()) + 1
+
+        records = _records("ndjson", encoded[:cut], encoded[cut:])
+
+        assert records == [(1, {"name": "José"}, None), (3, {"name": "Ana"}, None)]
+
+    def test_csv_rows_against_header(self):
+        records = _records("csv", b"name,email\r\n", b'"Doe, J",j@example.com\r\nonly-one\r\nx,\r\n')
+
+        assert records[0] == (2, {"name": "Doe, J", "email": "j@example.com"}, None)
+        assert records[1][2] == "Expected 2 values, got 1"
+        assert records[2] == (4, {"name": "x"}, None)
+
+    def test_line_over_the_limit_is_an_error(self):
+        # Sent in small chunks: the long line is never held whole
+        long_line = b'{"name": "' + b"x" * MAX_LINE_LENGTH + b'"}\n'
+        chunks = [long_line[i:i + 4096] for i in range(0, len(long_line), 4096)]
+
+        records = _records("ndjson", b'{"name": "A"}\n', *chunks, b'{"name": "B"}\n', b"y" * (MAX_LINE_LENGTH + 1))
+
+        assert records[0] == (1, {"name": "A"}, None)
+        assert records[1] == (2, None, f"Line longer than {MAX_LINE_LENGTH} characters")
+        assert records[2] == (3, {"name": "B"}, None)
+        assert records[3] == (4, None, f"Line longer than {MAX_LINE_LENGTH} characters")
+
+    def test_csv_export_without_rows_has_header(self):
+        assert b"".join(encode_csv([], ("id", "name"))) == b"id,name\n"
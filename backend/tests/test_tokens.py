@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import pytest
+
+from utils.security.tokens import InvalidTokenError, TokenKeyring, TokenSigner, _b64encode
+
+class TestTokenSigner:
+    """
+    Unit test for the signed access tokens
+    """
+
+    def test_issue_and_verify(self):
+        signer = TokenSigner(TokenKeyring({"k1": "secret"}), ttl=60)
+        token, expires_in = signer.issue(7, "Driver")
+
+        claims = signer.verify(token)
+        assert (claims.user_id, claims.role, expires_in) == (7, "Driver", 60)
+
+    def test_rejects_other_key_and_expired_token(self):
+        signer = TokenSigner(TokenKeyring({"k1": "secret"}), ttl=60)
+        forger = TokenSigner(TokenKeyring({"k1": "other"}), ttl=60)
+        expired = TokenSigner(TokenKeyring({"k1": "secret"}), ttl=-1)
+
+        with pytest.raises(InvalidTokenError):
+            signer.verify(forger.issue(7, "Administrator")[0])
+        with pytest.raises(InvalidTokenError):
+            signer.verify(expired.issue(7, "Driver")[0])
+        with pytest.raises(InvalidTokenError):
+            signer.verify("not.a.token")
+
+    def test_rejects_header_or_payload_that_is_not_an_object(self):
+        signer = TokenSigner(TokenKeyring({"k1": "secret"}), ttl=60)
+        header, payload, _ = signer.issue(7, "Driver")[0].split(".")
+
+        for token in (f"{_b64encode(b'[1]')}.{payload}.x", f"{_b64encode(b'5')}.{payload}.x"):
+            with pytest.raises(InvalidTokenError):
+                signer.verify(token)
+
+        # Signed with the right key, an array as payload
+        signing_input = f"{header}.{_b64encode(b'[7]')}"
+        signature = _b64encode(hmac.new(b"secret", signing_input.encode(), hashlib.sha256).digest())
+        with pytest.raises(InvalidTokenError):
+            signer.verify(f"{signing_input}.{signature}")
+
+    def test_rotation_keeps_old_tokens_until_key_removed(self):
+        keyring = TokenKeyring({"k1": "secret"})
+        signer = TokenSigner(keyring, ttl=60)
+        old_token, _ = signer.issue(7, "Driver")
+
+        keyring.rotate("k2", "new-secret")
+        new_token, _ = signer.issue(7, "Driver")
+
+        assert signer.verify(old_token).user_id == 7
+        assert signer.verify(new_token).user_id == 7
+
+        keyring.remove("k1")
+        with pytest.raises(InvalidTokenError):
+            signer.verify(old_token)
+
+    def test_keys_file_is_reloaded(self, tmp_path):
+        keys_file = tmp_path / "keys.json"
+        keys_file.write_text(json.dumps({"active": "k1", "keys": {"k1": "secret"}}))
+        keyring = TokenKeyring(keys_file=str(keys_file))
+        signer = TokenSigner(keyring, ttl=60)
+        old_token, _ = signer.issue(7, "Driver")
+
+        keys_file.write_text(json.dumps({"active": "k2", "keys": {"k2": "new-secret"}}))
+        os.utime(keys_file, (time.time() + 5, time.time() + 5))
+        keyring._next_check = 0   # Skip the once per second throttle
+
+        assert keyring.active()[0] == "k2"
+        with pytest.raises(InvalidTokenError):
+            signer.verify(old_token)
+
+    def test_invalid_keys_file_keeps_current_keys(self, tmp_path):
+        keys_file = tmp_path / "keys.json"
+        keys_file.write_text(json.dumps({"active": "k1", "keys": {"k1": "secret"}}))
+        keyring = TokenKeyring(keys_file=str(keys_file))
+
+        for i, document in enumerate([{"active": "k1"}, {"keys": {}}, {"active": "k9", "keys": {"k2": "s"}}, [1]]):
+            keys_file.write_text(json.dumps(document))
+            os.utime(keys_file, (time.time() + i + 1, time.time() + i + 1))
+            keyring._next_check = 0
+            assert keyring.active() == ("k1", b"secret")
+
+    def test_revocation(self):
+        signer = TokenSigner(TokenKeyring({"k1": "secret"}), ttl=60)
+        token, _ = signer.issue(7, "Driver")
+
+        signer.revocations.revoke(7)
+        with pytest.raises(InvalidTokenError):
+            signer.verify(token)
+
+        time.sleep(0.02)    # Coarse clocks: a token from the same tick is rejected
+        new_token, _ = signer.issue(7, "Driver")
+        assert signer.verify(new_token).user_id == 7
@@ -1,11 +1,16 @@
+import json
 import pytest
 from fastapi import status
 
+from models.user_model import RoleEnum, User
+
 class TestUserRoutes:
     """
-    Integration test for user routes
+    Integration test for user routes. Each test declares the SQL statements
+    its requests may run (query_budget): an extra query fails it, listed.
     """
     
+    @pytest.mark.query_budget(1)
     def test_create_user(self, client):
         """
         Create new user test
@@ -27,6 +32,7 @@ class TestUserRoutes:
         assert data["email"] == user_data["email"]
         assert "id" in data
 
+    @pytest.mark.query_budget(1)
     def test_create_user_with_administrator_role(self, client):
         """
         Test: Create user with Administrator role
@@ -45,6 +51,7 @@ class TestUserRoutes:
         data = response.json()
         assert data["role"] == "Administrator"
 
+    @pytest.mark.query_budget(1)
     def test_create_user_with_feet_manager_role(self, client):
         """
         Test: Create user with Feet Manager role
@@ -63,6 +70,7 @@ class TestUserRoutes:
         data = response.json()
         assert data["role"] == "Feet Manager"
 
+    @pytest.mark.query_budget(0)
     def test_create_user_invalid_role(self, client):
         """
         Test: Create user with invalid role
@@ -79,6 +87,7 @@ class TestUserRoutes:
         
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
+    @pytest.mark.query_budget(0)
     def test_create_user_missing_fields(self, client):
         """
         Test: Create user with missing required fields
@@ -94,6 +103,7 @@ class TestUserRoutes:
         
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
+    @pytest.mark.query_budget(5)
     def test_get_all_users(self, client):
         """
         Test: Get all users
@@ -138,6 +148,7 @@ class TestUserRoutes:
         assert "user2@example.com" in emails
         assert "user3@example.com" in emails
 
+    @pytest.mark.query_budget(2)
     def test_get_all_users_empty(self, client):
         """
         Test: Get all users when database is empty
@@ -150,6 +161,7 @@ class TestUserRoutes:
         assert isinstance(data, list)
         assert len(data) == 0
 
+    @pytest.mark.query_budget(2)
     def test_get_user_by_id(self, client):
         """
         Test: Get user by ID
@@ -175,6 +187,7 @@ class TestUserRoutes:
         assert data["email"] == user_data["email"]
         assert data["role"] == user_data["role"]
 
+    @pytest.mark.query_budget(1)
     def test_get_user_by_id_not_found(self, client):
         """
         Test: Get user by non-existent ID
@@ -186,6 +199,7 @@ class TestUserRoutes:
         data = response.json()
         assert "detail" in data
 
+    @pytest.mark.query_budget(3)
     def test_update_user(self, client):
         """
         Test: Update existing user
@@ -223,6 +237,7 @@ class TestUserRoutes:
         assert get_data["name"] == update_data["name"]
         assert get_data["email"] == update_data["email"]
 
+    @pytest.mark.query_budget(1)
     def test_update_user_not_found(self, client):
         """
         Test: Update non-existent user
@@ -238,6 +253,7 @@ class TestUserRoutes:
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    @pytest.mark.query_budget(3)
     def test_delete_user(self, client):
         """
         Test: Delete existing user
@@ -265,6 +281,7 @@ class TestUserRoutes:
         get_response = client.get(f"/api/users/{user_id}")
         assert get_response.status_code == status.HTTP_404_NOT_FOUND
     
+    @pytest.mark.query_budget(1)
     def test_delete_user_not_found(self, client):
         """
         Test: Delete non-existent user
@@ -274,6 +291,7 @@ class TestUserRoutes:
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    @pytest.mark.query_budget(2)
     def test_login_success(self, client):
         """
         Test: Successful login
@@ -301,6 +319,7 @@ class TestUserRoutes:
         assert data["name"] == user_data["name"]
         assert "password" not in data or data.get("password") != login_data["password"]
 
+    @pytest.mark.query_budget(2)
     def test_login_invalid_password(self, client):
         """
         Test: Login with invalid password
@@ -326,6 +345,24 @@ class TestUserRoutes:
         data = response.json()
         assert "detail" in data
     
+    @pytest.mark.query_budget(1)
+    def test_login_unknown_email_runs_the_kdf(self, client, monkeypatch):
+        """
+        Test: Login with an email no user has
+        Verifies that it fails after checking the password against a dummy hash, like a wrong password
+        """
+        from core.security import password_hasher
+
+        checked = []
+        parse = password_hasher._parse
+        monkeypatch.setattr(password_hasher, "_parse", lambda stored: checked.append(stored) or parse(stored))
+
+        response = client.post("/api/users/login", json={"email": "nobody@example.com", "password": "whatever"})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert checked == [password_hasher.dummy_hash]
+
+    @pytest.mark.query_budget(0)
     def test_login_missing_fields(self, client):
         """
         Test: Login with missing fields
@@ -338,4 +375,607 @@ class TestUserRoutes:
         response = client.post("/api/users/login", json=login_data)
         
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
-    
\ No newline at end of file
+    
+    @pytest.mark.query_budget(11)
+    def test_get_users_paginated(self, client):
+        """
+        Test: Walk the users list with keyset pagination
+        Verifies that `limit` and the `X-Next-Cursor` token return every user once
+        """
+        for i in range(5):
+            client.post("/api/users/", json={
+                "name": f"Page User {i}",
+                "email": f"page{i}@example.com",
+                "password": "pass",
+                "role": "Driver"
+            })
+
+        first = client.get("/api/users/", params={"limit": 2})
+        assert first.status_code == status.HTTP_200_OK
+        assert len(first.json()) == 2
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = client.get("/api/users/", params={"limit": 2, "cursor": cursor})
+        assert len(second.json()) == 2
+
+        last = client.get("/api/users/", params={"limit": 2, "cursor": second.headers["X-Next-Cursor"]})
+        assert len(last.json()) == 1
+        assert "X-Next-Cursor" not in last.headers
+
+        ids = [user["id"] for page in (first, second, last) for user in page.json()]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 5
+
+    @pytest.mark.query_budget(9)
+    def test_get_users_filtered(self, client):
+        """
+        Test: Filter the users list by role and email prefix
+        Verifies that only matching users are returned
+        """
+        users_data = [
+            ("Driver A", "ana@fleet.com", "Driver"),
+            ("Driver B", "bob@fleet.com", "Driver"),
+            ("Admin A", "ana.admin@fleet.com", "Administrator"),
+        ]
+        for name, email, role in users_data:
+            client.post("/api/users/", json={"name": name, "email": email, "password": "pass", "role": role})
+
+        response = client.get("/api/users/", params={"role": "Driver"})
+        assert {user["email"] for user in response.json()} == {"ana@fleet.com", "bob@fleet.com"}
+
+        response = client.get("/api/users/", params={"email_prefix": "ana"})
+        assert {user["email"] for user in response.json()} == {"ana@fleet.com", "ana.admin@fleet.com"}
+
+        response = client.get("/api/users/", params={"role": "Driver", "email_prefix": "ana"})
+        assert [user["email"] for user in response.json()] == ["ana@fleet.com"]
+
+    @pytest.mark.query_budget(1)
+    def test_get_users_invalid_cursor(self, client):
+        """
+        Test: Get users with a tampered cursor
+        Verifies that 400 is returned
+        """
+        response = client.get("/api/users/", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.query_budget(6)
+    def test_bulk_create_users(self, client):
+        """
+        Test: Create many users in one request
+        Verifies that duplicated emails are reported per item without aborting the batch
+        """
+        client.post("/api/users/", json={
+            "name": "Existing", "email": "existing@example.com", "password": "pass", "role": "Driver"
+        })
+        items = [
+            {"name": "Bulk 1", "email": "bulk1@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Bulk 2", "email": "existing@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Bulk 3", "email": "bulk1@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Bulk 4", "email": "bulk4@example.com", "password": "pass"},
+        ]
+
+        response = client.post("/api/users/bulk", json={"items": items})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        assert [result["success"] for result in data["results"]] == [True, False, False, True]
+        assert "email" in data["results"][1]["error"]
+
+        emails = {user["email"] for user in client.get("/api/users/").json()}
+        assert emails == {"existing@example.com", "bulk1@example.com", "bulk4@example.com"}
+
+    @pytest.mark.query_budget(8)
+    def test_bulk_update_users(self, client):
+        """
+        Test: Update many users in one request
+        Verifies that missing ids are reported and the others are updated
+        """
+        created = client.post("/api/users/bulk", json={"items": [
+            {"name": "Before 1", "email": "before1@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Before 2", "email": "before2@example.com", "password": "pass", "role": "Driver"},
+        ]}).json()
+        first_id, second_id = [result["id"] for result in created["results"]]
+
+        response = client.put("/api/users/bulk", json={"items": [
+            {"id": first_id, "name": "After 1", "email": "after1@example.com", "password": "pass", "role": "Administrator"},
+            {"id": 99999, "name": "Ghost", "email": "ghost@example.com", "password": "pass", "role": "Driver"},
+            {"id": second_id, "name": "After 2", "email": "after1@example.com", "password": "pass", "role": "Driver"},
+        ]})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [result["success"] for result in data["results"]] == [True, False, False]
+
+        first = client.get(f"/api/users/{first_id}").json()
+        assert first["name"] == "After 1"
+        assert first["role"] == "Administrator"
+        assert client.get(f"/api/users/{second_id}").json()["name"] == "Before 2"
+
+    @pytest.mark.query_budget(6)
+    def test_bulk_delete_users(self, client):
+        """
+        Test: Delete many users in one request
+        Verifies that existing users are deleted and missing ids are reported
+        """
+        created = client.post("/api/users/bulk", json={"items": [
+            {"name": "Delete 1", "email": "delete1@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Delete 2", "email": "delete2@example.com", "password": "pass", "role": "Driver"},
+        ]}).json()
+        ids = [result["id"] for result in created["results"]]
+
+        response = client.request("DELETE", "/api/users/bulk", json={"ids": ids + [99999]})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["results"][2]["success"] is False
+        assert client.get("/api/users/").json() == []
+
+    @pytest.mark.query_budget(4)
+    def test_single_statement_mutations(self, client, count_queries):
+        """
+        Test: Query count of the single user routes
+        Verifies that create, get, update and delete run one statement each
+        """
+        user_data = {"name": "Counted", "email": "counted@example.com", "password": "pass", "role": "Driver"}
+
+        with count_queries() as queries:
+            user_id = client.post("/api/users/", json=user_data).json()["id"]
+        assert len(queries) == 1, queries
+
+        with count_queries() as queries:
+            client.get(f"/api/users/{user_id}")
+        assert len(queries) <= 1, queries   # 0 when served from the cache
+
+        with count_queries() as queries:
+            response = client.put(f"/api/users/{user_id}", json={**user_data, "name": "Recounted"})
+        assert response.json()["name"] == "Recounted"
+        assert len(queries) == 1, queries
+
+        with count_queries() as queries:
+            client.delete(f"/api/users/{user_id}")
+        assert len(queries) == 1, queries
+
+    @pytest.mark.query_budget(2)
+    def test_missing_user_mutations_single_statement(self, client, count_queries):
+        """
+        Test: Query count of update/delete on a missing user
+        Verifies that the 404 comes from the mutation itself, without a lookup first
+        """
+        user_data = {"name": "Ghost", "email": "ghost@example.com", "password": "pass", "role": "Driver"}
+
+        with count_queries() as queries:
+            assert client.put("/api/users/99999", json=user_data).status_code == status.HTTP_404_NOT_FOUND
+            assert client.delete("/api/users/99999").status_code == status.HTTP_404_NOT_FOUND
+        assert len(queries) == 2, queries
+
+    @pytest.mark.query_budget(3)
+    def test_password_is_stored_hashed(self, client, db_session):
+        """
+        Test: Create user stores a password hash
+        Verifies that the plaintext password is never written and login still works
+        """
+        user_data = {"name": "Hashed", "email": "hashed@example.com", "password": "secret123", "role": "Driver"}
+        user_id = client.post("/api/users/", json=user_data).json()["id"]
+
+        stored = db_session.get(User, user_id).password
+        assert stored.startswith("scrypt$")
+        assert "secret123" not in stored
+
+        response = client.post("/api/users/login", json={"email": "hashed@example.com", "password": "secret123"})
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.query_budget(4)
+    def test_login_upgrades_plaintext_password(self, client, db_session):
+        """
+        Test: Login of a user stored before hashing existed
+        Verifies that the plaintext password is accepted once and replaced by a hash
+        """
+        db_session.add(User(name="Legacy", email="legacy@example.com", password="oldpass", role=RoleEnum.Driver))
+        db_session.commit()
+
+        response = client.post("/api/users/login", json={"email": "legacy@example.com", "password": "oldpass"})
+        assert response.status_code == status.HTTP_200_OK
+
+        db_session.expire_all()
+        assert db_session.query(User).filter(User.email == "legacy@example.com").one().password.startswith("scrypt$")
+
+    def test_login_of_a_user_deleted_during_the_rehash(self, client, db_session, monkeypatch):
+        """
+        Test: Login of a legacy user deleted between the lookup and the hash upgrade
+        Verifies that 401 is returned, not a token for a missing user
+        """
+        from sqlalchemy import delete
+
+        from repositories.base_repository import BaseRepository
+
+        db_session.add(User(name="Legacy", email="gone@example.com", password="oldpass", role=RoleEnum.Driver))
+        db_session.commit()
+
+        update = BaseRepository._update
+        def delete_then_update(self, db, obj_data, id, versions=None):
+            db.execute(delete(User).where(User.id == id))
+            return update(self, db, obj_data, id, versions)
+        monkeypatch.setattr(BaseRepository, "_update", delete_then_update)
+
+        response = client.post("/api/users/login", json={"email": "gone@example.com", "password": "oldpass"})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def _login(self, client, email="token@example.com", role="Driver"):
+        client.post("/api/users/", json={"name": "Token User", "email": email, "password": "pass", "role": role})
+        return client.post("/api/users/login", json={"email": email, "password": "pass"}).json()
+
+    @pytest.mark.query_budget(2)
+    def test_login_returns_access_token(self, client, count_queries):
+        """
+        Test: Login issues an access token
+        Verifies that /me reads the user id and role from the token without a query
+        """
+        data = self._login(client, role="Administrator")
+        assert data["token_type"] == "bearer"
+        assert data["expires_in"] > 0
+
+        with count_queries() as queries:
+            response = client.get("/api/users/me", headers={"Authorization": f"Bearer {data['access_token']}"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == data["id"]
+        assert response.json()["role"] == "Administrator"
+        assert queries == []
+
+    @pytest.mark.query_budget(2)
+    def test_me_rejects_missing_or_tampered_token(self, client):
+        """
+        Test: /me without a valid token
+        Verifies that 401 is returned
+        """
+        token = self._login(client)["access_token"]
+
+        assert client.get("/api/users/me").status_code == status.HTTP_401_UNAUTHORIZED
+        response = client.get("/api/users/me", headers={"Authorization": f"Bearer {token[:-2]}xx"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.query_budget(3)
+    def test_update_revokes_tokens(self, client):
+        """
+        Test: Tokens issued before an update
+        Verifies that they are rejected once the user changed
+        """
+        data = self._login(client)
+        headers = {"Authorization": f"Bearer {data['access_token']}"}
+
+        client.put(f"/api/users/{data['id']}", json={
+            "name": "Token User", "email": "token@example.com", "password": "pass", "role": "Administrator"
+        })
+
+        assert client.get("/api/users/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.query_budget(5)
+    def test_export_users_ndjson(self, client):
+        """
+        Test: Stream every user as NDJSON
+        Verifies one JSON object per line, in id order, without passwords
+        """
+        client.post("/api/users/bulk", json={"items": [
+            {"name": f"Export {i}", "email": f"export{i}@example.com", "password": "pass", "role": "Driver"}
+            for i in range(3)
+        ]})
+
+        response = client.get("/api/users/export")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["email"] for line in lines] == [f"export{i}@example.com" for i in range(3)]
+        assert lines[0] == {"id": lines[0]["id"], "name": "Export 0", "email": "export0@example.com", "role": "Driver"}
+
+    @pytest.mark.query_budget(4)
+    def test_export_users_csv(self, client):
+        """
+        Test: Stream the users of a role as CSV
+        Verifies the header line and the role written by value
+        """
+        client.post("/api/users/bulk", json={"items": [
+            {"name": "Driver", "email": "driver@example.com", "password": "pass", "role": "Driver"},
+            {"name": "Manager", "email": "manager@example.com", "password": "pass"},
+        ]})
+
+        response = client.get("/api/users/export", params={"format": "csv", "role": "Feet Manager"})
+
+        assert response.status_code == status.HTTP_200_OK
+        lines = response.text.splitlines()
+        assert lines[0] == "id,name,email,role"
+        assert lines[1].endswith(",Manager,manager@example.com,Feet Manager")
+        assert len(lines) == 2
+
+    @pytest.mark.query_budget(7)
+    def test_import_users_ndjson(self, client):
+        """
+        Test: Import an NDJSON upload in chunks
+        Verifies the created rows and the per-line errors
+        """
+        body = "\n".join([
+            json.dumps({"name": "Import 1", "email": "import1@example.com", "password": "pass"}),
+            "{not json",
+            json.dumps({"name": "Import 2", "email": "import1@example.com", "password": "pass"}),
+            json.dumps({"name": "Import 3", "email": "import3@example.com", "password": "pass", "role": "Boss"}),
+            json.dumps({"name": "Import 4", "email": "import4@example.com", "password": "pass", "role": "Driver"}),
+        ])
+
+        response = client.post("/api/users/import", params={"chunk_size": 1}, content=body.encode())
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["rows"], data["created"], data["failed"], data["chunks"], data["done"]) == (5, 2, 3, 3, True)
+        assert [error["line"] for error in data["errors"]] == [2, 3, 4]
+        assert "email" in data["errors"][1]["error"]
+        assert data["errors"][2]["error"].startswith("role")
+
+        emails = {user["email"] for user in client.get("/api/users/").json()}
+        assert emails == {"import1@example.com", "import4@example.com"}
+
+    @pytest.mark.query_budget(3)
+    def test_import_users_csv_progress(self, client):
+        """
+        Test: Import a CSV upload under a client chosen id
+        Verifies the progress can be read back by that id
+        """
+        body = "name,email,password,role\nCsv 1,csv1@example.com,pass,Driver\nCsv 2,csv2@example.com,pass,\n"
+
+        response = client.post(
+            "/api/users/import", params={"format": "csv"}, content=body.encode(), headers={"X-Import-Id": "roster-1"}
+        )
+
+        assert response.json()["created"] == 2
+        progress = client.get("/api/users/import/roster-1").json()
+        assert progress["id"] == "roster-1"
+        assert progress["done"] is True
+        assert client.get("/api/users/import/unknown").status_code == status.HTTP_404_NOT_FOUND
+
+        # The id is taken: the progress of the first import is kept
+        response = client.post(
+            "/api/users/import", params={"format": "csv"}, content=body.encode(), headers={"X-Import-Id": "roster-1"}
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert client.get("/api/users/import/roster-1").json()["created"] == 2
+
+    @pytest.mark.query_budget(5)
+    def test_get_users_sparse_fieldset(self, client, count_queries):
+        """
+        Test: Return only the requested fields of the users
+        Verifies the keys of the list and detail, and the columns selected
+        """
+        user = client.post("/api/users/", json={
+            "name": "Sparse", "email": "sparse@example.com", "password": "pass", "role": "Driver"
+        }).json()
+
+        with count_queries() as queries:
+            response = client.get("/api/users/", params={"fields": "name,id"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"id": user["id"], "name": "Sparse"}]
+        # The change counter of the ETag, then the page
+        assert len(queries) == 2
+        assert "password" not in queries[1] and "email" not in queries[1]
+
+        response = client.get(f"/api/users/{user['id']}", params={"fields": "email"})
+        assert response.json() == {"email": "sparse@example.com"}
+
+        lines = client.get("/api/users/export", params={"fields": "email"}).text.splitlines()
+        assert [json.loads(line) for line in lines] == [{"email": "sparse@example.com"}]
+
+    @pytest.mark.query_budget(0)
+    def test_get_users_unknown_field(self, client):
+        """
+        Test: Ask for a field that is not part of the response
+        Verifies a 400 naming the field
+        """
+        response = client.get("/api/users/", params={"fields": "id,password"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in response.json()["detail"]
+
+    @pytest.mark.query_budget(9)
+    def test_get_users_not_modified(self, client, count_queries):
+        """
+        Test: Poll the users list with its ETag
+        Verifies a 304 answered from the change counter until a user changes
+        """
+        client.post("/api/users/", json={"name": "Etag", "email": "etag@example.com", "password": "pass"})
+        response = client.get("/api/users/")
+        etag = response.headers["ETag"]
+
+        with count_queries() as queries:
+            response = client.get("/api/users/", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+        assert len(queries) == 1 and "FROM table_versions" in queries[0]
+
+        # Another query is another representation
+        assert client.get("/api/users/", params={"limit": 1}, headers={"If-None-Match": etag}).status_code == 200
+
+        client.post("/api/users/", json={"name": "Etag 2", "email": "etag2@example.com", "password": "pass"})
+        response = client.get("/api/users/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        assert len(response.json()) == 2
+
+    @pytest.mark.query_budget(6)
+    def test_get_user_not_modified(self, client, count_queries):
+        """
+        Test: Poll a user with its ETag
+        Verifies a 304 without loading the user, and a new ETag once updated
+        """
+        created = client.post("/api/users/", json={"name": "Etag", "email": "etag@example.com", "password": "pass"})
+        id = created.json()["id"]
+        response = client.get(f"/api/users/{id}")
+        etag = response.headers["ETag"]
+        assert etag == created.headers["ETag"] == f'"{id}.1"'
+
+        with count_queries() as queries:
+            response = client.get(f"/api/users/{id}", headers={"If-None-Match": f'W/"0.0", {etag}'})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not any("users.name" in query for query in queries)
+
+        # A sparse fieldset has its own ETag
+        sparse = client.get(f"/api/users/{id}", params={"fields": "name"}, headers={"If-None-Match": etag})
+        assert sparse.status_code == status.HTTP_200_OK
+        assert sparse.headers["ETag"].startswith(f'"{id}.1.')
+
+        updated = client.put(f"/api/users/{id}", json={"name": "Etag B.", "email": "etag@example.com", "password": "pass"})
+        assert updated.headers["ETag"] == f'"{id}.2"'
+        response = client.get(f"/api/users/{id}", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["name"] == "Etag B."
+
+        assert client.get("/api/users/999", headers={"If-None-Match": etag}).status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.query_budget(11)
+    def test_if_match_optimistic_concurrency(self, client, count_queries):
+        """
+        Test: Update and delete a user with If-Match
+        Verifies the write is refused (412) once another one went first
+        """
+        created = client.post("/api/users/", json={"name": "Match", "email": "match@example.com", "password": "pass"})
+        id, etag = created.json()["id"], created.headers["ETag"]
+        payload = {"name": "Match B.", "email": "match@example.com", "password": "pass"}
+
+        with count_queries() as queries:
+            response = client.put(f"/api/users/{id}", json=payload, headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1  # The version is checked by the UPDATE itself
+
+        response = client.put(f"/api/users/{id}", json=payload, headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert client.delete(f"/api/users/{id}", headers={"If-Match": etag}).status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert client.delete(f"/api/users/{id}", headers={"If-Match": f"W/{etag}"}).status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        current = client.get(f"/api/users/{id}").headers["ETag"]
+        assert client.delete(f"/api/users/{id}", headers={"If-Match": current}).status_code == status.HTTP_200_OK
+        assert client.put(f"/api/users/{id}", json=payload, headers={"If-Match": "*"}).status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.query_budget(9)
+    def test_get_users_by_ids(self, client, count_queries):
+        """
+        Test: Get many users by id at once
+        Verifies the order of the ids, a single IN query and the errors
+        """
+        client.post("/api/users/bulk", json={"items": [
+            {"name": f"Many {i}", "email": f"many{i}@example.com", "password": "pass"} for i in range(3)
+        ]})
+
+        with count_queries() as queries:
+            response = client.get("/api/users/", params={"ids": "3,1,99,1", "fields": "name"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"name": "Many 2"}, {"name": "Many 0"}]
+        assert len(queries) == 2 and "IN (" in queries[1]  # The change counter, then the users
+
+        etag = response.headers["ETag"]
+        response = client.get("/api/users/", params={"ids": "3,1,99,1", "fields": "name"}, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert client.get("/api/users/", params={"ids": "1"}, headers={"If-None-Match": etag}).status_code == 200
+
+        assert client.get("/api/users/", params={"ids": "1,a"}).status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get("/api/users/", params={"ids": ",".join(["1"] * 1001)}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.query_budget(4)
+    def test_create_duplicate_email_conflict(self, client):
+        """
+        Test: Create or update with a taken email
+        Verifies a 409 instead of an unhandled integrity error
+        """
+        payload = {"name": "Taken", "email": "taken@example.com", "password": "pass"}
+        client.post("/api/users/", json=payload)
+        other = client.post("/api/users/", json={**payload, "email": "other@example.com"}).json()
+
+        response = client.post("/api/users/", json=payload)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["detail"] == "Email already registered"
+        assert client.put(f"/api/users/{other['id']}", json=payload).status_code == status.HTTP_409_CONFLICT
+
+    @pytest.mark.query_budget(2)
+    def test_idempotent_create_replayed(self, client, count_queries):
+        """
+        Test: Create retried with the same Idempotency-Key
+        Verifies the first response is replayed without a query, and a reused key is rejected
+        """
+        payload = {"name": "Retried", "email": "retried@example.com", "password": "pass"}
+        headers = {"Idempotency-Key": "create-retried"}
+        first = client.post("/api/users/", json=payload, headers=headers)
+
+        with count_queries() as queries:
+            retry = client.post("/api/users/", json=payload, headers=headers)
+
+        assert queries == []
+        assert retry.status_code == first.status_code == status.HTTP_200_OK
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
+        other = client.post("/api/users/", json={**payload, "name": "Other"}, headers=headers)
+        assert other.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        # Without a key the retry is a new create
+        assert client.post("/api/users/", json=payload).status_code == status.HTTP_409_CONFLICT
+
+    @pytest.mark.query_budget(31)
+    def test_search_users(self, client, count_queries):
+        """
+        Test: Full text search of the users
+        Verifies word prefixes, accents, ranked pages and that writes are indexed
+        """
+        client.post("/api/users/bulk", json={"items": [
+            {"name": "José Smith", "email": "jose@fleet.example.com", "password": "pass"},
+            {"name": "John Smithers", "email": "john@example.com", "password": "pass"},
+            {"name": "Anna Jones", "email": "anna@example.com", "password": "pass"},
+        ]})
+
+        with count_queries() as queries:
+            response = client.get("/api/users/search", params={"q": "jose smi", "fields": "name"})
+        assert response.json() == [{"name": "José Smith"}]
+        assert len(queries) == 2   # The change counter, then the indexed search
+
+        assert {user["name"] for user in client.get("/api/users/search", params={"q": "fleet"}).json()} == {"José Smith"}
+
+        # Ranked pages of one result, without repeats
+        first = client.get("/api/users/search", params={"q": "smi", "limit": 1})
+        second = client.get("/api/users/search", params={"q": "smi", "limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+        assert {first.json()[0]["name"], second.json()[0]["name"]} == {"José Smith", "John Smithers"}
+        assert "X-Next-Cursor" not in second.headers
+
+        anna = client.get("/api/users/search", params={"q": "anna"}).json()[0]
+        client.put(f"/api/users/{anna['id']}", json={"name": "Anna Smith", "email": "anna@example.com", "password": "pass"})
+        assert len(client.get("/api/users/search", params={"q": "smith"}).json()) == 3
+        client.delete(f"/api/users/{anna['id']}")
+        assert client.get("/api/users/search", params={"q": "anna"}).json() == []
+
+        # Operators and punctuation are searched as text
+        for q in ('"', "-", "a OR b", "smi*", "NEAR(x"):
+            assert client.get("/api/users/search", params={"q": q}).status_code == status.HTTP_200_OK
+        assert client.get("/api/users/search", params={"q": "smi", "cursor": "bad"}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.query_budget(10)
+    def test_get_stats(self, client, count_queries):
+        """
+        Test: Users per role
+        Verifies the counts follow the writes, read without scanning the users
+        """
+        client.post("/api/users/bulk", json={"items": [
+            {"name": f"Driver {i}", "email": f"driver{i}@example.com", "password": "pass", "role": "Driver"} for i in range(3)
+        ]})
+        admin = client.post("/api/users/", json={"name": "Admin", "email": "admin@example.com", "password": "pass", "role": "Administrator"}).json()
+        client.put(f"/api/users/{admin['id']}", json={"name": "Admin", "email": "admin@example.com", "password": "pass", "role": "Driver"})
+        client.delete("/api/users/1")
+
+        with count_queries() as queries:
+            response = client.get("/api/users/stats")
+
+        assert response.json() == {"total": 3, "by_role": {"Administrator": 0, "Feet Manager": 0, "Driver": 3}}
+        assert len(queries) == 2 and "users_role_counts" in queries[1]
+        assert client.get("/api/users/stats", headers={"If-None-Match": response.headers["ETag"]}).status_code == status.HTTP_304_NOT_MODIFIED
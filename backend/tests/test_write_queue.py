@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from db.write_queue import WriteQueue
+from models.user_model import User
+from repositories.base_repository import DuplicateError
+from repositories.user_repository import UserRepository
+from utils.cache.entity_cache import EntityCache
+from utils.cache.memory import InMemoryCache
+
+class TestWriteQueue:
+    """
+    Test the group commit of the repository writes
+    """
+
+    @pytest.fixture
+    def repository(self, db_session):
+        session_factory = sessionmaker(bind=db_session.get_bind(), autoflush=False, expire_on_commit=False)
+        repository = UserRepository()
+        repository.cache = None
+        # A long delay so the concurrent writes share a batch
+        repository.write_queue = WriteQueue(session_factory, max_batch=8, max_delay=0.2)
+        yield repository
+        repository.write_queue.shutdown()
+
+    def _user(self, i: int):
+        return {"name": f"Queued {i}", "email": f"queued{i}@example.com", "password": "pass"}
+
+    def test_concurrent_writes_share_a_commit(self, repository):
+        def create(i):
+            with repository.write_queue.session_factory() as db:
+                return repository.create(db, self._user(i))
+
+        with ThreadPoolExecutor(8) as pool:
+            users = list(pool.map(create, range(8)))
+
+        assert sorted(user.email for user in users) == sorted(f"queued{i}@example.com" for i in range(8))
+        assert len({user.id for user in users}) == 8
+
+        stats = repository.write_queue.stats()
+        assert stats.writes == 8
+        assert stats.batches < 8
+        assert stats.max_batch_size > 1
+        assert stats.failed == 0
+
+    def test_failed_write_only_fails_its_caller(self, repository, db_session):
+        queue = repository.write_queue
+        futures = [
+            queue.submit_future(repository._create, self._user(1)),
+            queue.submit_future(repository._create, self._user(1)),     # Duplicate email
+            queue.submit_future(repository._create, self._user(2)),
+        ]
+
+        assert futures[0].result().email == "queued1@example.com"
+        with pytest.raises(DuplicateError):
+            futures[1].result()
+        assert futures[2].result().email == "queued2@example.com"
+
+        db_session.expire_all()
+        assert repository.get_by_email(db_session, "queued2@example.com") is not None
+        assert repository.write_queue.stats().failed == 1
+
+    def test_update_and_delete_through_queue(self, repository, db_session):
+        user = repository.create(db_session, self._user(1))
+
+        assert repository.update(db_session, {"name": "Renamed"}, user.id).name == "Renamed"
+        assert repository.update(db_session, {"name": "Nobody"}, 9999) is None
+        assert repository.delete(db_session, user.id) is True
+        assert repository.delete(db_session, user.id) is False
+
+    def test_cache_invalidated_once_the_batch_commits(self, repository, db_session):
+        repository.cache = EntityCache(InMemoryCache(ttl=None), User)
+        user = repository.create(db_session, self._user(1))
+        repository.create(db_session, self._user(2))
+        repository.get(db_session, user.id)    # Cached
+        db_session.rollback()   # Its read lock would block the batch COMMIT
+
+        seen = []
+
+        def read_before_commit(db):
+            # The SAVEPOINT of the update is released, the batch is not committed
+            with repository.write_queue.session_factory() as reader:
+                seen.append(repository.get(reader, user.id).name)
+
+        queue = repository.write_queue
+        futures = [
+            queue.submit_future(repository._update, {"name": "Renamed"}, user.id),
+            # Duplicate email: rolling back its SAVEPOINT keeps the invalidation of the update
+            queue.submit_future(repository._update, {"email": "queued2@example.com"}, user.id),
+            queue.submit_future(read_before_commit),
+        ]
+        futures[0].result()
+        with pytest.raises(DuplicateError):
+            futures[1].result()
+        futures[2].result()
+
+        assert seen == ["Queued 1"]
+        with queue.session_factory() as db:
+            assert repository.get(db, user.id).name == "Renamed"
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import math
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass
+class AdmissionStats:
+    """
+    Counters of an AdmissionPool.
+    - active:       (int) requests running
+    - queued:       (int) requests waiting for a slot
+    - admitted:     (int) requests run
+    - queue_full:   (int) requests rejected on arrival, the queue was full
+    - timed_out:    (int) requests rejected after waiting `max_wait`
+    """
+    active: int = 0
+    queued: int = 0
+    admitted: int = 0
+    queue_full: int = 0
+    timed_out: int = 0
+
+
+class Rejected(Exception):
+    """No slot for the request: answer 503 instead of queueing further"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionPool:
+    """
+    Bounded concurrency for a class of requests: at most `limit` run at
+    once, up to `max_queue` wait (FIFO) at most `max_wait` seconds for a
+    slot, the others are rejected right away. Used on the event loop only.
+
+    Params:
+        - name: (str) label of the pool in the metrics
+        - limit: (int) requests running at once
+        - max_queue: (int) requests waiting for a slot, 0 to reject as soon as the pool is full
+        - max_wait: (float) seconds a request may wait for a slot
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        # Seconds a rejected client should wait before retrying
+        self.retry_after = max(1, math.ceil(max_wait))
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._stats = AdmissionStats()
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if needed. Raise Rejected when there is none."""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self._stats.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats.queue_full += 1
+            raise Rejected("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # The slot is handed over by release(): _active is not changed
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            # A release() between the cancellation of the waiter and here
+            # already popped it (and passed the slot on)
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._stats.timed_out += 1
+            raise Rejected("timed_out")
+        except asyncio.CancelledError:
+            # Client gone: give back a slot handed over in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        self._stats.admitted += 1
+
+    def release(self):
+        """Free a slot: the oldest waiter takes it over"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(
+            active=self._active,
+            queued=len(self._waiters),
+            admitted=self._stats.admitted,
+            queue_full=self._stats.queue_full,
+            timed_out=self._stats.timed_out,
+        )
+
+
+class AdmissionController:
+    """
+    AdmissionPools and the requests they admit.
+
+    A request goes to the pool of its "METHOD /path" in `routes`, the
+    others to the `default` pool. Separate pools are bulkheads: a flood of
+    list requests fills the "list" pool and its queue, not the slots of
+    the "critical" one serving logins. Keep the sum of the limits of the
+    sync routes below the threadpool size (40), so every pool always
+    finds a worker thread.
+
+    Params:
+        - pools: AdmissionPools by name
+        - routes: pool name of each "METHOD /path", e.g. {"POST /api/users/login": "critical"}
+        - default: pool name of the other requests, None to let them through
+    """
+
+    def __init__(self, pools: list[AdmissionPool], routes: dict[str, str], default: str | None = "default"):
+        self.pools = {pool.name: pool for pool in pools}
+        for name in (*routes.values(), default):
+            if name is not None and name not in self.pools:
+                raise ValueError(f"Unknown admission pool {name!r}")
+        self.routes = {route: self.pools[name] for route, name in routes.items()}
+        self.default = self.pools[default] if default is not None else None
+
+    def pool_for(self, method: str, path: str) -> AdmissionPool | None:
+        return self.routes.get(f"{method} {path}", self.default)
+
+
+def parse_pools(value: str) -> list[AdmissionPool]:
+    """AdmissionPools of "name:limit:max_queue:max_wait,..." e.g. "critical:8:64:5,list:8:16:1" """
+    pools = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, limit, max_queue, max_wait = item.strip().split(":")
+        pools.append(AdmissionPool(name, int(limit), int(max_queue), float(max_wait)))
+    return pools
+
+
+def parse_routes(value: str) -> dict[str, str]:
+    """Pool name of each route of "METHOD /path=pool,..." """
+    routes = {}
+    for item in value.split(","):
+        if item.strip():
+            route, _, pool = item.strip().rpartition("=")
+            method, _, path = route.strip().partition(" ")
+            routes[f"{method.upper()} {path.strip()}"] = pool.strip()
+    return routes
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware running each request under its AdmissionPool,
+    before routing: a rejected request costs no dependency, session or
+    worker thread. Rejections are fast 503s with Retry-After, instead of
+    a queue in the threadpool growing until the clients time out.
+    The slot is held until the response is sent (a stream holds it while open).
+
+    Params:
+        - controller: AdmissionController of the pools
+        - prefix: (str) only the paths under it are controlled (/metrics, /docs are not)
+    """
+
+    def __init__(self, app, controller: AdmissionController, prefix: str = "/api"):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            return await self.app(scope, receive, send)
+
+        pool = self.controller.pool_for(scope["method"], scope["path"])
+        if pool is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await pool.acquire()
+        except Rejected:
+            return await _send_overloaded(send, pool.retry_after)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release()
+
+
+async def _send_overloaded(send, retry_after: int):
+    body = json.dumps({"detail": "Server busy, retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,101 @@
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
+
+@dataclass
+class BulkItemResult:
+    """
+    Outcome of one item of a bulk operation.
+    - index:    (int) position of the item in the request
+    - id:       (int | None) id of the affected row
+    - success:  (bool)
+    - error:    (str | None) reason of the failure
+    """
+    index: int
+    id: int | None = None
+    success: bool = True
+    error: str | None = None
+
+    @classmethod
+    def failed(cls, index: int, error: str, id: int | None = None) -> "BulkItemResult":
+        return cls(index=index, id=id, success=False, error=error)
+
+
+def summarize(results: List[BulkItemResult]) -> dict:
+    """Body of a bulk response: counters plus the per-item results"""
+    succeeded = sum(1 for result in results if result.success)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+# Rejected rows kept in the report of an import, the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportProgress:
+    """
+    Progress of a streamed import, updated chunk by chunk.
+    Its size does not grow with the upload: errors past
+    MAX_REPORTED_ERRORS are only counted in `errors_truncated`.
+    """
+    id: str
+    rows: int = 0
+    created: int = 0
+    failed: int = 0
+    chunks: int = 0
+    done: bool = False
+    errors: list[dict] = field(default_factory=list)
+    errors_truncated: int = 0
+
+    def add_error(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+        else:
+            self.errors_truncated += 1
+
+
+class DuplicateImportError(Exception):
+    """An import with that id is already tracked"""
+
+
+class ImportTracker:
+    """
+    The most recent imports by id, so a client can follow a long upload
+    from another request. Bounded: the oldest imports are forgotten.
+    """
+
+    def __init__(self, max_imports: int = 100):
+        self.max_imports = max_imports
+        self._imports: OrderedDict[str, ImportProgress] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, id: str | None = None) -> ImportProgress:
+        """
+        Track a new import under `id` (chosen by the client) or a generated
+        one. Raise DuplicateImportError if `id` is taken: running or recent,
+        its progress is not replaced.
+        """
+        progress = ImportProgress(id=id or uuid.uuid4().hex)
+        with self._lock:
+            if progress.id in self._imports:
+                raise DuplicateImportError(f"Import {progress.id} already exists")
+            self._imports[progress.id] = progress
+            self._imports.move_to_end(progress.id)
+            while len(self._imports) > self.max_imports:
+                self._imports.popitem(last=False)
+        return progress
+
+    def get(self, id: str) -> ImportProgress | None:
+        with self._lock:
+            return self._imports.get(id)
+
+    def clear(self):
+        with self._lock:
+            self._imports.clear()
@@ -0,0 +1,48 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a cache backend.
+    - hits:         (int)
+    - misses:       (int) includes expired entries
+    - evictions:    (int) entries dropped to respect the size bound
+    - expirations:  (int) entries dropped because their TTL passed
+    - size:         (int) current number of entries
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: int = 0
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store used by EntityCache.
+
+    Values are plain dicts/ints so a shared store (e.g. Redis, for several
+    workers) can implement this interface by serializing them.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """Return the value of `key`, None on a miss"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` (never None) under `key`"""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove `keys`, missing keys are ignored"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry"""
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the counters"""
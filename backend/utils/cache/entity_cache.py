@@ -0,0 +1,94 @@
+from threading import Lock
+from typing import Any, Iterable, Type
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from utils.cache.backend import CacheBackend
+
+# Invalidation counters, ids share them modulo this (bounded memory: a
+# collision only skips a cache fill)
+GENERATION_SLOTS = 4096
+
+class EntityCache:
+    """
+    Cache of the rows of one model, stored as {column: value} dicts.
+
+    Keys:
+        - "<table>:<id>"                -> column values of the row
+        - "<table>:<column>:<value>"    -> id, for each secondary key (e.g. email)
+
+    Secondary entries are not removed on invalidation: a lookup follows the
+    id and checks that the row still has that value, a stale pointer is a miss.
+
+    A read-through takes generation() before its SELECT and passes it to
+    set(): a row read before an invalidation of its id (a write committed
+    in between) is not stored after it.
+    """
+
+    def __init__(self, backend: CacheBackend, model: Type, secondary_keys: Iterable[str] = ()):
+        self.backend = backend
+        self.model = model
+        self.secondary_keys = tuple(secondary_keys)
+        self._prefix = model.__tablename__
+        self._columns = [attr.key for attr in inspect(model).column_attrs]
+        self._generations = [0] * GENERATION_SLOTS
+        self._invalidations = 0
+        self._lock = Lock()
+
+    def get(self, db: Session, id: int) -> Any | None:
+        """Return the cached row attached to `db`, None on a miss"""
+        data = self.backend.get(f"{self._prefix}:{id}")
+        return self._attach(db, data) if data is not None else None
+
+    def get_by(self, db: Session, column: str, value: Any) -> Any | None:
+        """Return the cached row whose `column` equals `value`, None on a miss"""
+        id = self.backend.get(f"{self._prefix}:{column}:{value}")
+        if id is None:
+            return None
+
+        data = self.backend.get(f"{self._prefix}:{id}")
+        if data is None or data.get(column) != value:
+            return None
+        return self._attach(db, data)
+
+    def generation(self, id: int | None = None) -> tuple:
+        """
+        Invalidation counter of `id`, or of every row when the id is not
+        known before the read (lookup by a secondary key). For set().
+        """
+        if id is None:
+            return (None, self._invalidations)
+        return (id, self._generations[hash(id) % GENERATION_SLOTS])
+
+    def set(self, obj: Any, generation: tuple | None = None) -> None:
+        """
+        Store the loaded `obj` and its secondary keys. With the `generation`
+        taken before reading it, nothing is stored if it was invalidated since.
+        """
+        data = {column: getattr(obj, column) for column in self._columns}
+        # Checked and stored under the lock: an invalidation cannot fall in between
+        with self._lock:
+            if generation is not None and self.generation(generation[0]) != generation:
+                return
+            self.backend.set(f"{self._prefix}:{data['id']}", data)
+
+            for column in self.secondary_keys:
+                if data.get(column) is not None:
+                    self.backend.set(f"{self._prefix}:{column}:{data[column]}", data["id"])
+
+    def invalidate(self, *ids: int) -> None:
+        with self._lock:
+            for id in ids:
+                self._generations[hash(id) % GENERATION_SLOTS] += 1
+            self._invalidations += 1
+            self.backend.delete(*(f"{self._prefix}:{id}" for id in ids))
+
+    def _attach(self, db: Session, data: dict) -> Any:
+        """
+        Rebuild the row as a persistent object of `db` without a SELECT,
+        so it can be modified and deleted like a loaded one.
+        """
+        obj = self.model(**data)
+        make_transient_to_detached(obj)
+        return db.merge(obj, load=False)
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from utils.cache.backend import CacheBackend, CacheStats
+
+class InMemoryCache(CacheBackend):
+    """
+    In-process LRU cache with a TTL, safe to share between threads.
+
+    Params:
+        - max_entries:  entries kept before the least recently used is evicted
+        - ttl:          seconds an entry is valid, None to never expire
+
+    Each worker process has its own copy: with several workers an update
+    served by one of them is only seen by the others after `ttl`.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float | None = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                size=len(self._data),
+            )
@@ -0,0 +1,157 @@
+import asyncio
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_core import to_json
+
+
+@dataclass(frozen=True)
+class Event:
+    """
+    A published change.
+    - id:   (str) "<epoch>-<seq>", the SSE event id a client resumes from
+    - seq:  (int) position in the feed
+    - type: (str) e.g. "created", "updated", "deleted"
+    - data: (bytes) JSON payload, encoded once for every subscriber
+    """
+    id: str
+    seq: int
+    type: str
+    data: bytes
+
+
+@dataclass
+class ChangeFeedStats:
+    """
+    Counters of a ChangeFeed.
+    - published:    (int) events published
+    - subscribers:  (int) subscriptions currently open
+    - dropped:      (int) subscriptions dropped for falling behind
+    """
+    published: int = 0
+    subscribers: int = 0
+    dropped: int = 0
+
+
+class Subscription:
+    """
+    The events of a ChangeFeed for one consumer, in a bounded buffer.
+    Filled from any thread without blocking; read on the event loop of the
+    consumer. When the consumer falls `max_buffer` events behind, the
+    buffer is discarded and the subscription is `dropped`: the consumer
+    resumes later from its last event id, or resynchronizes.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_buffer: int):
+        self.max_buffer = max_buffer
+        self.dropped = False
+        # The requested resume point is gone: the consumer must refetch
+        self.reset = False
+        self._loop = loop
+        self._events: deque[Event] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: Event) -> bool:
+        """Buffer `event`, never blocks. False if the subscription is (now) dropped."""
+        with self._lock:
+            if self.dropped:
+                return False
+            if len(self._events) >= self.max_buffer:
+                self.dropped = True
+                self._events.clear()
+            else:
+                self._events.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # Loop closed: the consumer is gone
+        return not self.dropped
+
+    async def next(self, timeout: float | None = None) -> list[Event]:
+        """Buffered events, waiting up to `timeout` seconds for one. Empty on timeout or once dropped."""
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                if self._events or self.dropped:
+                    events = list(self._events)
+                    self._events.clear()
+                    return events
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+
+class ChangeFeed:
+    """
+    In-process pub/sub of the changes of a table.
+
+    publish() is called by the writers (any thread) and never blocks: each
+    event is appended to the buffer of every subscriber, a subscriber that
+    falls too far behind is dropped instead of slowing the writers.
+    The last `history` events are kept, so a consumer can resume after its
+    last event id (SSE Last-Event-ID). Ids carry the epoch of the process:
+    an id of another process (before a restart) can not be resumed.
+
+    Params:
+        - history: (int) events kept for resuming
+        - max_buffer: (int) events a subscriber may fall behind before it is dropped
+    """
+
+    def __init__(self, history: int = 1000, max_buffer: int = 256):
+        self.max_buffer = max_buffer
+        self.epoch = secrets.token_hex(4)
+        self._history: deque[Event] = deque(maxlen=history)
+        self._seq = 0
+        self._subscribers: set[Subscription] = set()
+        self._stats = ChangeFeedStats()
+        self._lock = threading.Lock()
+
+    def publish(self, type: str, data: Any) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(f"{self.epoch}-{self._seq}", self._seq, type, to_json(data))
+            self._history.append(event)
+            self._stats.published += 1
+            # Under the lock: every subscriber receives the events in seq order
+            for subscription in list(self._subscribers):
+                if not subscription.push(event):
+                    self._subscribers.discard(subscription)
+                    self._stats.dropped += 1
+        return event
+
+    def subscribe(self, last_event_id: str | None = None) -> Subscription:
+        """
+        Subscribe from the event loop of the consumer. With `last_event_id`
+        the events published after it are replayed first; when they are no
+        longer all kept, the subscription starts with `reset` set.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.max_buffer)
+        with self._lock:
+            if last_event_id is not None:
+                seq = self._parse(last_event_id)
+                oldest = self._history[0].seq if self._history else self._seq + 1
+                if seq is None or seq > self._seq or seq < oldest - 1:
+                    subscription.reset = True
+                else:
+                    # Not bounded by max_buffer: the history is
+                    subscription._events.extend(event for event in self._history if event.seq > seq)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> ChangeFeedStats:
+        with self._lock:
+            return ChangeFeedStats(self._stats.published, len(self._subscribers), self._stats.dropped)
+
+    def _parse(self, event_id: str) -> int | None:
+        """seq of an event id of this process, None otherwise"""
+        epoch, _, seq = event_id.strip().partition("-")
+        return int(seq) if epoch == self.epoch and seq.isdigit() else None
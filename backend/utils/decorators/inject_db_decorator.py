@@ -1,6 +1,5 @@
 from functools import wraps
 from fastapi import Depends
-from sqlalchemy.orm import Session
 from db.session import get_db
 import inspect
 
@@ -9,26 +8,32 @@ def inject_db_to_methods(cls):
     Decorador de clase que inyecta automáticamente db: Session = Depends(get_db)
     a todos los métodos que tengan 'db' como parámetro.
     """
-    for attr_name in dir(cls):
+    # Solo los métodos definidos en la clase: dir() recorre (y ordena) toda la MRO
+    for attr_name, attr in list(vars(cls).items()):
         if attr_name.startswith('_'):  # Ignorar métodos privados
             continue
-            
-        attr = getattr(cls, attr_name)
-        
-        # Solo procesar métodos de instancia
-        if callable(attr) and hasattr(attr, '__func__'):
-            original_method = attr.__func__
-            sig = inspect.signature(original_method)
-            
-            # Verificar si el método tiene un parámetro 'db'
-            if 'db' in sig.parameters:
-                @wraps(original_method)
-                def make_wrapper(method):
-                    def wrapper(self, *args, db: Session = Depends(get_db), **kwargs):
-                        return method(self, *args, db=db, **kwargs)
-                    wrapper.__signature__ = sig
-                    return wrapper
-                
-                setattr(cls, attr_name, make_wrapper(original_method))
-    
-    return cls
\ No newline at end of file
+
+        # Solo procesar métodos de instancia con un parámetro 'db': se mira el
+        # código del método, sin construir su firma
+        if inspect.isfunction(attr) and _has_db_parameter(attr):
+            setattr(cls, attr_name, _inject_db(attr))
+
+    return cls
+
+def _has_db_parameter(method) -> bool:
+    code = method.__code__
+    return 'db' in code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]
+
+def _inject_db(method):
+    # La firma que lee FastAPI: 'db' pasa a ser keyword-only con Depends(get_db)
+    sig = inspect.signature(method)
+    params = [p for p in sig.parameters.values() if p.name != 'db']
+    db = sig.parameters['db'].replace(kind=inspect.Parameter.KEYWORD_ONLY, default=Depends(get_db))
+    position = next((i for i, p in enumerate(params) if p.kind == inspect.Parameter.VAR_KEYWORD), len(params))
+    params.insert(position, db)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return method(self, *args, **kwargs)
+    wrapper.__signature__ = sig.replace(parameters=params)
+    return wrapper
@@ -0,0 +1,38 @@
+import hashlib
+
+from fastapi import Response, status
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag made of `parts`, e.g. make_etag(7, 3) -> '"7.3"'"""
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+
+def digest(*values) -> str:
+    """Short stable digest of `values`, tells the representations of one version apart"""
+    return hashlib.blake2b(repr(values).encode(), digest_size=6).hexdigest()
+
+
+def parse_etags(header: str) -> list[str] | None:
+    """ETags listed by an If-Match / If-None-Match header, None for `*` (any)"""
+    if header.strip() == "*":
+        return None
+    return [etag.strip() for etag in header.split(",") if etag.strip()]
+
+
+def none_match(header: str | None, etag: str) -> bool:
+    """
+    False when the If-None-Match `header` lists `etag`: the client copy is
+    current and a 304 can be sent. Weak comparison (W/ is ignored), as
+    RFC 9110 asks for If-None-Match.
+    """
+    if header is None:
+        return True
+    etags = parse_etags(header)
+    if etags is None:
+        return False
+    return etag not in {tag.removeprefix("W/") for tag in etags}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
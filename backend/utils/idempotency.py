@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Iterable
+
+from utils.cache.backend import CacheBackend
+
+# Requests that may carry an Idempotency-Key
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+# Per-request headers, not part of the stored response
+_NOT_REPLAYED = frozenset({b"server-timing", b"date"})
+
+
+@dataclass
+class IdempotencyStats:
+    """
+    Counters of an IdempotencyStore.
+    - stored:       (int) responses kept for replay
+    - replayed:     (int) duplicates answered from a stored response
+    - waited:       (int) duplicates that waited for the request in flight
+    - mismatched:   (int) keys reused with another request (422)
+    - too_large:    (int) responses not stored, over the body size limit
+    - in_flight:    (int) keyed requests currently running
+    """
+    stored: int = 0
+    replayed: int = 0
+    waited: int = 0
+    mismatched: int = 0
+    too_large: int = 0
+    in_flight: int = 0
+
+
+class IdempotencyStore:
+    """
+    Responses of the requests sent with an Idempotency-Key, kept in a
+    CacheBackend (its size bound and TTL bound the store), and the keyed
+    requests still running in this process.
+
+    Stored values are dicts: {"status", "headers", "body", "fingerprint"}.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        # key -> resolved with the stored response (None if not stored) when the request ends
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._stats = IdempotencyStats()
+
+    def get(self, key: str) -> dict | None:
+        return self.backend.get(key)
+
+    def claim(self, key: str) -> asyncio.Future | None:
+        """
+        Run the request of `key` (None), or get the future of the same
+        request already running. Called on the event loop: no await
+        between the check and the claim.
+        """
+        running = self._in_flight.get(key)
+        if running is not None:
+            self._stats.waited += 1
+            return running
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def release(self, key: str, response: dict | None):
+        """End the request of `key`, keeping its response unless None (failed: a retry runs it again)"""
+        if response is not None:
+            self.backend.set(key, response)
+            self._stats.stored += 1
+        running = self._in_flight.pop(key)
+        if not running.done():
+            running.set_result(response)
+
+    def record(self, outcome: str):
+        """Count a duplicate answered without running ("replayed", "mismatched") or a "too_large" response"""
+        setattr(self._stats, outcome, getattr(self._stats, outcome) + 1)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> IdempotencyStats:
+        return IdempotencyStats(
+            stored=self._stats.stored,
+            replayed=self._stats.replayed,
+            waited=self._stats.waited,
+            mismatched=self._stats.mismatched,
+            too_large=self._stats.too_large,
+            in_flight=len(self._in_flight),
+        )
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware replaying the response of a mutating request sent
+    again with the same Idempotency-Key (a client retrying on a bad network):
+    - the first request runs, its response is stored unless it is a 5xx
+    - a retry gets the stored response (with `Idempotent-Replayed: true`),
+      the route and the database are not involved
+    - a retry arriving while the first request runs waits for its response
+    - a key reused with another body or query string is rejected with 422
+
+    Keys are scoped by caller (its Authorization header, else its address),
+    method and path: clients picking the same key never see each other's
+    responses. The body is hashed while the route
+    reads it, never buffered. A response body over `max_body_bytes` is not
+    kept: like a 5xx, its retries run again.
+
+    Params:
+        - store: IdempotencyStore of the responses
+        - max_body_bytes: (int) largest response body stored
+        - excluded_paths: (set) paths whose requests are never replayed
+          (their key is ignored), e.g. a login: its token is not stored
+    """
+
+    def __init__(self, app, store: IdempotencyStore, max_body_bytes: int = 64 * 1024, excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.store = store
+        self.max_body_bytes = max_body_bytes
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS or scope["path"] in self.excluded_paths:
+            return await self.app(scope, receive, send)
+
+        key = next((value for name, value in scope["headers"] if name == b"idempotency-key"), None)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return await _send_error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+        store_key = f"idempotency:{_caller(scope)}:{scope['method']}:{scope['path']}:{key.decode('latin-1')}"
+        fingerprint = hashlib.blake2b(scope.get("query_string", b""), digest_size=16)
+
+        async def hashing_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+            return message
+
+        while True:
+            stored = self.store.get(store_key)
+            if stored is not None:
+                return await self._replay(stored, fingerprint, hashing_receive, send)
+            running = self.store.claim(store_key)
+            if running is None:
+                break
+            # Shielded: a waiter that disconnects does not cancel the first request
+            stored = await asyncio.shield(running)
+            if stored is not None:
+                return await self._replay(stored, fingerprint, hashing_receive, send)
+            # The first request failed: run this one instead
+
+        status, headers, chunks, size = 500, [], [], 0
+
+        async def capture(message):
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                # Not kept past the limit: a large response is only sent
+                if size <= self.max_body_bytes:
+                    chunks.append(body)
+                else:
+                    chunks.clear()
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, hashing_receive, capture)
+            if size > self.max_body_bytes:
+                self.store.record("too_large")
+            elif status < 500:
+                response = {
+                    "status": status,
+                    "headers": [(name, value) for name, value in headers if name.lower() not in _NOT_REPLAYED],
+                    "body": b"".join(chunks),
+                    "fingerprint": fingerprint.hexdigest(),
+                }
+        finally:
+            self.store.release(store_key, response)
+
+    async def _replay(self, stored: dict, fingerprint, receive, send):
+        # Read the body of the retry to compare it with the first request
+        while True:
+            message = await receive()
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+
+        if fingerprint.hexdigest() != stored["fingerprint"]:
+            self.store.record("mismatched")
+            return await _send_error(send, 422, "Idempotency-Key was used with another request")
+
+        self.store.record("replayed")
+        await send({
+            "type": "http.response.start",
+            "status": stored["status"],
+            "headers": [*stored["headers"], (b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored["body"]})
+
+
+def _caller(scope) -> str:
+    """
+    Who sent the request: a digest of its Authorization header (its token,
+    not kept in clear), else its address
+    """
+    authorization = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+    if authorization is not None:
+        return "auth-" + hashlib.blake2b(authorization, digest_size=16).hexdigest()
+    client = scope.get("client")
+    return f"addr-{client[0]}" if client else "anonymous"
+
+
+async def _send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,81 @@
+import time
+
+from utils.metrics.registry import COUNT_BUCKETS, MetricsRegistry
+from utils.metrics.request_stats import reset_request_stats, start_request_stats
+
+# Route label of the requests that matched no route (keeps the label set bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class HttpMetrics:
+    """HTTP metrics of a registry, filled by MetricsMiddleware"""
+
+    def __init__(self, registry: MetricsRegistry):
+        labels = ("method", "route")
+        self.requests = registry.counter(
+            "http_requests_total", "Requests served", labels + ("status",)
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Time to serve a request, up to its last body byte", labels
+        )
+        self.queries = registry.histogram(
+            "http_request_db_queries", "SQL statements run by a request", labels, buckets=COUNT_BUCKETS
+        )
+        self.db_time = registry.histogram(
+            "http_request_db_seconds", "Time a request spent in SQL statements", labels
+        )
+        self.threadpool_wait = registry.histogram(
+            "http_request_threadpool_wait_seconds", "Time a sync handler waited for a worker thread", labels
+        )
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task per request) that
+    times each request, binds a RequestStats for the engine events and
+    the threadpool to fill, then records them per route.
+
+    Params:
+        - metrics: HttpMetrics to record into
+        - server_timing: add a Server-Timing header (total, db, threadpool)
+    """
+
+    def __init__(self, app, metrics: HttpMetrics, server_timing: bool = True):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        stats, token = start_request_stats()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    header = (
+                        f"app;dur={elapsed:.2f}, "
+                        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                        f"threadpool;dur={stats.threadpool_seconds * 1000:.2f}"
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_request_stats(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+
+            self.metrics.requests.inc(*labels, status)
+            self.metrics.latency.observe(time.perf_counter() - start, *labels)
+            self.metrics.queries.observe(stats.queries, *labels)
+            self.metrics.db_time.observe(stats.db_seconds, *labels)
+            self.metrics.threadpool_wait.observe(stats.threadpool_seconds, *labels)
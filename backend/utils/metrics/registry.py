@@ -0,0 +1,162 @@
+import bisect
+import math
+import threading
+from typing import Callable, Iterable
+
+# Seconds, from a cache hit to a slow bulk request
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements per request
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per combination of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus layout (_bucket/_sum/_count).
+    An observation costs a bisect and a few additions under a lock.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+
+        names = self.labels + ("le",)
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_labels(names, label_values + (_number(bound),))} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_number(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+def histogram_samples(buckets: tuple, counts: dict[float, int], total: float) -> list[tuple[str, dict, float]]:
+    """
+    Collector samples of a histogram kept elsewhere: `counts` maps the upper
+    bounds of `buckets` (math.inf above the last one) to their observations,
+    `total` is the sum of the observations
+    """
+    samples, cumulative = [], 0
+    for bound in tuple(sorted(buckets)) + (math.inf,):
+        cumulative += counts.get(bound, 0)
+        samples.append(("_bucket", {"le": _number(bound)}, cumulative))
+    samples.append(("_sum", {}, total))
+    samples.append(("_count", {}, cumulative))
+    return samples
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text format (version 0.0.4).
+
+    Besides the metrics it owns, collectors are called on each scrape and
+    return (name, help, kind, samples) for values kept elsewhere
+    (e.g. cache counters): nothing is copied on the hot path. A sample is
+    (labels, value), or (suffix, labels, value) for the series of a
+    histogram (see histogram_samples).
+    """
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, Iterable[tuple]]]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collector(self, collect: Callable):
+        """Register collect() -> iterable of (name, help, kind, [([suffix,] labels dict, value), ...])"""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        for collect in self._collectors:
+            for name, help, kind, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for sample in samples:
+                    suffix, labels, value = sample if len(sample) == 3 else ("", *sample)
+                    names = tuple(labels)
+                    lines.append(f"{name}{suffix}{_labels(names, tuple(labels.values()))} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
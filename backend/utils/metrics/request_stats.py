@@ -0,0 +1,35 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass
+class RequestStats:
+    """
+    What one request spent, filled while it runs.
+    - queries:            (int) SQL statements executed
+    - db_seconds:         (float) time spent in those statements
+    - threadpool_seconds: (float) time its sync handler waited for a worker thread
+    """
+    queries: int = 0
+    db_seconds: float = 0.0
+    threadpool_seconds: float = 0.0
+
+
+# Set by MetricsMiddleware. Copied into the threadpool and the async
+# session greenlets, so the engine events of a request find its stats.
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    """Stats of the request being served, None outside of a request"""
+    return _current.get()
+
+
+def start_request_stats() -> tuple[RequestStats, object]:
+    """Bind fresh stats to the current context, return them and the token to reset it"""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def reset_request_stats(token: object):
+    _current.reset(token)
@@ -0,0 +1,39 @@
+import functools
+import inspect
+import time
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from utils.metrics.request_stats import current_request_stats
+
+
+def _timed_threadpool(endpoint):
+    """
+    Async wrapper of a sync endpoint: it is still run in the threadpool,
+    and the time it waited for a worker thread is added to the request stats.
+    """
+    def run(dispatched_at: float, kwargs: dict):
+        stats = current_request_stats()
+        if stats is not None:
+            stats.threadpool_seconds += time.perf_counter() - dispatched_at
+        return endpoint(**kwargs)
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        return await run_in_threadpool(run, time.perf_counter(), kwargs)
+
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute whose sync endpoints report their threadpool wait.
+    Use it with APIRouter(route_class=InstrumentedRoute). The signature is
+    kept (functools.wraps), so parameters and OpenAPI do not change.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_threadpool(endpoint)
+        super().__init__(path, endpoint, **kwargs)
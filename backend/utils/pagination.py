@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Generic, List, TypeVar
+
+Item = TypeVar("Item")
+
+
+class InvalidCursorError(ValueError):
+    """The cursor was not made by encode_cursor / encode_rank_cursor (or was tampered)"""
+
+
+@dataclass
+class Page(Generic[Item]):
+    """
+    One page of a keyset (cursor) paginated query.
+    - items:        (list)
+    - next_cursor:  (str | None) opaque token for the next page, None on the last page
+    """
+    items: List[Item] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+def encode_cursor(last_id: int) -> str:
+    """Build the opaque token that points right after `last_id`"""
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """Read back the id stored in a token, raise InvalidCursorError if it was tampered"""
+    last_id = _decode(cursor).get("id")
+    if not isinstance(last_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    return last_id
+
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """
+    Token pointing right after (`rank`, `last_id`), for pages ordered by a
+    score then id. Only as stable as the scores: if they change between
+    two pages, rows can be repeated or skipped.
+    """
+    return _encode({"rank": rank, "id": last_id})
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """Read back (rank, id) from a token, raise InvalidCursorError if it was tampered"""
+    data = _decode(cursor)
+    rank, last_id = data.get("rank"), data.get("id")
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool) or not isinstance(last_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    return float(rank), last_id
+
+
+def _encode(data: dict) -> str:
+    # repr of a float reads back to the same float: the rank is compared exactly
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    if not isinstance(data, dict):
+        raise InvalidCursorError("Invalid cursor")
+    return data
@@ -0,0 +1,79 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PeriodicJobStats:
+    """
+    Counters of a PeriodicJob.
+    - runs:         (int) completed runs
+    - failures:     (int) runs that raised (logged, retried at the next interval)
+    - last_result:  what the last completed run returned
+    """
+    runs: int = 0
+    failures: int = 0
+    last_result: Any = None
+
+
+class PeriodicJob:
+    """
+    Run `fn()` every `interval` seconds on a daemon thread, the first time
+    one interval after start(). A failed run is logged and does not stop
+    the job.
+
+    Params:
+        - name: (str) name of the thread, and of the job in the logs
+        - interval: (float) seconds between the end of a run and the next one
+        - fn: the job, its return value is kept in the stats
+    """
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Any]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._stats = PeriodicJobStats()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def run_once(self) -> Any:
+        """Run the job now, on the calling thread"""
+        try:
+            result = self.fn()
+        except Exception:
+            with self._lock:
+                self._stats.failures += 1
+            raise
+        with self._lock:
+            self._stats.runs += 1
+            self._stats.last_result = result
+        return result
+
+    def stats(self) -> PeriodicJobStats:
+        with self._lock:
+            return PeriodicJobStats(self._stats.runs, self._stats.failures, self._stats.last_result)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Periodic job %s failed", self.name)
@@ -0,0 +1,43 @@
+import logging
+
+from db.query_recorder import QueryRecorder
+from utils.admission import parse_routes
+
+logger = logging.getLogger(__name__)
+
+
+def parse_budgets(value: str) -> dict[str, int]:
+    """Statement budget of each route of "METHOD /path=statements,..." """
+    return {route: int(budget) for route, budget in parse_routes(value).items()}
+
+
+class QueryBudgetMiddleware:
+    """
+    Pure ASGI middleware recording the SQL statements of each request (a
+    QueryRecorder scoped to it) and logging, with the statements, the
+    requests that run more than the budget of their route: the extra
+    lookup or refresh that slipped into a handler shows in the logs.
+
+    Params:
+        - budget: (int) statements allowed per request, 0 for no budget
+        - routes: {"METHOD /path": statements} budgets of routes that differ (route templates, e.g. /api/users/{id})
+    """
+
+    def __init__(self, app, budget: int = 0, routes: dict[str, int] | None = None):
+        self.app = app
+        self.budget = budget
+        self.routes = routes or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = QueryRecorder(scoped=True).start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            queries.stop()
+            route = f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"
+            budget = self.routes.get(route, self.budget)
+            if budget and len(queries) > budget:
+                logger.warning("%s ran %d SQL statements, budget %d:\n%s", route, len(queries), budget, queries.report())
@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, List
+
+SCHEME = "scrypt"
+
+# Legacy rows store the password itself: short, printable and without the
+# "$" separating the fields of a hash (a damaged hash is not a password)
+LEGACY_MAX_LENGTH = 128
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    """Module level so it can run in a ProcessPoolExecutor"""
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, dklen=dklen,
+        maxmem=256 * n * r + 1024 * 1024,
+    )
+
+
+class PasswordHasher:
+    """
+    scrypt password hashing (stdlib) run on a dedicated executor.
+
+    Params:
+        - n, r, p:      scrypt work factor
+        - max_workers:  KDF computations running at the same time, the
+                        rest wait in the executor queue
+        - executor:     "thread" (hashlib releases the GIL while hashing)
+                        or "process"
+
+    Stored format: "scrypt$n=16384,r=8,p=1$<salt>$<hash>". Hashes made with
+    other parameters (or legacy plaintext passwords) still verify and are
+    flagged by `needs_rehash`. Any other stored value never verifies.
+
+    Return:
+        - hash / hash_many / hash_async / hash_many_async
+        - verify / verify_async
+        - needs_rehash
+        - dummy_hash: verified against when there is no user, so a login
+          of an unknown email costs the same KDF as a wrong password
+    """
+
+    def __init__(
+        self,
+        n: int = 2 ** 14,
+        r: int = 8,
+        p: int = 1,
+        max_workers: int = 4,
+        executor: str = "thread",
+        dklen: int = 32,
+    ):
+        self.n, self.r, self.p, self.dklen = n, r, p, dklen
+        self.max_workers = max_workers
+        self._executor_kind = executor
+        self._executor: Executor | None = None
+        self._dummy_hash: str | None = None
+
+    @property
+    def executor(self) -> Executor:
+        """Created on first use, so importing the app does not spawn workers"""
+        if self._executor is None:
+            if self._executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    @property
+    def dummy_hash(self) -> str:
+        """Hash of a random password with the current parameters, made on first use"""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(_b64encode(os.urandom(16)))
+        return self._dummy_hash
+
+    # Blocking API, for sync code (already off the event loop)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        digest = self.executor.submit(_scrypt, password, salt, self.n, self.r, self.p, self.dklen).result()
+        return self._format(salt, digest)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """Hash a batch in parallel on the executor"""
+        passwords = list(passwords)
+        salts = [os.urandom(16) for _ in passwords]
+        futures = [
+            self.executor.submit(_scrypt, password, salt, self.n, self.r, self.p, self.dklen)
+            for password, salt in zip(passwords, salts)
+        ]
+        return [self._format(salt, future.result()) for salt, future in zip(salts, futures)]
+
+    def verify(self, password: str, stored: str) -> bool:
+        params = self._parse(stored)
+        if params is None:
+            return self._verify_legacy(password, stored)
+
+        n, r, p, salt, expected = params
+        digest = self.executor.submit(_scrypt, password, salt, n, r, p, len(expected)).result()
+        return hmac.compare_digest(digest, expected)
+
+    # Async API, the event loop awaits the executor instead of hashing
+
+    async def hash_async(self, password: str) -> str:
+        salt = os.urandom(16)
+        future = self.executor.submit(_scrypt, password, salt, self.n, self.r, self.p, self.dklen)
+        return self._format(salt, await asyncio.wrap_future(future))
+
+    async def hash_many_async(self, passwords: Iterable[str]) -> List[str]:
+        return list(await asyncio.gather(*(self.hash_async(password) for password in passwords)))
+
+    async def verify_async(self, password: str, stored: str) -> bool:
+        params = self._parse(stored)
+        if params is None:
+            return self._verify_legacy(password, stored)
+
+        n, r, p, salt, expected = params
+        future = self.executor.submit(_scrypt, password, salt, n, r, p, len(expected))
+        return hmac.compare_digest(await asyncio.wrap_future(future), expected)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """True if `stored` was not made with the current parameters"""
+        params = self._parse(stored)
+        if params is None:
+            return True
+
+        n, r, p, _, expected = params
+        return (n, r, p, len(expected)) != (self.n, self.r, self.p, self.dklen)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _format(self, salt: bytes, digest: bytes) -> str:
+        return f"{SCHEME}$n={self.n},r={self.r},p={self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def _parse(self, stored: str):
+        """Return (n, r, p, salt, hash), None if `stored` is not a scrypt hash"""
+        parts = stored.split("$") if stored else []
+        if len(parts) != 4 or parts[0] != SCHEME:
+            return None
+        try:
+            params = dict(item.split("=", 1) for item in parts[1].split(","))
+            return int(params["n"]), int(params["r"]), int(params["p"]), _b64decode(parts[2]), _b64decode(parts[3])
+        except (KeyError, ValueError):
+            return None
+
+    def _verify_legacy(self, password: str, stored: str) -> bool:
+        """Rows written before hashing existed store the plaintext password"""
+        if not stored or len(stored) > LEGACY_MAX_LENGTH or "$" in stored or not stored.isprintable():
+            return False
+        return hmac.compare_digest(password.encode(), stored.encode())
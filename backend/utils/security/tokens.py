@@ -0,0 +1,219 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+
+class InvalidTokenError(Exception):
+    """The token is malformed, badly signed, expired or revoked"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """
+    Verified content of an access token.
+    - user_id:      (int)
+    - role:         (str) RoleEnum value
+    - issued_at:    (float) unix time
+    - expires_at:   (int) unix time
+    """
+    user_id: int
+    role: str
+    issued_at: float
+    expires_at: int
+
+
+class TokenKeyring:
+    """
+    HMAC keys by key id (kid). New tokens are signed with the active key,
+    any key still in the ring verifies.
+
+    Rotation without restart:
+        - call `rotate(kid, secret)` (keeps the previous keys), or
+        - point `keys_file` to a JSON file {"active": kid, "keys": {kid: secret}},
+          it is re-read when its modification time changes
+    """
+
+    def __init__(self, keys: dict[str, str] | None = None, active: str | None = None, keys_file: str | None = None):
+        self._lock = threading.Lock()
+        self._keys = {kid: secret.encode() for kid, secret in (keys or {}).items()}
+        self._active = active or next(iter(self._keys), None)
+        self.keys_file = keys_file
+        self._file_mtime: float | None = None
+        self._next_check = 0.0
+
+        self.reload_if_changed()
+        if self._active is None:
+            # Nothing configured: tokens only live as long as this process
+            self.rotate("ephemeral", _b64encode(os.urandom(32)))
+
+    def rotate(self, kid: str, secret: str):
+        """Add `kid` and sign the new tokens with it"""
+        with self._lock:
+            self._keys[kid] = secret.encode()
+            self._active = kid
+
+    def remove(self, kid: str):
+        """Stop accepting tokens signed with `kid`"""
+        with self._lock:
+            if kid == self._active:
+                raise ValueError("The active key can not be removed")
+            self._keys.pop(kid, None)
+
+    def active(self) -> tuple[str, bytes]:
+        self.reload_if_changed()
+        with self._lock:
+            return self._active, self._keys[self._active]
+
+    def get(self, kid: str) -> bytes | None:
+        self.reload_if_changed()
+        return self._keys.get(kid)
+
+    def reload_if_changed(self):
+        """Re-read `keys_file` if it changed, checked at most once per second"""
+        if not self.keys_file:
+            return
+
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + 1.0
+
+        try:
+            mtime = os.stat(self.keys_file).st_mtime
+            if mtime == self._file_mtime:
+                return
+            with open(self.keys_file) as file:
+                keys, active = self._parse_keys_file(json.load(file))
+        except (OSError, ValueError):
+            return  # Keep the current keys if the file is missing, half written or invalid
+
+        with self._lock:
+            self._keys = keys
+            self._active = active
+            self._file_mtime = mtime
+
+    @staticmethod
+    def _parse_keys_file(data) -> tuple[dict[str, bytes], str]:
+        """(keys, active kid) of a keys file document, ValueError if it is not a valid one"""
+        if not isinstance(data, dict) or not isinstance(data.get("keys"), dict) or not data["keys"]:
+            raise ValueError("A keys file needs a non empty \"keys\" object")
+        if not all(isinstance(secret, str) and secret for secret in data["keys"].values()):
+            raise ValueError("Every key needs a secret")
+        keys = {kid: secret.encode() for kid, secret in data["keys"].items()}
+        active = data.get("active") or next(iter(keys))
+        if active not in keys:
+            raise ValueError(f"The active key {active!r} is not in \"keys\"")
+        return keys, active
+
+
+class RevocationList:
+    """
+    Users whose tokens issued before a given time are rejected (after an
+    update or a delete). Entries are dropped once every token they could
+    reject has expired, so the list stays small.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._revoked: dict[int, float] = {}
+
+    def revoke(self, *user_ids: int):
+        now = time.time()
+        with self._lock:
+            for user_id in user_ids:
+                self._revoked[user_id] = now
+            self._prune(now)
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        revoked_at = self._revoked.get(claims.user_id)
+        return revoked_at is not None and claims.issued_at <= revoked_at
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def _prune(self, now: float):
+        expired = [user_id for user_id, revoked_at in self._revoked.items() if revoked_at < now - self.ttl]
+        for user_id in expired:
+            del self._revoked[user_id]
+
+
+class TokenSigner:
+    """
+    Stateless access tokens: JWT (HS256) carrying the user id and role.
+    Verification only uses memory: the keyring and the revocation list.
+
+    Return:
+        - issue
+        - verify
+    """
+
+    def __init__(self, keyring: TokenKeyring, ttl: int = 3600, revocations: RevocationList | None = None):
+        self.keyring = keyring
+        self.ttl = ttl
+        self.revocations = revocations or RevocationList(ttl)
+
+    def issue(self, user_id: int, role: str) -> tuple[str, int]:
+        """Return (token, seconds until it expires)"""
+        kid, key = self.keyring.active()
+        now = time.time()
+        header = {"alg": "HS256", "typ": "JWT", "kid": kid}
+        payload = {"sub": str(user_id), "role": role, "iat": now, "exp": int(now) + self.ttl}
+
+        signing_input = f"{self._encode(header)}.{self._encode(payload)}"
+        signature = hmac.new(key, signing_input.encode(), hashlib.sha256).digest()
+        return f"{signing_input}.{_b64encode(signature)}", self.ttl
+
+    def verify(self, token: str) -> TokenClaims:
+        try:
+            header_part, payload_part, signature_part = token.split(".")
+            header = json.loads(_b64decode(header_part))
+            if not isinstance(header, dict):
+                raise InvalidTokenError("Malformed token")
+            key = self.keyring.get(header.get("kid"))
+            if key is None or header.get("alg") != "HS256":
+                raise InvalidTokenError("Unknown signing key")
+
+            expected = hmac.new(key, f"{header_part}.{payload_part}".encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, _b64decode(signature_part)):
+                raise InvalidTokenError("Invalid signature")
+
+            payload = json.loads(_b64decode(payload_part))
+            if not isinstance(payload, dict):
+                raise InvalidTokenError("Malformed token")
+            claims = TokenClaims(
+                user_id=int(payload["sub"]),
+                role=payload["role"],
+                issued_at=float(payload["iat"]),
+                expires_at=int(payload["exp"]),
+            )
+        except InvalidTokenError:
+            raise
+        except (ValueError, KeyError, TypeError) as exc:
+            raise InvalidTokenError("Malformed token") from exc
+
+        if claims.expires_at <= time.time():
+            raise InvalidTokenError("Token expired")
+        if self.revocations.is_revoked(claims):
+            raise InvalidTokenError("Token revoked")
+        return claims
+
+    def _encode(self, data: dict) -> str:
+        return _b64encode(json.dumps(data, separators=(",", ":")).encode())
@@ -0,0 +1,88 @@
+from operator import itemgetter
+from typing import Any, Iterable, Mapping, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import Row
+
+# Field types copied as they are: the JSON of the attribute is the JSON of
+# the validated field (str enums are encoded by value either way)
+_PLAIN_TYPES = (int, str, float, bool)
+
+
+class ResponseSerializer:
+    """
+    Encode ORM objects straight to JSON bytes in the shape of `schema`,
+    skipping what FastAPI does for a response_model: build a model per
+    object, validate it, jsonable_encoder, json.dumps.
+
+    Loaded attributes are read from the instance __dict__ (no descriptor
+    call per field) and the result is encoded by pydantic-core (Rust).
+    Only for flat schemas (int/str/float/bool fields, no validators) whose
+    output equals the attributes: anything else raises TypeError here
+    instead of silently changing the response.
+
+    Keep `response_model` on the route: the OpenAPI schema is still built
+    from it, the returned Response only bypasses its serialization.
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        for name, field in schema.model_fields.items():
+            if field.annotation not in _PLAIN_TYPES:
+                raise TypeError(f"{schema.__name__}.{name} is not a plain field, serialize it with the model")
+        if schema.__pydantic_decorators__.field_validators or schema.__pydantic_decorators__.model_validators:
+            raise TypeError(f"{schema.__name__} has validators, serialize it with the model")
+
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+
+    def parse_fields(self, fields: str | None) -> tuple[str, ...] | None:
+        """
+        Sparse fieldset of a `?fields=id,name` parameter, in schema order.
+        None (all fields) when empty. Raise ValueError on an unknown field.
+        """
+        requested = {name.strip() for name in (fields or "").split(",") if name.strip()}
+        if not requested:
+            return None
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return tuple(name for name in self.fields if name in requested)
+
+    def dumps(self, obj: Any, fields: Sequence[str] | None = None) -> bytes:
+        return to_json(self._row(obj, fields or self.fields))
+
+    def dumps_many(self, objs: Iterable[Any], fields: Sequence[str] | None = None) -> bytes:
+        fields = fields or self.fields
+        objs = list(objs)
+        if objs and isinstance(objs[0], Row):
+            # Rows of one result share their columns: look the positions up once
+            positions = [objs[0]._fields.index(name) for name in fields]
+            values = itemgetter(*positions) if len(positions) > 1 else lambda row: (row[positions[0]],)
+            return to_json([dict(zip(fields, values(obj))) for obj in objs])
+
+        row = self._row
+        return to_json([row(obj, fields) for obj in objs])
+
+    def response(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Response:
+        """JSON Response of one object, or of a list of them, restricted to `fields`"""
+        body = self.dumps_many(content, fields) if isinstance(content, list) else self.dumps(content, fields)
+        return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+    def _row(self, obj: Any, fields: Sequence[str]) -> dict:
+        # Core Row (column-restricted SELECT) or ORM entity
+        values = getattr(obj, "_mapping", None)
+        if values is None:
+            values = obj.__dict__
+        try:
+            return {name: values[name] for name in fields}
+        except KeyError:
+            # Expired or deferred attribute: let the descriptor load it
+            return {name: getattr(obj, name) for name in fields}
@@ -0,0 +1,144 @@
+import codecs
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, Iterable, Iterator, Sequence
+
+from pydantic_core import to_json
+
+from utils.change_feed import ChangeFeed, Event
+
+# Content type of each DataFormat
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Longest line of an upload, in characters: a user record is far shorter
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def _plain(value):
+    # Enums are written by value (csv would write "RoleEnum.Driver")
+    return value.value if isinstance(value, Enum) else value
+
+
+def encode_ndjson(batches: Iterable[Sequence[tuple]], fields: Sequence[str]) -> Iterator[bytes]:
+    """One JSON object per line, one yielded chunk per batch of rows"""
+    for rows in batches:
+        yield b"".join(to_json(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+def encode_csv(batches: Iterable[Sequence[tuple]], fields: Sequence[str]) -> Iterator[bytes]:
+    """Header line, then one CSV line per row, one yielded chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+
+    for rows in batches:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # No rows at all: still send the header
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH) -> AsyncIterator[tuple[int, str | None]]:
+    """
+    (line number, line) of an UTF-8 byte stream, read chunk by chunk:
+    only the current chunk and an incomplete last line are held.
+    Blank lines are skipped (still counted). A line longer than
+    `max_length` is dropped as it arrives and yielded as None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    number = 0
+    too_long = False
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            number += 1
+            if too_long or len(line) > max_length:
+                too_long = False
+                yield number, None
+            elif line.strip():
+                yield number, line.rstrip("\r")
+        if len(pending) > max_length:
+            # The rest of the line is dropped up to its newline
+            too_long, pending = True, ""
+
+    pending += decoder.decode(b"", final=True)
+    if too_long or len(pending) > max_length:
+        yield number + 1, None
+    elif pending.strip():
+        yield number + 1, pending.rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """
+    (line number, record, error) of an NDJSON or CSV upload. Exactly one of
+    record/error is None. A CSV upload starts with its header line; a
+    record spans a single line (quoted newlines are not supported).
+    Empty CSV values are left out, so the schema defaults apply.
+    """
+    header: list[str] | None = None
+
+    async for number, line in iter_lines(chunks):
+        if line is None:
+            yield number, None, f"Line longer than {MAX_LINE_LENGTH} characters"
+            continue
+        if format == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield number, None, f"Invalid JSON: {exc}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, "Expected a JSON object"
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield number, None, f"Expected {len(header)} values, got {len(values)}"
+        else:
+            yield number, {name: value for name, value in zip(header, values) if value != ""}, None
+
+
+def encode_sse(event: Event) -> bytes:
+    """One server-sent event: its id (resume point), type and JSON payload"""
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event.id.encode(), event.type.encode(), event.data)
+
+
+async def sse_stream(feed: ChangeFeed, last_event_id: str | None, heartbeat: float, retry_ms: int = 3000) -> AsyncIterator[bytes]:
+    """
+    Server-sent events of `feed`, after `last_event_id` when given.
+    - `event: reset` first when that point is no longer kept: refetch, then follow
+    - `: ping` every `heartbeat` idle seconds
+    - `event: lagged` then the end of the stream when the client fell too
+      far behind: it reconnects with Last-Event-ID
+    The subscription lives as long as the stream (closed on disconnect).
+    """
+    subscription = feed.subscribe(last_event_id)
+    try:
+        yield b"retry: %d\n\n" % retry_ms
+        if subscription.reset:
+            yield b"event: reset\ndata: {}\n\n"
+        while True:
+            events = await subscription.next(heartbeat)
+            if events:
+                yield b"".join(encode_sse(event) for event in events)
+            if subscription.dropped:
+                yield b"event: lagged\ndata: {}\n\n"
+                return
+            if not events:
+                yield b": ping\n\n"
+    finally:
+        feed.unsubscribe(subscription)